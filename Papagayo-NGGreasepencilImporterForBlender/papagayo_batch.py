@@ -0,0 +1,149 @@
+"""Headless lipsync baking, e.g. on a render farm.
+
+Usage::
+
+    blender -b template.blend --python papagayo_batch.py -- [-o OUTPUT] [--rest-frames] SHOT.pg2 [...]
+
+For every Papagayo-NG file the template .blend is opened fresh, the Grease
+Pencil objects of its voices are created and their timelines are filled,
+and the result is saved as OUTPUT/<shot>.blend. Phoneme drawings are taken
+from the Grease Pencil data named like the voices in the template, when it
+has them. No operators or interface context are needed for the import. A
+JSON report with the keyframes and the seconds of every stage of every shot
+is written to OUTPUT/lipsync_report.json.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+try:
+    import papagayo_core
+except ImportError:
+    # Running from a checkout of the repository, papagayo_core lives next to the importer folder
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import papagayo_import
+from papagayo_core.cli import collect_files
+from papagayo_core.export import safe_file_name
+
+
+def blend_paths(files, output_root):
+    """Return one distinct .blend path per input file, named after the file."""
+    paths = []
+    used = set()
+    for file_path in files:
+        name = safe_file_name(os.path.splitext(os.path.basename(file_path))[0])
+        candidate = name
+        counter = 1
+        while candidate in used:
+            counter += 1
+            candidate = f"{name}_{counter}"
+        used.add(candidate)
+        paths.append(os.path.join(output_root, candidate + ".blend"))
+    return paths
+
+
+def apply_settings(my_tool, args):
+    my_tool.rest_frames = args.rest_frames
+    my_tool.rest_min_gap = args.rest_min_gap
+    my_tool.rest_after = args.rest_after
+    my_tool.use_cache = args.use_cache
+    my_tool.min_hold = args.min_hold
+    my_tool.step = args.step
+    my_tool.share_drawings = args.share_drawings
+    my_tool.incremental = True
+    my_tool.load_sound = args.sound
+
+
+def bake_shot(template, file_path, blend_path, args, reopen=True):
+    """Import one shot into a fresh copy of the template and save it, returning a report dict."""
+    start = time.perf_counter()
+    report = {"file": file_path, "ok": False, "seconds": {}}
+    try:
+        if reopen:
+            bpy.ops.wm.open_mainfile(filepath=template)
+        report["seconds"]["open"] = time.perf_counter() - start
+        apply_settings(bpy.context.scene.my_tool, args)
+        stats = papagayo_import.import_project(file_path)
+        report["seconds"].update(stats.pop("seconds"))
+        save_start = time.perf_counter()
+        bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True)
+        report["seconds"]["save"] = time.perf_counter() - save_start
+        report.update(stats, ok=True, output=blend_path)
+    except Exception as e:
+        report["error"] = f"{type(e).__name__}: {e}"
+    report["seconds"]["total"] = time.perf_counter() - start
+    return report
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="blender -b template.blend --python papagayo_batch.py --",
+                                     description="Bake Papagayo-NG lipsync into copies of the open .blend file.")
+    parser.add_argument("inputs", nargs="+", help="Papagayo-NG files or directories containing them")
+    parser.add_argument("-o", "--output", default="lipsync_blends", help="output directory (default: %(default)s)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="search directories recursively")
+    parser.add_argument("--rest-frames", action="store_true", help="insert rest keys in the silences between words")
+    parser.add_argument("--rest-min-gap", type=int, default=1,
+                        help="shortest silence in frames that gets a rest key (default: %(default)s)")
+    parser.add_argument("--rest-after", type=int, default=0,
+                        help="frames the last mouth shape is held after the end of a word before the rest, a rest also "
+                             "follows the last word up to the end frame of the project (default: %(default)s)")
+    parser.add_argument("--min-hold", type=int, default=1, help="minimum frames a phoneme is held (default: %(default)s)")
+    parser.add_argument("--step", type=int, default=1, help="snap keys to multiples of STEP frames (default: %(default)s)")
+    parser.add_argument("--no-share-drawings", dest="share_drawings", action="store_false",
+                        help="copy the drawing for every keyframe instead of instancing it (Grease Pencil v3)")
+    parser.add_argument("--sound", action="store_true", help="add a sequencer strip with the sound of the project")
+    parser.add_argument("--use-cache", action="store_true", help="read and write .pgcache sidecars")
+    parser.add_argument("--report", help="path of the JSON report (default: OUTPUT/lipsync_report.json)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    template = bpy.data.filepath
+    if not template:
+        print("[ERROR] Open a template .blend file: blender -b template.blend --python papagayo_batch.py -- ...",
+              file=sys.stderr)
+        return 2
+    try:
+        files = collect_files(args.inputs, args.recursive)
+    except FileNotFoundError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 2
+    if not files:
+        print("[ERROR] No .pg2 or .json files found", file=sys.stderr)
+        return 2
+    if not hasattr(bpy.types.Scene, "my_tool"):
+        papagayo_import.register()
+    os.makedirs(args.output, exist_ok=True)
+
+    start = time.perf_counter()
+    reports = []
+    failed = 0
+    for number, (file_path, blend_path) in enumerate(zip(files, blend_paths(files, args.output))):
+        # The template is already open for the first shot
+        report = bake_shot(template, file_path, blend_path, args, reopen=number > 0)
+        reports.append(report)
+        if report["ok"]:
+            print(f"[INFO] {file_path}: {report['keys']} keyframes in {report['voices']} voices, "
+                  f"{report['seconds']['total']:.2f}s -> {blend_path}")
+        else:
+            failed += 1
+            print(f"[ERROR] {file_path}: {report['error']}", file=sys.stderr)
+
+    report_path = args.report or os.path.join(args.output, "lipsync_report.json")
+    with open(report_path, "w", encoding="utf-8") as report_file:
+        json.dump({"template": template, "shots": reports}, report_file, indent=2)
+    print(f"[INFO] Baked {len(files) - failed}/{len(files)} shots in {time.perf_counter() - start:.2f}s, "
+          f"report: {report_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    sys.exit(main(argv))
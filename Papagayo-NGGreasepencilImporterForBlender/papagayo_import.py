@@ -12,11 +12,60 @@ bl_info = {
     "category": "Import-Export"}
 
 import bpy
-import json
+import hashlib
 import os
+import time
+from array import array
+from bisect import bisect_right
+from bpy.app.handlers import persistent
 from bpy_extras.io_utils import ImportHelper 
 from bpy.types import Operator, PropertyGroup
-from bpy.props import StringProperty, BoolProperty, EnumProperty, PointerProperty
+from bpy.props import StringProperty, BoolProperty, EnumProperty, IntProperty, PointerProperty
+from papagayo_core import (ProjectCache, decode_drawing_signatures, decode_keyframe_record, diff_keyframes,
+                           encode_keyframe_record, load_project_cached, phoneme_channels, phoneme_pairs,
+                           phoneme_value_coordinates, redrawn_phonemes, reduce_keyframes, stream_project,
+                           viseme_index_coordinates, voice_keyframes)
+
+
+def load_project(file_path):
+    # Files are read incrementally to keep the memory peak low for long recordings,
+    # the binary sidecar skips parsing entirely when the file did not change.
+    if bpy.context.scene.my_tool.use_cache:
+        return load_project_cached(file_path)
+    return stream_project(file_path)
+
+
+# Parsed projects, so panel redraws and operators don't decode the file again
+project_cache = ProjectCache(loader=load_project)
+
+# Custom property of the Grease Pencil data with the keys applied to its combined layer
+APPLIED_KEYS_PROPERTY = "papagayo_applied_keys"
+
+# Custom property of the Grease Pencil data with the keys shown by the live playback handler
+PLAYBACK_KEYS_PROPERTY = "papagayo_playback_keys"
+# Name suffix of the hidden copy of a combined layer kept while an apply can still be cancelled
+SNAPSHOT_SUFFIX = "_snapshot"
+# Custom property of the Grease Pencil data with {layer name: hide} of the layers before the live playback
+PLAYBACK_HIDE_PROPERTY = "papagayo_playback_hide"
+# Custom property of the Grease Pencil data with {layer name: hide} of the layers before the mouth chart
+CHART_HIDE_PROPERTY = "papagayo_chart_hide"
+
+# Grease Pencil data name -> PlaybackTrack, for the voices in live playback
+playback_tracks = {}
+
+# Custom property of the sound datablocks loaded for a project, the modification time and size of the file
+SOUND_STAMP_PROPERTY = "papagayo_sound_stamp"
+
+# Name of the Time Offset modifier showing the mouth chart layer
+TIME_OFFSET_MODIFIER = "Papagayo Lipsync"
+
+# Seconds of work per timer event of the modal operators and the timer interval, the interface
+# stays responsive in between
+MODAL_SLICE_SECONDS = 0.04
+MODAL_TIMER_SECONDS = 0.01
+
+# Position of 'CONSTANT' in the keyframe interpolation enum, foreach_set() takes the enum values as integers
+CONSTANT_INTERPOLATION = 0
 
 
 class OT_TestOpenFilebrowser(Operator, ImportHelper): 
@@ -30,40 +79,249 @@ class OT_TestOpenFilebrowser(Operator, ImportHelper):
         """Do something with the selected file(s).""" 
         filename, extension = os.path.splitext(self.filepath)
         scene = bpy.types.Scene
+        if scene.pg_path:
+            project_cache.invalidate(scene.pg_path)
+        project_cache.invalidate(self.filepath)
         scene.pg_path = self.filepath
         return {'FINISHED'}
 
 
-class BTN_OP_create_grease_objects(Operator):
+class ModalStepsOperator(Operator):
+    """Base of the operators running a step generator, which yields (done, total) progress.
+
+    Invoked from the panel the steps run in slices from a window manager timer,
+    with progress in the window manager and the status bar. ESC cancels and
+    rolls the changes back, and so does an error in a step. execute() runs all
+    steps at once, for scripts. Subclasses override start(), finish() and rollback().
+    """
+    status_text = "Processing"
+
+    def start(self, context):
+        """Return the steps of the operator, an iterator yielding (done, total) after every step.
+        Whatever the steps change must be recorded on the operator for rollback().
+        """
+        return iter(())
+
+    def finish(self, context):
+        return {'FINISHED'}
+
+    def rollback(self, context):
+        pass
+
+    def execute(self, context):
+        try:
+            for _ in self.start(context):
+                pass
+        except Exception as e:
+            self.rollback(context)
+            self.report({'ERROR'}, f"{type(e).__name__}: {e}")
+            return {'CANCELLED'}
+        return self.finish(context)
+
+    def invoke(self, context, event):
+        self.steps = self.start(context)
+        self.progress_total = None
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(MODAL_TIMER_SECONDS, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            self.end_modal(context)
+            self.rollback(context)
+            self.report({'WARNING'}, f"{self.status_text} cancelled, changes rolled back")
+            return {'CANCELLED'}
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        deadline = time.perf_counter() + MODAL_SLICE_SECONDS
+        try:
+            while True:
+                done, total = next(self.steps)
+                if time.perf_counter() >= deadline:
+                    break
+        except StopIteration:
+            self.end_modal(context)
+            return self.finish(context)
+        except Exception as e:
+            self.end_modal(context)
+            self.rollback(context)
+            self.report({'ERROR'}, f"{type(e).__name__}: {e}")
+            return {'CANCELLED'}
+        self.update_progress(context, done, total)
+        return {'RUNNING_MODAL'}
+
+    def update_progress(self, context, done, total):
+        wm = context.window_manager
+        if self.progress_total is None:
+            wm.progress_begin(0, total)
+            self.progress_total = total
+        wm.progress_update(done)
+        context.workspace.status_text_set(f"{self.status_text}: {done} of {total} (ESC to cancel)")
+
+    def end_modal(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        if self.progress_total is not None:
+            wm.progress_end()
+        context.workspace.status_text_set(None)
+
+
+class BTN_OP_create_grease_objects(ModalStepsOperator):
     bl_idname = 'pg.create_objects'
     bl_label = 'Start Processing'
     bl_description = 'Create Grease Pencil Objects from Papagayo-NG files'
+    status_text = "Creating Grease Pencil objects"
 
-    def execute(self, context):
+    def start(self, context):
+        scene = bpy.types.Scene
+        self.created = []
+        return create_grease_objects_steps(scene.pg_path, self.created)
 
-        scn = context.scene
-        obj = context.active_object
+    def finish(self, context):
         scene = bpy.types.Scene
-        create_grease_objects(scene.pg_path)
         scene.pg_objects_created = True
         return {'FINISHED'}
 
+    def rollback(self, context):
+        rollback_grease_objects(self.created)
 
-class BTN_OP_apply_to_timeline(Operator):
+
+class BTN_OP_apply_to_timeline(ModalStepsOperator):
     bl_idname = 'pg.apply_timeline'
     bl_label = 'Start Processing'
     bl_description = 'Create Grease Pencil Objects from Papagayo-NG files'
+    status_text = "Applying keyframes"
+
+    def start(self, context):
+        scene = bpy.types.Scene
+        self.stats = new_fill_stats()
+        self.journal = []
+        return fill_timeline_steps(scene.pg_path, self.stats, self.journal)
+
+    def rollback(self, context):
+        rollback_fill(self.journal)
+
+    def finish(self, context):
+        discard_fill_journal(self.journal)
+        stats = self.stats
+        if stats["removed"]:
+            self.report({'INFO'}, f"Timing reduction removed {stats['removed']} keyframes")
+        if stats["unchanged"]:
+            self.report({'INFO'}, f"{stats['unchanged']} keyframes unchanged since the last apply")
+        if stats["instanced"]:
+            self.report({'INFO'}, f"{stats['instanced']} of {stats['keys']} keyframes share their drawing, "
+                                  f"{stats['points']} stroke points not duplicated")
+        else:
+            self.report({'INFO'}, f"{stats['keys']} keyframes copied")
+        return {'FINISHED'}
+
+
+class BTN_OP_apply_fcurves(Operator):
+    bl_idname = 'pg.apply_fcurves'
+    bl_label = 'Write F-Curves'
+    bl_description = 'Write the lipsync timing into F-Curves of shape keys or a viseme index property'
+
+    def execute(self, context):
+
+        scene = bpy.types.Scene
+        try:
+            stats = apply_fcurves(scene.pg_path)
+        except (ValueError, KeyError, TypeError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"{stats['keys']} keyframes written to {stats['curves']} F-Curves")
+        return {'FINISHED'}
+
+
+class BTN_OP_enable_playback(Operator):
+    bl_idname = 'pg.enable_playback'
+    bl_label = 'Live Playback'
+    bl_description = 'Show the phoneme layers by hiding and unhiding them on frame change, without copying any frames'
+
+    def execute(self, context):
+
+        scene = bpy.types.Scene
+        try:
+            stats = enable_playback(scene.pg_path)
+        except KeyError as e:
+            # No playback for only some of the voices
+            disable_playback()
+            self.report({'ERROR'}, f"Missing Grease Pencil data {e}, create the objects first.")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Live playback of {stats['keys']} keyframes in {stats['voices']} voices")
+        return {'FINISHED'}
+
+
+class BTN_OP_disable_playback(Operator):
+    bl_idname = 'pg.disable_playback'
+    bl_label = 'Stop Live Playback'
+    bl_description = 'Stop the live playback and give the phoneme layers their visibility from before it back'
+
+    def execute(self, context):
+
+        disable_playback()
+        return {'FINISHED'}
+
+
+class BTN_OP_bake_playback(Operator):
+    bl_idname = 'pg.bake_playback'
+    bl_label = 'Bake Playback'
+    bl_description = 'Replace the live playback with real keyframes on the combined layers, e.g. for final renders'
 
     def execute(self, context):
 
-        scn = context.scene
-        obj = context.active_object
         scene = bpy.types.Scene
-        fill_timeline(scene.pg_path)
+        try:
+            stats = bake_playback(scene.pg_path)
+        except KeyError as e:
+            self.report({'ERROR'}, f"Missing Grease Pencil data {e}, create the objects first.")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"{stats['keys']} keyframes baked")
+        return {'FINISHED'}
+
+
+class BTN_OP_apply_time_offset(Operator):
+    bl_idname = 'pg.apply_time_offset'
+    bl_label = 'Key Mouth Chart'
+    bl_description = ('Copy every phoneme drawing once into a mouth chart layer and key a Time Offset modifier '
+                      'showing the spoken one')
+
+    def execute(self, context):
+
+        scene = bpy.types.Scene
+        try:
+            stats = apply_time_offset(scene.pg_path)
+        except (ValueError, KeyError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"{stats['drawings']} drawings in the mouth charts, {stats['keys']} offset keyframes")
+        return {'FINISHED'}
 
+
+class BTN_OP_remove_time_offset(Operator):
+    bl_idname = 'pg.remove_time_offset'
+    bl_label = 'Remove Mouth Chart'
+    bl_description = ('Remove the mouth chart layers and their Time Offset modifiers and show the phoneme layers '
+                      'as they were before')
+
+    def execute(self, context):
+
+        scene = bpy.types.Scene
+        try:
+            voices = remove_time_offset(scene.pg_path)
+        except (ValueError, KeyError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Mouth chart removed from {voices} voices")
         return {'FINISHED'}
 
 
+def use_cache_changed(self, context):
+    # Projects parsed with the other loader must not be returned anymore
+    project_cache.invalidate()
+
+
 class MyProperties(PropertyGroup):
 
     rest_frames: BoolProperty(
@@ -71,11 +329,77 @@ class MyProperties(PropertyGroup):
         description="If enabled inserts rest frames into empty frames after words and phrases.",
         default=False
         )
+    rest_min_gap: IntProperty(
+        name="Minimum Rest Gap",
+        description="Silences between words shorter than this many frames keep the last mouth shape.",
+        default=1,
+        min=1,
+        max=240
+    )
+    rest_after: IntProperty(
+        name="Rest After",
+        description="Frames the last mouth shape is held after the end of a word before the rest shape is shown. "
+                    "A rest also follows the last word, up to the end frame of the project.",
+        default=0,
+        min=0,
+        max=240
+    )
     load_sound: BoolProperty(
         name="Load the Sound File",
         description="If enabled the sound file will be imported when creating the Grease Pencil Objects.",
         default=True
     )
+    use_cache: BoolProperty(
+        name="Use Binary Cache",
+        description="Store the parsed project in a binary .pgcache file next to it (or in PAPAGAYO_CACHE_DIR) and reuse it while the project is unchanged.",
+        default=True,
+        update=use_cache_changed
+    )
+    min_hold: IntProperty(
+        name="Minimum Hold",
+        description="Every mouth shape stays at least this many frames, shorter phonemes are moved or dropped.",
+        default=1,
+        min=1,
+        max=24
+    )
+    step: IntProperty(
+        name="Step",
+        description="Snap keyframes to multiples of this many frames, 2 animates on twos.",
+        default=1,
+        min=1,
+        max=24
+    )
+    incremental: BoolProperty(
+        name="Update Changed Keys Only",
+        description="When the timeline was applied before, only add, remove or replace the keyframes that differ from the last apply.",
+        default=True
+    )
+    import_mode: EnumProperty(
+        name="Mode",
+        description="What the lipsync timing is applied to.",
+        items=[
+            ('GREASE_PENCIL', "Grease Pencil", "Copy the phoneme drawings into a combined Grease Pencil layer"),
+            ('SHAPE_KEYS', "Shape Keys", "Key one shape key per phoneme, 1 while the phoneme is shown and 0 otherwise"),
+            ('VISEME_PROPERTY', "Viseme Index", "Key an integer custom property with the index of the shown phoneme, "
+                                                "on the object or one of its pose bones"),
+        ],
+        default='GREASE_PENCIL'
+    )
+    viseme_property: StringProperty(
+        name="Property",
+        description="Name of the viseme index property, the voice name is appended when there are several voices.",
+        default="viseme"
+    )
+    viseme_bone: StringProperty(
+        name="Bone",
+        description="Pose bone holding the viseme index property, leave empty to use the object itself.",
+        default=""
+    )
+    share_drawings: BoolProperty(
+        name="Share Repeated Drawings",
+        description="Keyframes of a phoneme that was already placed instance its drawing instead of copying all strokes. Needs Grease Pencil v3 (Blender 4.3+), older versions always copy.",
+        default=True
+    )
 
 
 class PapagayoNGImporterUI(bpy.types.Panel):
@@ -94,6 +418,18 @@ class PapagayoNGImporterUI(bpy.types.Panel):
         col = layout.column()
         mytool = context.scene.my_tool
         col.prop(mytool, "rest_frames")
+        if mytool.rest_frames:
+            col.prop(mytool, "rest_min_gap")
+            col.prop(mytool, "rest_after")
+        col.prop(mytool, "use_cache")
+        col.prop(mytool, "min_hold")
+        col.prop(mytool, "step")
+        row = col.row()
+        row.enabled = drawings_can_be_shared()
+        row.prop(mytool, "share_drawings")
+        if not row.enabled:
+            col.label(text="Sharing drawings needs Grease Pencil v3 (Blender 4.3+).", icon="INFO")
+        col.prop(mytool, "incremental")
         col.operator('test.open_filebrowser', text="Select Papagayo-NG Project File")
         col.separator()
         if scene.pg_path:
@@ -105,6 +441,14 @@ class PapagayoNGImporterUI(bpy.types.Panel):
             col.label(text="Used Phonemes:")
             for phoneme in get_list_of_phonemes(scene.pg_path):
                 col.label(text=phoneme)
+            col.prop(mytool, "import_mode")
+            if mytool.import_mode != 'GREASE_PENCIL':
+                if mytool.import_mode == 'VISEME_PROPERTY':
+                    col.prop(mytool, "viseme_property")
+                    col.prop(mytool, "viseme_bone")
+                col.label(text="Keys the object named like the voice, else the active one.")
+                col.operator("pg.apply_fcurves", text="Write F-Curves")
+                return
             col.prop(mytool, "load_sound")
             col.operator("pg.create_objects", text="Create Grease Pencil Objects")
         if scene.pg_objects_created:
@@ -115,76 +459,134 @@ class PapagayoNGImporterUI(bpy.types.Panel):
             col.label(text="Draw all Phonemes and press the next button.")
             col.separator()
             col.operator("pg.apply_timeline", text="Apply to Timeline")
+            if playback_tracks:
+                col.operator("pg.bake_playback", text="Bake Live Playback to Frames")
+                col.operator("pg.disable_playback", text="Stop Live Playback")
+            else:
+                col.operator("pg.enable_playback", text="Live Playback (no Frame Copies)")
+            col.operator("pg.apply_time_offset", text="Key Mouth Chart (Time Offset)")
+            col.operator("pg.remove_time_offset", text="Remove Mouth Chart")
+
+
+def get_project(file_path):
+    return project_cache.get(file_path)
 
 
 def get_list_of_phonemes(file_path):
-    papagayo_file = open(file_path, "r")
-    papagayo_json = json.load(papagayo_file)
+    project = get_project(file_path)
     list_of_used_phonemes = []
-    if file_path.endswith(".pg2"):
-        for voice in papagayo_json["voices"]:
-            list_of_used_phonemes.append(voice["name"] + ":")
-            for phoneme_left, phoneme_right in zip(voice["used_phonemes"][::2], voice["used_phonemes"][1::2]):
-                list_of_used_phonemes.append("{}  |  {}".format(phoneme_left, phoneme_right))
-    else:
-        list_of_used_phonemes.append(papagayo_json["name"] + ":")
-        for phoneme_left, phoneme_right in zip(papagayo_json["used_phonemes"][::2], papagayo_json["used_phonemes"][1::2]):
-            list_of_used_phonemes.append("{}  |  {}".format(phoneme_left, phoneme_right))
-    papagayo_file.close()
+    for voice in project.voices:
+        list_of_used_phonemes.append(voice.name + ":")
+        list_of_used_phonemes.extend(phoneme_pairs(voice.used_phonemes))
     return list_of_used_phonemes
 
 
+def timed_keys(voice, end_frame=None):
+    """Return (keys, removed) of 'voice' with the rest and timing reduction settings of the scene.
+    No rest key is placed after 'end_frame', the last frame of the project.
+    """
+    my_tool = bpy.context.scene.my_tool
+    # Rest keys go into the silences after words, repeated phonemes are merged
+    keys = voice_keyframes(voice, my_tool.rest_frames, my_tool.rest_min_gap, my_tool.rest_after, end_frame)
+    return reduce_keyframes(keys, my_tool.min_hold, my_tool.step)
+
+
+def same_file(path, other):
+    return os.path.normcase(os.path.abspath(path)) == os.path.normcase(os.path.abspath(other))
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def strip_owners(editor):
+    """Return {strip name: the strip collection holding it}, strips nested in meta strips included."""
+    owners = {}
+    pending = [editor.sequences]
+    while pending:
+        sequences = pending.pop()
+        for strip in sequences:
+            owners[strip.name] = sequences
+            if strip.type == 'META':
+                pending.append(strip.sequences)
+    return owners
+
+
+def project_sound_strip(scene, sound_path):
+    """Return the sound strip of 'sound_path' in the sequencer of 'scene'.
+
+    Strips and sound datablocks are matched by absolute path, so importing again
+    reuses them. When the file changed since it was loaded the strip and its
+    datablock are replaced, also inside meta strips. Strips are added through the sequence editor data,
+    no area has to be switched, which also works under 'blender -b'.
+    """
+    sound_path = os.path.abspath(sound_path)
+    if not os.path.isfile(sound_path):
+        raise ValueError(f"Sound file does not exist: {sound_path}")
+    stamp = file_stamp(sound_path)
+    editor = scene.sequence_editor or scene.sequence_editor_create()
+    owners = None
+    # A copy, removing strips while iterating the live collection would skip the next one
+    for strip in list(editor.sequences_all):
+        if strip.type != 'SOUND' or strip.sound is None:
+            continue
+        if not same_file(bpy.path.abspath(strip.sound.filepath), sound_path):
+            continue
+        if strip.sound.get(SOUND_STAMP_PROPERTY) == stamp:
+            return strip
+        if owners is None:
+            owners = strip_owners(editor)
+        owners[strip.name].remove(strip)
+    # Datablocks of this file left without strips are stale copies of the decoded audio
+    for sound in list(bpy.data.sounds):
+        if sound.users == 0 and same_file(bpy.path.abspath(sound.filepath), sound_path):
+            bpy.data.sounds.remove(sound)
+    strip = editor.sequences.new_sound(os.path.basename(sound_path), sound_path, 1, 0)
+    strip.sound[SOUND_STAMP_PROPERTY] = stamp
+    return strip
+
+
 def create_grease_objects(file_path):
-    papagayo_file = open(file_path, "r")
-    papagayo_json = json.load(papagayo_file)
-    FPS = papagayo_json["fps"]
+    for _ in create_grease_objects_steps(file_path):
+        pass
+
+
+def create_grease_objects_steps(file_path, created=None):
+    """Generator creating the Grease Pencil object of one voice per step, yields (voices done, voices).
+    With 'created' a list, (object, new Grease Pencil data or None) is appended for every
+    voice, for rollback_grease_objects().
+    """
+    project = get_project(file_path)
+    FPS = project.fps
     bpy.context.scene.render.fps = FPS
     scene = bpy.types.Scene
-    sound_path = ""
-    if bpy.context.scene.my_tool.load_sound:
-        if os.path.isabs(papagayo_json["sound_path"]):
-            sound_path = papagayo_json["sound_path"]
-        else:
-            sound_path = os.path.join(os.path.dirname(file_path), papagayo_json["sound_path"])
-        if not bpy.data.sounds.items():
-            bpy.ops.sound.open_mono(filepath=sound_path)
-        scene.pg_sound_data = bpy.data.sounds[0]
-        prev_area_type = bpy.context.area.type
-        bpy.context.area.type = 'SEQUENCE_EDITOR'
-        bpy.ops.sequencer.sound_strip_add(filepath=sound_path, frame_start=0, channel=1)
-        bpy.context.area.type = prev_area_type
+    sound_path = project.resolve_sound_path()
+    if bpy.context.scene.my_tool.load_sound and sound_path:
+        scene.pg_sound_data = project_sound_strip(bpy.context.scene, sound_path).sound
     
-    if file_path.endswith(".pg2"):
-        # Audio loads fine, can be used with manually added speaker, but this speaker stays silent...
-        """
-        if not bpy.data.speakers.items():
-            bpy.ops.object.speaker_add()
+    # Audio loads fine, can be used with manually added speaker, but this speaker stays silent...
+    """
+    if not bpy.data.speakers.items():
+        bpy.ops.object.speaker_add()
 
-        speaker = bpy.data.speakers[0]
-        speaker.sound = scene.pg_sound_data
-        """
-        NUM_FRAMES = papagayo_json["sound_duration"]
-    else:
-        NUM_FRAMES = papagayo_json["end_frame"]
+    speaker = bpy.data.speakers[0]
+    speaker.sound = scene.pg_sound_data
+    """
+    NUM_FRAMES = project.duration
     FRAMES_SPACING = 1  # distance between frames
     bpy.context.scene.frame_start = 0
     bpy.context.scene.frame_end = NUM_FRAMES*FRAMES_SPACING
     bpy.context.scene.frame_current = 0
-    voice_list = []
-    if file_path.endswith(".pg2"):
-        voice_list = papagayo_json["voices"]
-    else:
-        voice_list.append(papagayo_json)
-    for voice in voice_list:
-        curr_name = voice["name"]
-        prev_mode = bpy.context.object.mode
-        bpy.ops.object.mode_set(mode='OBJECT')
-        bpy.ops.object.gpencil_add(align="WORLD", location=[0, 0, 0],
-                                   scale=[1, 1, 1], type="EMPTY")
-        bpy.context.object.name = str(curr_name) + "_stroke"
+    for done, voice in enumerate(project.voices, 1):
+        curr_name = voice.name
+        new_data = None
         if curr_name not in bpy.data.grease_pencils:
-            bpy.data.grease_pencils.new(curr_name)
-        for phoneme in voice["used_phonemes"]:
+            new_data = bpy.data.grease_pencils.new(curr_name)
+        stroke_object = add_stroke_object(str(curr_name) + "_stroke", bpy.data.grease_pencils[curr_name])
+        if created is not None:
+            created.append((stroke_object, new_data))
+        for phoneme in voice.used_phonemes:
             if phoneme not in bpy.data.grease_pencils[curr_name].layers:
                 bpy.data.grease_pencils[curr_name].layers.new(phoneme)
             pho_layer = bpy.data.grease_pencils[curr_name].layers[phoneme]
@@ -192,98 +594,699 @@ def create_grease_objects(file_path):
                 frame = pho_layer.frames[0]
             except IndexError:
                 pho_layer.frames.new(0)
-        bpy.data.objects[curr_name + "_stroke"].data = bpy.data.grease_pencils[curr_name]
-        bpy.ops.object.mode_set(prev_mode)
-    papagayo_file.close()
+        yield done, len(project.voices)
+
+
+def add_stroke_object(name, grease_pencil):
+    """Add an object showing 'grease_pencil' to the scene and return it.
+    Without an area to run the operators in, e.g. under 'blender -b', the data API is used.
+    """
+    if bpy.context.area is None:
+        stroke_object = bpy.data.objects.new(name, grease_pencil)
+        bpy.context.scene.collection.objects.link(stroke_object)
+        return stroke_object
+    prev_mode = bpy.context.object.mode
+    bpy.ops.object.mode_set(mode='OBJECT')
+    bpy.ops.object.gpencil_add(align="WORLD", location=[0, 0, 0],
+                               scale=[1, 1, 1], type="EMPTY")
+    # The new object, Blender renames it when an earlier import left one of that name
+    stroke_object = bpy.context.object
+    stroke_object.name = name
+    stroke_object.data = grease_pencil
+    bpy.ops.object.mode_set(prev_mode)
+    return stroke_object
+
+
+def rollback_grease_objects(created):
+    """Remove the objects and Grease Pencil data listed by create_grease_objects_steps()."""
+    for stroke_object, new_data in reversed(created):
+        bpy.data.objects.remove(stroke_object, do_unlink=True)
+        if new_data is not None:
+            bpy.data.grease_pencils.remove(new_data)
+    created.clear()
+
+
+def drawings_can_be_shared():
+    """Whether keyframes can share one drawing, Grease Pencil v3 (Blender 4.3+) only."""
+    return bpy.app.version >= (4, 3, 0)
+
+
+def drawing_points(frame):
+    drawing = getattr(frame, "drawing", frame)
+    return sum(len(stroke.points) for stroke in getattr(drawing, "strokes", ()))
+
+
+# foreach_get()/foreach_set() key and values per element of the attribute types a drawing can have
+ATTRIBUTE_ITEMS = {
+    'FLOAT': ("value", 1), 'INT': ("value", 1), 'INT8': ("value", 1), 'BOOLEAN': ("value", 1),
+    'FLOAT2': ("vector", 2), 'INT32_2D': ("value", 2), 'FLOAT_VECTOR': ("vector", 3),
+    'FLOAT_COLOR': ("color", 4), 'BYTE_COLOR': ("color", 4), 'QUATERNION': ("value", 4),
+    'FLOAT4X4': ("value", 16),
+}
+
+
+def attribute_values(attribute):
+    """Return (foreach key, flat values) of a drawing attribute, None for internal and unknown types."""
+    item = ATTRIBUTE_ITEMS.get(attribute.data_type)
+    if item is None or attribute.is_internal:
+        return None
+    key, width = item
+    values = [0] * (len(attribute.data) * width)
+    attribute.data.foreach_get(key, values)
+    return key, values
+
+
+def copy_drawing(source, target):
+    """Copy the strokes of the Grease Pencil v3 drawing 'source' into the empty drawing 'target'.
+    v3 frames can only be copied within a layer, so the attributes are copied one by one.
+    """
+    sizes = [len(stroke.points) for stroke in source.strokes]
+    if not sizes:
+        return
+    target.add_strokes(sizes)
+    for attribute in source.attributes:
+        item = attribute_values(attribute)
+        if item is None:
+            continue
+        key, values = item
+        copied = target.attributes.get(attribute.name)
+        if copied is None:
+            copied = target.attributes.new(attribute.name, attribute.data_type, attribute.domain)
+        copied.data.foreach_set(key, values)
+    if hasattr(target, "tag_positions_changed"):
+        target.tag_positions_changed()
+
+
+# Stroke point properties of Grease Pencil v2 and their values per point
+POINT_PROPERTIES = (("co", 3), ("pressure", 1), ("strength", 1), ("vertex_color", 4))
+
+
+def drawing_signature(frame):
+    """Return a short hash of the strokes of a phoneme frame, it changes whenever the drawing is edited."""
+    digest = hashlib.sha1()
+    drawing = getattr(frame, "drawing", None)
+    if drawing is not None:
+        for attribute in sorted(drawing.attributes, key=lambda attribute: attribute.name):
+            item = attribute_values(attribute)
+            if item is not None:
+                digest.update(attribute.name.encode("utf-8"))
+                digest.update(array("d", item[1]).tobytes())
+        return digest.hexdigest()[:16]
+    for stroke in frame.strokes:
+        points = stroke.points
+        for name, width in POINT_PROPERTIES:
+            values = [0.0] * (len(points) * width)
+            points.foreach_get(name, values)
+            digest.update(array("d", values).tobytes())
+        digest.update(f"{stroke.line_width}:{stroke.material_index}:{stroke.use_cyclic}".encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+def key_drawing(combined_layer, name, base_frame, frame_number, placed, stats):
+    """Key 'base_frame' at 'frame_number' on the combined layer.
+
+    Grease Pencil v2 copies the whole frame. On v3 the first keyframe of a
+    drawing is a copy and, with 'placed', later ones instance the drawing of
+    that first keyframe. 'placed' maps the phoneme layer names of the voice to
+    the frame number of their first copy. Only keyframes that really share the
+    drawing are counted as instanced.
+    """
+    stats["keys"] += 1
+    if not hasattr(base_frame, "drawing"):
+        new_frame = combined_layer.frames.copy(base_frame)
+        new_frame.frame_number = frame_number
+        return
+    first_number = placed.get(name) if placed is not None else None
+    if first_number is None:
+        copy_drawing(base_frame.drawing, combined_layer.frames.new(frame_number).drawing)
+        if placed is not None:
+            placed[name] = frame_number
+        return
+    new_frame = combined_layer.frames.copy(first_number, frame_number, instance_drawing=True)
+    first_frame = combined_layer.get_frame_at(first_number)
+    if first_frame is not None and new_frame.drawing.as_pointer() == first_frame.drawing.as_pointer():
+        stats["instanced"] += 1
+        stats["points"] += drawing_points(new_frame)
+
+
+def clear_layer(layer):
+    if hasattr(layer, "clear"):
+        layer.clear()
+        return
+    # Grease Pencil v3 layers have no clear()
+    for frame_number in [frame.frame_number for frame in layer.frames]:
+        layer.frames.remove(frame_number)
+
+
+def remove_frame(layer, frame):
+    try:
+        layer.frames.remove(frame)
+    except TypeError:
+        # Grease Pencil v3 removes by frame number
+        layer.frames.remove(frame.frame_number)
+
+
+def copy_frames(source, target):
+    """Copy all frames of the layer 'source' into the empty layer 'target', drawings shared by
+    several v3 frames stay shared.
+    """
+    first_numbers = {}
+    for frame in source.frames:
+        frame_number = frame.frame_number
+        if not hasattr(frame, "drawing"):
+            target.frames.copy(frame).frame_number = frame_number
+            continue
+        first_number = first_numbers.setdefault(frame.drawing.as_pointer(), frame_number)
+        if first_number == frame_number:
+            copy_drawing(frame.drawing, target.frames.new(frame_number).drawing)
+        else:
+            target.frames.copy(first_number, frame_number, instance_drawing=True)
+
+
+class FillUndo:
+    """What rollback_fill() needs to undo the changes of fill_timeline_steps() to one voice.
+
+    'snapshot' is a hidden copy of the combined layer, taken before the first
+    frame of it is cleared or removed. Until then 'added' holds the numbers of
+    the frames keyed, which is all there is to undo.
+    """
+    __slots__ = ("grease_pencil", "voice_name", "created", "previous", "snapshot", "added")
+
+    def __init__(self, grease_pencil, voice_name, created, previous):
+        self.grease_pencil = grease_pencil
+        self.voice_name = voice_name
+        self.created = created
+        self.previous = previous
+        self.snapshot = None
+        self.added = []
+
+    def before_change(self, combined_layer):
+        """Keep a copy of 'combined_layer' before frames of it are cleared or removed."""
+        if self.created or self.snapshot is not None:
+            return
+        self.snapshot = self.grease_pencil.layers.new(self.voice_name + "combined" + SNAPSHOT_SUFFIX)
+        self.snapshot.hide = True
+        copy_frames(combined_layer, self.snapshot)
+
+    def keyed(self, frame_number):
+        if self.snapshot is None:
+            self.added.append(frame_number)
+
+
+def new_fill_stats():
+    return {"keys": 0, "instanced": 0, "points": 0, "removed": 0, "unchanged": 0}
 
 
 def fill_timeline(file_path):
-    papagayo_file = open(file_path, "r")
-    papagayo_json = json.load(papagayo_file)
-    last_pos = 0
-    voice_list = []
-    if file_path.endswith(".pg2"):
-        for voice in papagayo_json["voices"]:
-            voice_list.append(voice)
+    """Key the phoneme drawings of every voice on its combined layer and return
+    {"keys": keyframes, "instanced": keyframes sharing a drawing, "points": stroke points not copied,
+    "removed": keys dropped by the timing reduction, "unchanged": keys kept from the last apply}.
+
+    The applied keys are stored in a custom property of the Grease Pencil data, with
+    'incremental' a later apply only touches the keys that differ from them.
+    """
+    stats = new_fill_stats()
+    for _ in fill_timeline_steps(file_path, stats):
+        pass
+    return stats
+
+
+def fill_timeline_steps(file_path, stats, journal=None):
+    """Generator doing the work of fill_timeline() into 'stats', yields (done, total) after every keyframe.
+    With 'journal' a list, a FillUndo is appended before a voice is touched, for rollback_fill().
+    """
+    project = get_project(file_path)
+    my_tool = bpy.context.scene.my_tool
+    share_drawings = my_tool.share_drawings
+    voice_keys = []
+    for voice in project.voices:
+        keys, removed = timed_keys(voice, project.last_frame)
+        stats["removed"] += removed
+        voice_keys.append((voice.name, keys))
+    total = sum(len(keys) for _, keys in voice_keys)
+    done = 0
+
+    for curr_name, keys in voice_keys:
+        grease_pencil = bpy.data.grease_pencils[curr_name]
+        placed = {} if share_drawings else None
+        previous = grease_pencil.get(APPLIED_KEYS_PROPERTY)
+        signatures = {phoneme: drawing_signature(grease_pencil.layers[phoneme].frames[0])
+                      for phoneme in sorted({phoneme for _, phoneme in keys}) if phoneme in grease_pencil.layers}
+        recorded = None
+        undo = None
+        created = curr_name + "combined" not in grease_pencil.layers
+        if journal is not None:
+            undo = FillUndo(grease_pencil, curr_name, created, previous)
+            journal.append(undo)
+        if not created:
+            combined_layer = grease_pencil.layers[curr_name + "combined"]
+            if my_tool.incremental:
+                recorded = decode_keyframe_record(previous).get(curr_name)
+            if recorded is None:  # TODO: Show a warning and allow to abort
+                if undo is not None:
+                    undo.before_change(combined_layer)
+                clear_layer(combined_layer)
+        else:
+            combined_layer = grease_pencil.layers.new(curr_name + "combined")
+
+        if recorded is None:
+            operations = [(frame, None, phoneme) for frame, phoneme in keys]
+        else:
+            # Keys of a phoneme drawn differently since the last apply are keyed again
+            redrawn = redrawn_phonemes(decode_drawing_signatures(previous).get(curr_name, {}), signatures)
+            diff = diff_keyframes(recorded, keys, redrawn)
+            operations = diff.operations()
+            stats["unchanged"] += len(diff.unchanged)
+            if placed is not None:
+                for frame, phoneme in diff.unchanged:
+                    placed.setdefault(phoneme, frame)
+        frames_by_number = {frame.frame_number: frame for frame in combined_layer.frames} if recorded else {}
+        for position, (frame, old_phoneme, phoneme) in enumerate(operations, 1):
+            if old_phoneme is not None:
+                if frame in frames_by_number:
+                    if undo is not None:
+                        undo.before_change(combined_layer)
+                    remove_frame(combined_layer, frames_by_number.pop(frame))
+                if placed is not None and placed.get(old_phoneme) == frame:
+                    del placed[old_phoneme]
+            if phoneme is not None:
+                base_frame = grease_pencil.layers[phoneme].frames[0]
+                key_drawing(combined_layer, phoneme, base_frame, frame, placed, stats)
+                if undo is not None:
+                    undo.keyed(frame)
+            yield done + len(keys) * position // len(operations), total
+        done += len(keys)
+        grease_pencil[APPLIED_KEYS_PROPERTY] = encode_keyframe_record({curr_name: keys}, {curr_name: signatures})
+
+
+def rollback_fill(journal):
+    """Undo a partial fill_timeline_steps() run. New combined layers are removed, the others get
+    their frames back from the snapshot or lose the frames keyed since.
+    """
+    for undo in reversed(journal):
+        grease_pencil = undo.grease_pencil
+        layers = grease_pencil.layers
+        combined_layer = layers[undo.voice_name + "combined"]
+        if undo.created:
+            layers.remove(combined_layer)
+        elif undo.snapshot is not None:
+            clear_layer(combined_layer)
+            copy_frames(undo.snapshot, combined_layer)
+            layers.remove(undo.snapshot)
+        else:
+            added = set(undo.added)
+            for frame in [frame for frame in combined_layer.frames if frame.frame_number in added]:
+                remove_frame(combined_layer, frame)
+        if undo.previous is None:
+            if APPLIED_KEYS_PROPERTY in grease_pencil:
+                del grease_pencil[APPLIED_KEYS_PROPERTY]
+        else:
+            grease_pencil[APPLIED_KEYS_PROPERTY] = undo.previous
+    journal.clear()
+
+
+def discard_fill_journal(journal):
+    """Remove the snapshots of a completed fill_timeline_steps() run."""
+    for undo in journal:
+        if undo.snapshot is not None:
+            undo.grease_pencil.layers.remove(undo.snapshot)
+    journal.clear()
+
+
+def import_project(file_path):
+    """Create the objects and fill the timeline of 'file_path' in one go, without operators or
+    interface so it also runs under 'blender -b'. Returns the fill_timeline() stats plus
+    "voices" and "seconds", the seconds spent parsing, creating objects and filling.
+    """
+    seconds = {}
+    start = time.perf_counter()
+    project_cache.invalidate(file_path)
+    voices = len(get_project(file_path).voices)
+    seconds["parse"] = time.perf_counter() - start
+    start = time.perf_counter()
+    create_grease_objects(file_path)
+    seconds["create"] = time.perf_counter() - start
+    start = time.perf_counter()
+    stats = fill_timeline(file_path)
+    seconds["fill"] = time.perf_counter() - start
+    stats.update(voices=voices, seconds=seconds)
+    return stats
+
+
+class PlaybackTrack:
+    """Frame sorted keys of one voice, the layers it toggles and the phoneme layer the handler currently shows."""
+    __slots__ = ("frames", "phonemes", "layers", "shown")
+
+    def __init__(self, keys, layers):
+        self.frames = array("i", (frame for frame, _ in keys))
+        self.phonemes = [phoneme for _, phoneme in keys]
+        self.layers = frozenset(layers)
+        self.shown = None
+
+    def phoneme_at(self, frame):
+        position = bisect_right(self.frames, frame) - 1
+        return self.phonemes[position] if position >= 0 else None
+
+
+def playback_frame_change(scene, *args):
+    """frame_change_pre handler, swaps the visible phoneme layer of every voice in live playback.
+    Only the layers of a voice whose phoneme changed are touched.
+    """
+    frame = scene.frame_current
+    for name, track in playback_tracks.items():
+        phoneme = track.phoneme_at(frame)
+        if phoneme not in track.layers:
+            phoneme = None
+        if phoneme == track.shown:
+            continue
+        grease_pencil = bpy.data.grease_pencils.get(name)
+        if grease_pencil is None:
+            continue
+        layers = grease_pencil.layers
+        if track.shown is not None and track.shown in layers:
+            layers[track.shown].hide = True
+        if phoneme is not None and phoneme in layers:
+            layers[phoneme].hide = False
+        track.shown = phoneme
+
+
+def hide_layers(grease_pencil, names, property_name):
+    """Hide the layers 'names' of 'grease_pencil', keeping the hide state they had before in the custom
+    property 'property_name' for restore_hidden_layers(). Layers already hidden by an earlier call keep
+    their original state.
+    """
+    layers = grease_pencil.layers
+    saved = dict(grease_pencil.get(property_name, {}).items())
+    for name in names:
+        if name in layers:
+            saved.setdefault(name, int(layers[name].hide))
+            layers[name].hide = True
+    grease_pencil[property_name] = saved
+
+
+def restore_hidden_layers(grease_pencil, property_name, restore=True):
+    """Give the layers hidden by hide_layers() their hide state back or, with 'restore' False, leave them hidden."""
+    layers = grease_pencil.layers
+    for name, hide in grease_pencil.get(property_name, {}).items():
+        if name in layers:
+            layers[name].hide = bool(hide) or not restore
+    if property_name in grease_pencil:
+        del grease_pencil[property_name]
+
+
+def start_playback_track(grease_pencil, keys, phonemes):
+    """Hide the layers of 'phonemes' and the combined layer of 'grease_pencil' and hand them to the playback handler.
+    Their hide state from before the playback is kept for disable_playback().
+    """
+    layers = grease_pencil.layers
+    # The combined layer holds the copied frames of an earlier apply, which would show through
+    names = [name for name in phonemes if name in layers] + [grease_pencil.name + "combined"]
+    hide_layers(grease_pencil, names, PLAYBACK_HIDE_PROPERTY)
+    playback_tracks[grease_pencil.name] = PlaybackTrack(keys, names)
+
+
+def install_playback_handler():
+    handlers = bpy.app.handlers.frame_change_pre
+    if playback_frame_change not in handlers:
+        handlers.append(playback_frame_change)
+
+
+def remove_playback_handler():
+    handlers = bpy.app.handlers.frame_change_pre
+    if playback_frame_change in handlers:
+        handlers.remove(playback_frame_change)
+
+
+@persistent
+def restore_playback(*args):
+    """load_post handler, resumes the live playback stored in a loaded .blend file."""
+    playback_tracks.clear()
+    for grease_pencil in bpy.data.grease_pencils:
+        record = decode_keyframe_record(grease_pencil.get(PLAYBACK_KEYS_PROPERTY, ""))
+        if grease_pencil.name in record:
+            phonemes = list(grease_pencil.get(PLAYBACK_HIDE_PROPERTY, {}).keys())
+            start_playback_track(grease_pencil, record[grease_pencil.name], phonemes)
+    if playback_tracks:
+        install_playback_handler()
+        playback_frame_change(bpy.context.scene)
     else:
-        voice_list.append(papagayo_json)
-    
-    for voice in voice_list:
-        curr_name = voice["name"]
-        if curr_name + "combined" in bpy.data.grease_pencils[curr_name].layers:  # TODO: Show a warning and allow to abort
-            bpy.data.grease_pencils[curr_name].layers[curr_name + "combined"].clear()
+        remove_playback_handler()
+
+
+def enable_playback(file_path):
+    """Show the phonemes of every voice by toggling the 'hide' state of its used phoneme layers on
+    frame change, instead of copying drawings into the combined layer. Return
+    {"voices": voices in playback, "keys": keys looked up by the handler, "removed": keys dropped by the timing reduction}.
+
+    The keys are stored in a custom property of the Grease Pencil data, so the
+    playback resumes when the .blend file is opened again.
+    """
+    project = get_project(file_path)
+    stats = {"voices": 0, "keys": 0, "removed": 0}
+    for voice in project.voices:
+        grease_pencil = bpy.data.grease_pencils[voice.name]
+        keys, removed = timed_keys(voice, project.last_frame)
+        stats["removed"] += removed
+        stats["keys"] += len(keys)
+        stats["voices"] += 1
+        grease_pencil[PLAYBACK_KEYS_PROPERTY] = encode_keyframe_record({voice.name: keys})
+        start_playback_track(grease_pencil, keys, voice.used_phonemes)
+    install_playback_handler()
+    playback_frame_change(bpy.context.scene)
+    return stats
+
+
+def disable_playback(restore_layers=True):
+    """Stop the live playback, the layers it toggled get their hide state from before it back or,
+    with 'restore_layers' False, stay hidden.
+    """
+    remove_playback_handler()
+    for name in playback_tracks:
+        grease_pencil = bpy.data.grease_pencils.get(name)
+        if grease_pencil is None:
+            continue
+        if PLAYBACK_KEYS_PROPERTY in grease_pencil:
+            del grease_pencil[PLAYBACK_KEYS_PROPERTY]
+        restore_hidden_layers(grease_pencil, PLAYBACK_HIDE_PROPERTY, restore_layers)
+    playback_tracks.clear()
+
+
+def bake_playback(file_path):
+    """Replace the live playback by keyframes on the combined layers and return the fill_timeline() stats."""
+    disable_playback(restore_layers=False)
+    stats = fill_timeline(file_path)
+    for voice in get_project(file_path).voices:
+        grease_pencil = bpy.data.grease_pencils[voice.name]
+        grease_pencil.layers[voice.name + "combined"].hide = False
+    return stats
+
+
+def ensure_action(id_block, name):
+    """Return the action animating 'id_block', created when there is none."""
+    anim_data = id_block.animation_data or id_block.animation_data_create()
+    if anim_data.action is None:
+        anim_data.action = bpy.data.actions.new(name)
+    return anim_data.action
+
+
+def write_fcurve(action, data_path, coordinates, group=""):
+    """Replace the F-Curve of 'data_path' with constant keys at the flat (frame, value) 'coordinates'.
+    All keys go in with one add() and two foreach_set() calls.
+    """
+    fcurve = action.fcurves.find(data_path)
+    if fcurve is not None:
+        action.fcurves.remove(fcurve)
+    fcurve = action.fcurves.new(data_path, action_group=group)
+    count = len(coordinates) // 2
+    fcurve.keyframe_points.add(count)
+    fcurve.keyframe_points.foreach_set("co", coordinates)
+    fcurve.keyframe_points.foreach_set("interpolation", [CONSTANT_INTERPOLATION] * count)
+    fcurve.update()
+    return count
+
+
+def fcurve_target(voice_name):
+    """Return the object keyed for a voice, the object named like the voice or else the active object."""
+    target = bpy.data.objects.get(voice_name) or bpy.context.active_object
+    if target is None:
+        raise ValueError(f"No object named '{voice_name}' and no active object to key.")
+    return target
+
+
+def apply_fcurves(file_path):
+    """Write the timing of every voice into F-Curves instead of Grease Pencil frames and return
+    {"curves": F-Curves written, "keys": keyframes written, "removed": keys dropped by the timing reduction}.
+    """
+    project = get_project(file_path)
+    my_tool = bpy.context.scene.my_tool
+    bpy.context.scene.render.fps = project.fps
+    stats = {"curves": 0, "keys": 0, "removed": 0}
+    for voice in project.voices:
+        keys, removed = timed_keys(voice, project.last_frame)
+        stats["removed"] += removed
+        channels = phoneme_channels(keys, voice.used_phonemes)
+        target = fcurve_target(voice.name)
+        action_name = f"{voice.name}_lipsync"
+        if my_tool.import_mode == 'SHAPE_KEYS':
+            if not hasattr(target, "shape_key_add"):
+                raise TypeError(f"'{target.name}' can't have shape keys.")
+            if target.data.shape_keys is None:
+                target.shape_key_add(name="Basis", from_mix=False)
+            key_blocks = target.data.shape_keys.key_blocks
+            for phoneme in channels:
+                if phoneme not in key_blocks:
+                    target.shape_key_add(name=phoneme, from_mix=False)
+            action = ensure_action(target.data.shape_keys, action_name)
+            for phoneme, coordinates in phoneme_value_coordinates(keys, channels).items():
+                stats["keys"] += write_fcurve(action, f'key_blocks["{phoneme}"].value', coordinates, voice.name)
+                stats["curves"] += 1
         else:
-            bpy.data.grease_pencils[curr_name].layers.new(curr_name + "combined")
-        for phrase in voice["phrases"]:
-            if bpy.context.scene.my_tool.rest_frames:
-                if phrase["start_frame"] > last_pos + 1:
-                    base_frame = bpy.data.grease_pencils[curr_name].layers["rest"].frames[0]
-                    new_frame = bpy.data.grease_pencils[curr_name].layers[curr_name + "combined"].frames.copy(base_frame)
-                    new_frame.frame_number = last_pos + 1
-            for word in phrase["words"]:
-                if bpy.context.scene.my_tool.rest_frames:
-                    if word["start_frame"] > last_pos + 1:
-                        base_frame = bpy.data.grease_pencils[curr_name].layers["rest"].frames[0]
-                        new_frame = bpy.data.grease_pencils[curr_name].layers[curr_name + "combined"].frames.copy(base_frame)
-                        new_frame.frame_number = last_pos + 1
-                for phoneme in word["phonemes"]:
-                    base_frame = bpy.data.grease_pencils[curr_name].layers[phoneme["text"]].frames[0]
-                    new_frame = bpy.data.grease_pencils[curr_name].layers[curr_name + "combined"].frames.copy(base_frame)
-                    new_frame.frame_number = phoneme["frame"]
-                    last_pos = phoneme["frame"]
-            
-        """
-        if bpy.context.scene.my_tool.rest_frames:
-            for frame in range(bpy.context.scene.frame_start, bpy.context.scene.frame_end):
-                exists = False
-                try:
-                    t_frame = bpy.data.grease_pencils[curr_name].layers[curr_name + "combined"].frames[frame]
-                    exists = True
-                except IndexError:
-                    exists = False
-                if exists:
-                    base_frame = bpy.data.grease_pencils[curr_name].layers["rest"].frames[-1]
-                    new_frame = bpy.data.grease_pencils[curr_name].layers[curr_name + "combined"].frames.copy(base_frame)
-                    new_frame.frame_number = frame
-        """
-    papagayo_file.close()
-    
+            name = my_tool.viseme_property if len(project.voices) == 1 else f"{my_tool.viseme_property}_{voice.name}"
+            owner, path = target, ""
+            if my_tool.viseme_bone:
+                if target.pose is None or my_tool.viseme_bone not in target.pose.bones:
+                    raise KeyError(f"'{target.name}' has no pose bone '{my_tool.viseme_bone}'.")
+                owner = target.pose.bones[my_tool.viseme_bone]
+                path = f'pose.bones["{my_tool.viseme_bone}"]'
+            owner[name] = 0
+            # The phoneme of every index, for drivers and readers of the file
+            owner[f"{name}_phonemes"] = ",".join(channels)
+            action = ensure_action(target, action_name)
+            stats["keys"] += write_fcurve(action, f'{path}["{name}"]', viseme_index_coordinates(keys, channels),
+                                          voice.name)
+            stats["curves"] += 1
+    return stats
+
+
+def grease_object(grease_pencil):
+    """Return the object showing 'grease_pencil'."""
+    for candidate in bpy.data.objects:
+        if candidate.data == grease_pencil:
+            return candidate
+    raise ValueError(f"No object uses the Grease Pencil data '{grease_pencil.name}', create the objects first.")
+
+
+def time_offset_modifier(stroke_object, layer_name):
+    """Return (modifier, offset data path) of the fixed frame Time Offset modifier of 'stroke_object'
+    showing only 'layer_name', added when missing.
+    """
+    if hasattr(stroke_object, "grease_pencil_modifiers"):
+        modifiers, collection = stroke_object.grease_pencil_modifiers, "grease_pencil_modifiers"
+        kind, layer_filter = 'GP_TIME', "layer"
+    else:
+        # Grease Pencil v3 shares the object modifier stack
+        modifiers, collection = stroke_object.modifiers, "modifiers"
+        kind, layer_filter = 'GREASE_PENCIL_TIME', "layer_filter"
+    modifier = modifiers.get(TIME_OFFSET_MODIFIER) or modifiers.new(TIME_OFFSET_MODIFIER, kind)
+    modifier.mode = 'FIX'
+    modifier.use_keep_loop = False
+    setattr(modifier, layer_filter, layer_name)
+    return modifier, f'{collection}["{modifier.name}"].offset'
+
+
+def apply_time_offset(file_path):
+    """Key every voice through a Time Offset modifier instead of copying drawings per keyframe and return
+    {"voices": voices keyed, "drawings": mouth chart frames, "keys": offset keyframes, "removed": keys dropped by the timing reduction}.
+
+    The phoneme drawings are copied once into the '<voice>chart' layer, the
+    drawing of the n-th phoneme on frame n. The modifier shows one fixed frame
+    of that layer and its offset is keyed with the chart frame of the spoken
+    phoneme, so the file weighs the same however long the shot is. The phoneme
+    and combined layers of the voice are hidden until remove_time_offset().
+    """
+    if playback_tracks:
+        # The layers get their own visibility back first, that is the one remove_time_offset() restores
+        disable_playback()
+    project = get_project(file_path)
+    stats = {"voices": 0, "drawings": 0, "keys": 0, "removed": 0}
+    copy_stats = new_fill_stats()
+    for voice in project.voices:
+        grease_pencil = bpy.data.grease_pencils[voice.name]
+        stroke_object = grease_object(grease_pencil)
+        keys, removed = timed_keys(voice, project.last_frame)
+        stats["removed"] += removed
+        channels = phoneme_channels(keys, voice.used_phonemes)
+        layers = grease_pencil.layers
+        chart_name = voice.name + "chart"
+        if chart_name in layers:
+            chart_layer = layers[chart_name]
+            clear_layer(chart_layer)
+        else:
+            chart_layer = layers.new(chart_name)
+        for index, phoneme in enumerate(channels):
+            if phoneme in layers:
+                key_drawing(chart_layer, phoneme, layers[phoneme].frames[0], index, None, copy_stats)
+            else:
+                chart_layer.frames.new(index)
+        hide_layers(grease_pencil, channels + [voice.name + "combined"], CHART_HIDE_PROPERTY)
+        chart_layer.hide = False
+        modifier, data_path = time_offset_modifier(stroke_object, chart_name)
+        action = ensure_action(stroke_object, f"{voice.name}_lipsync")
+        stats["keys"] += write_fcurve(action, data_path, viseme_index_coordinates(keys, channels), voice.name)
+        stats["drawings"] += len(channels)
+        stats["voices"] += 1
+    return stats
+
+
+def remove_time_offset(file_path):
+    """Remove the mouth chart layer, Time Offset modifier and offset F-Curve of every voice keyed by
+    apply_time_offset(), the layers it hid get their hide state back. Returns the number of voices.
+    """
+    project = get_project(file_path)
+    removed = 0
+    for voice in project.voices:
+        grease_pencil = bpy.data.grease_pencils.get(voice.name)
+        if grease_pencil is None:
+            continue
+        layers = grease_pencil.layers
+        chart_name = voice.name + "chart"
+        if chart_name not in layers and CHART_HIDE_PROPERTY not in grease_pencil:
+            continue
+        stroke_object = grease_object(grease_pencil)
+        for collection in ("grease_pencil_modifiers", "modifiers"):
+            modifiers = getattr(stroke_object, collection, None)
+            modifier = modifiers.get(TIME_OFFSET_MODIFIER) if modifiers is not None else None
+            if modifier is None:
+                continue
+            anim_data = stroke_object.animation_data
+            if anim_data is not None and anim_data.action is not None:
+                fcurve = anim_data.action.fcurves.find(f'{collection}["{modifier.name}"].offset')
+                if fcurve is not None:
+                    anim_data.action.fcurves.remove(fcurve)
+            modifiers.remove(modifier)
+        if chart_name in layers:
+            layers.remove(layers[chart_name])
+        restore_hidden_layers(grease_pencil, CHART_HIDE_PROPERTY)
+        removed += 1
+    return removed
+
 
 def create_keyframes(file_path):
-    papagayo_file = open(file_path, "r")
-    papagayo_json = json.load(papagayo_file)
-    FPS = papagayo_json["fps"]
+    project = get_project(file_path)
+    FPS = project.fps
     bpy.context.scene.render.fps = FPS
-    if file_path.endswith(".pg2"):
-        NUM_FRAMES = papagayo_json["sound_duration"]
-    else: NUM_FRAMES = papagayo_json["end_frame"]
+    NUM_FRAMES = project.duration
     FRAMES_SPACING = 1  # distance between frames
     bpy.context.scene.frame_start = 0
     bpy.context.scene.frame_end = NUM_FRAMES*FRAMES_SPACING
-    voice_list = []
-    if file_path.endswith(".pg2"):
-        for voice in papagayo_json["voices"]:
-            voice_list.append(voice)
-    else:
-        voice_list.append(papagayo_json)
 
-    for voice in voice_list:
+    for voice in project.voices:
         
-        curr_name = voice["name"]
+        curr_name = voice.name
         if curr_name not in bpy.data.grease_pencils:
             bpy.data.grease_pencils.new(curr_name)
-        for phrase in voice["phrases"]:
-            for word in phrase["words"]:
-                for phoneme in word["phonemes"]:
-                    if phoneme["text"] not in bpy.data.grease_pencils[curr_name].layers:
-                        bpy.data.grease_pencils[curr_name].layers.new(phoneme["text"])
-                    try:
-                        pho_frame = bpy.data.grease_pencils[curr_name].layers[phoneme["text"]].frames.new(phoneme["frame"])
-                    except RuntimeError:
-                        pass
+        for phoneme in voice.events():
+            if phoneme.text not in bpy.data.grease_pencils[curr_name].layers:
+                bpy.data.grease_pencils[curr_name].layers.new(phoneme.text)
+            try:
+                pho_frame = bpy.data.grease_pencils[curr_name].layers[phoneme.text].frames.new(phoneme.frame)
+            except RuntimeError:
+                pass
 
 
-classes = (PapagayoNGImporterUI, BTN_OP_create_grease_objects, BTN_OP_apply_to_timeline, OT_TestOpenFilebrowser, MyProperties)
+classes = (PapagayoNGImporterUI, BTN_OP_create_grease_objects, BTN_OP_apply_to_timeline, BTN_OP_apply_fcurves,
+           BTN_OP_enable_playback, BTN_OP_disable_playback, BTN_OP_bake_playback, BTN_OP_apply_time_offset,
+           BTN_OP_remove_time_offset, OT_TestOpenFilebrowser, MyProperties)
 
 
 def register():
@@ -293,9 +1296,13 @@ def register():
     for cls in classes:
         bpy.utils.register_class(cls)    
     bpy.types.Scene.my_tool = PointerProperty(type=MyProperties)
+    bpy.app.handlers.load_post.append(restore_playback)
 
 
 def unregister(): 
+    remove_playback_handler()
+    if restore_playback in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(restore_playback)
     for cls in classes:
         bpy.utils.unregister_class(cls)
     del bpy.types.Scene.my_tool
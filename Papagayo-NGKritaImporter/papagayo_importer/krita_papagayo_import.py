@@ -1,36 +1,268 @@
-import json
 import traceback
 from pathlib import Path
 
 from krita import DockWidget, Krita
+import hashlib
+import json
 import os
+import time
+
+from papagayo_core import (BufferCache, Profiler, decode_drawing_signatures, decode_keyframe_record, diff_keyframes,
+                           encode_keyframe_record, load_project_cached, phoneme_pairs, redrawn_phonemes,
+                           reduce_keyframes, stream_project, voice_keyframes)
+from papagayo_core.export import REST_PHONEME
+from papagayo_core.kra import verify_kra, write_lipsync_kra
 
 # Try to import Qt components with fallback for different Krita versions
 try:
     from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QFileDialog, 
                                 QPushButton, QCheckBox, QMessageBox, QApplication, 
-                                QProgressBar, QTextEdit, QHBoxLayout, QFrame)
-    from PyQt6.QtCore import Qt, QTimer
+                                QProgressBar, QTextEdit, QHBoxLayout, QFrame, QSpinBox)
+    from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal as Signal
 except ImportError:
     try:
         from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, QFileDialog, 
                                     QPushButton, QCheckBox, QMessageBox, QApplication, 
-                                    QProgressBar, QTextEdit, QHBoxLayout, QFrame)
-        from PyQt5.QtCore import Qt, QTimer
+                                    QProgressBar, QTextEdit, QHBoxLayout, QFrame, QSpinBox)
+        from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal as Signal
     except ImportError:
         try:
             from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QFileDialog, 
                                           QPushButton, QCheckBox, QMessageBox, QApplication, 
-                                          QProgressBar, QTextEdit, QHBoxLayout, QFrame)
-            from PySide6.QtCore import Qt, QTimer
+                                          QProgressBar, QTextEdit, QHBoxLayout, QFrame, QSpinBox)
+            from PySide6.QtCore import Qt, QTimer, QThread, Signal
         except ImportError:
             from PySide2.QtWidgets import (QWidget, QVBoxLayout, QLabel, QFileDialog, 
                                           QPushButton, QCheckBox, QMessageBox, QApplication, 
-                                          QProgressBar, QTextEdit, QHBoxLayout, QFrame)
-            from PySide2.QtCore import Qt, QTimer
+                                          QProgressBar, QTextEdit, QHBoxLayout, QFrame, QSpinBox)
+            from PySide2.QtCore import Qt, QTimer, QThread, Signal
 
 DOCKER_TITLE = 'Papagayo-NG Importer'
 VERSION = '1.1.0'
+DEFAULT_PIXEL_CACHE_MB = 512
+# The timeline is filled in slices of this many ms, Krita handles its events in between
+FILL_SLICE_MS = 40
+# Progress bar and status label are updated at most this often while filling
+PROGRESS_INTERVAL_MS = 250
+# Krita 5 timeline actions, repeated drawings become clones of their first keyframe
+CLONE_FRAMES_ACTION = "copy_frames_as_clones"
+PASTE_FRAMES_ACTION = "paste_frames_from_clipboard"
+REMOVE_FRAMES_ACTION = "remove_frames"
+# Document annotation with the keys applied to the combined layers, re-applying only touches what changed
+APPLIED_KEYS_ANNOTATION = "papagayo-ng/applied-keys"
+# Qt6 only exposes the orientation enum scoped
+HORIZONTAL = getattr(Qt, "Horizontal", None) or Qt.Orientation.Horizontal
+# Status label spinner while a file loads in the background
+SPINNER_FRAMES = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+SPINNER_INTERVAL_MS = 100
+
+
+def read_project(file_path, use_cache, progress=None):
+    """Decode and validate a Papagayo file, through the binary cache when 'use_cache' is set.
+    The file is decoded phrase by phrase, 'progress' gets (bytes read, total bytes).
+    """
+    if use_cache:
+        return load_project_cached(file_path, loader=lambda path: stream_project(path, progress=progress))
+    return stream_project(file_path, progress=progress)
+
+
+def phoneme_list_lines(project):
+    """Return the used phonemes of every voice as display lines, grouped in pairs."""
+    list_of_used_phonemes = []
+    
+    try:
+        for voice in project.voices:
+            list_of_used_phonemes.append(f"{voice.name}:")
+            
+            if voice.used_phonemes:
+                # Group phonemes in pairs for better display
+                for pair in phoneme_pairs(voice.used_phonemes):
+                    list_of_used_phonemes.append(f"  {pair}")
+            else:
+                list_of_used_phonemes.append("  No phonemes found")
+                
+    except Exception as e:
+        list_of_used_phonemes = [f"Error reading phonemes: {str(e)}"]
+        
+    return list_of_used_phonemes
+
+
+class ProjectLoader(QThread):
+    """Load, validate and summarize a Papagayo file off the GUI thread.
+    Every signal starts with the 'generation' of the load, so results of superseded loads can be told apart.
+    The result comes back through 'loaded' (file path, project, phoneme list lines) or 'failed' (file path, message).
+    """
+    progress = Signal(int, int)
+    loaded = Signal(int, str, object, object)
+    failed = Signal(int, str, str)
+
+    def __init__(self, generation, file_path, use_cache, parent=None):
+        super().__init__(parent)
+        self.generation = generation
+        self.file_path = file_path
+        self.use_cache = use_cache
+
+    def report_progress(self, bytes_read, total_bytes):
+        if total_bytes:
+            self.progress.emit(self.generation, min(100, int(bytes_read * 100 / total_bytes)))
+
+    def run(self):
+        try:
+            project = read_project(self.file_path, self.use_cache, self.report_progress)
+            self.loaded.emit(self.generation, self.file_path, project, phoneme_list_lines(project))
+        except json.JSONDecodeError as e:
+            self.failed.emit(self.generation, self.file_path, f"Invalid JSON file: {str(e)}")
+        except Exception as e:
+            self.failed.emit(self.generation, self.file_path, f"Error loading file: {str(e)}")
+
+
+class TimelineViewCache:
+    """Keep the Timeline docker frames view with its layer -> row and frame -> column maps.
+    The view is looked up once and the maps are built on first use. Everything is dropped when the
+    canvas changes or the model is reset or gets new columns, the rows also when rows are inserted or removed.
+    """
+
+    def __init__(self, find_view):
+        self.find_view = find_view
+        self._view = None
+        self._model = None
+        self._rows = None
+        self._columns = None
+
+    def view(self):
+        if self._view is None:
+            self._view = self.find_view()
+            self._model = None
+        return self._view
+
+    def model(self):
+        if self._model is None:
+            view = self.view()
+            if view is None:
+                return None
+            self._model = view.model()
+            if self._model is not None:
+                self._connect(self._model)
+        return self._model
+
+    def _connect(self, model):
+        for signal_name, slot in (("modelReset", self.invalidate), ("columnsInserted", self.invalidate),
+                                  ("columnsRemoved", self.invalidate), ("rowsInserted", self.invalidate_rows),
+                                  ("rowsRemoved", self.invalidate_rows), ("layoutChanged", self.invalidate_rows)):
+            try:
+                getattr(model, signal_name).connect(slot)
+            except Exception:
+                continue
+
+    def _disconnect(self, model):
+        for signal_name, slot in (("modelReset", self.invalidate), ("columnsInserted", self.invalidate),
+                                  ("columnsRemoved", self.invalidate), ("rowsInserted", self.invalidate_rows),
+                                  ("rowsRemoved", self.invalidate_rows), ("layoutChanged", self.invalidate_rows)):
+            try:
+                getattr(model, signal_name).disconnect(slot)
+            except Exception:
+                continue
+
+    def invalidate(self, *args):
+        if self._model is not None:
+            self._disconnect(self._model)
+        self._view = None
+        self._model = None
+        self._rows = None
+        self._columns = None
+
+    def invalidate_rows(self, *args):
+        self._rows = None
+
+    def row_for_layer(self, layer_name):
+        """Return the timeline row showing 'layer_name', or -1."""
+        model = self.model()
+        if model is None:
+            return -1
+        if self._rows is None or layer_name not in self._rows:
+            # Rows are rebuilt once for names that are missing, the layer may have been added since
+            self._rows = {}
+            try:
+                row_count = model.rowCount()
+            except Exception:
+                row_count = 0
+            for row in range(row_count):
+                try:
+                    self._rows.setdefault(model.data(model.index(row, 0)), row)
+                except Exception:
+                    continue
+        return self._rows.get(layer_name, -1)
+
+    def column_for_frame(self, frame):
+        """Map a frame number to a model column using the header data."""
+        model = self.model()
+        if self._columns is None:
+            self._columns = {}
+            try:
+                col_count = model.columnCount() if model is not None else 0
+            except Exception:
+                col_count = 0
+            for col in range(col_count):
+                try:
+                    hd = model.headerData(col, HORIZONTAL)
+                except Exception:
+                    hd = None
+                if hd is not None:
+                    self._columns.setdefault(str(hd), col)
+        # Fallback: assume column 0 is labels, frames start at 1
+        return self._columns.get(str(frame), frame + 1)
+
+
+class FillJob:
+    """Position and timing of a timeline fill that runs in slices.
+    Keys are applied one voice after another, 'combine_layer' is None before a voice is set up.
+    Every voice is a list of (frame, old phoneme, new phoneme) operations, 'old' set means the key at
+    that frame is removed first, 'new' set means it is keyed. 'applied' follows what the combined layer shows,
+    'signatures' are the drawing signatures of the phonemes of the current voice.
+    'incremental' jobs only key the differences to 'recorded'.
+    """
+
+    def __init__(self, voices, voice_keys, recorded=None, recorded_drawings=None, incremental=False):
+        self.voices = list(voices)
+        self.voice_keys = voice_keys
+        self.incremental = incremental
+        self.recorded = recorded if recorded is not None else {}
+        self.recorded_drawings = recorded_drawings if recorded_drawings is not None else {}
+        self.signatures = None
+        self.total = sum(len(keys) for keys in voice_keys.values())
+        self.done = 0
+        self.voice_index = 0
+        self.key_index = 0
+        self.operations = None
+        self.applied = None
+        self.group_layer = None
+        self.combine_layer = None
+        self.layers = None
+        self.last_frame = None
+        self.cancelled = False
+        self.started = time.perf_counter()
+        self.last_progress = 0.0
+
+    @property
+    def voice(self):
+        return self.voices[self.voice_index] if self.voice_index < len(self.voices) else None
+
+    def keys(self):
+        return self.voice_keys[self.voice.name]
+
+    def set_operations(self, operations, applied):
+        """Use 'operations' for the current voice instead of keying all of its keys."""
+        self.total += len(operations) - len(self.keys())
+        self.operations = operations
+        self.applied = applied
+
+    def eta(self):
+        """Return the estimated seconds left, None before the first key is done."""
+        if not self.done:
+            return None
+        elapsed = time.perf_counter() - self.started
+        return elapsed / self.done * (self.total - self.done)
+
 
 class PapagayoImporter(DockWidget):
 
@@ -51,8 +283,44 @@ class PapagayoImporter(DockWidget):
         self.log = log.__get__(self, self.__class__)
         super().__init__()
         self.papagayo_file_path = ""
-        self.papagayo_data = None
+        self.project = None
+        self.use_cache_checkbox = None
+        self.profile_checkbox = None
+        self.save_profile_button = None
+        self.write_kra_button = None
+        self.profiler = Profiler(enabled=False)
+        self.pixel_cache_spinbox = None
+        self.pixel_cache = BufferCache(DEFAULT_PIXEL_CACHE_MB * 1024 * 1024)
+        self.clone_frames_checkbox = None
+        self.min_hold_spinbox = None
+        self.step_spinbox = None
+        self.rest_min_gap_spinbox = None
+        self.rest_after_spinbox = None
+        self.batch_layers_checkbox = None
+        self.incremental_checkbox = None
+        self.clone_frames = False
+        self.placed_frames = {}
+        self.placed_names = {}
+        self.placed_sizes = {}
+        self.cloned_keyframes = 0
+        self.cloned_bytes = 0
+        self.timeline = TimelineViewCache(self.find_kis_anim_timeline_view)
         self.is_processing = False
+        self.cancel_fill_button = None
+        self.fill_job = None
+        # Background loads, older ones are kept until their thread finished but their result is ignored
+        self.loaders = []
+        self.load_generation = 0
+        self.loading = False
+        self.spinner_timer = QTimer(self)
+        self.spinner_timer.setInterval(SPINNER_INTERVAL_MS)
+        self.spinner_timer.timeout.connect(self.advance_spinner)
+        self.spinner_index = 0
+        self.spinner_message = ""
+        # Drives the sliced timeline fill, restarted after every slice so slices never overlap
+        self.fill_timer = QTimer(self)
+        self.fill_timer.setSingleShot(True)
+        self.fill_timer.timeout.connect(self.fill_timeline_step)
         self._application = None
         self._document = None
         self.application = Krita.instance()
@@ -127,8 +395,21 @@ class PapagayoImporter(DockWidget):
             self.phoneme_list_text = self.ui.findChild(QTextEdit, "phoneme_list_text")
             self.load_sound_checkbox = self.ui.findChild(QCheckBox, "load_sound_checkbox")
             self.insert_rest_frames = self.ui.findChild(QCheckBox, "insert_rest_frames")
+            self.use_cache_checkbox = self.ui.findChild(QCheckBox, "use_cache_checkbox")
+            self.pixel_cache_spinbox = self.ui.findChild(QSpinBox, "pixel_cache_spinbox")
+            self.clone_frames_checkbox = self.ui.findChild(QCheckBox, "clone_frames_checkbox")
+            self.min_hold_spinbox = self.ui.findChild(QSpinBox, "min_hold_spinbox")
+            self.step_spinbox = self.ui.findChild(QSpinBox, "step_spinbox")
+            self.rest_min_gap_spinbox = self.ui.findChild(QSpinBox, "rest_min_gap_spinbox")
+            self.rest_after_spinbox = self.ui.findChild(QSpinBox, "rest_after_spinbox")
+            self.batch_layers_checkbox = self.ui.findChild(QCheckBox, "batch_layers_checkbox")
+            self.incremental_checkbox = self.ui.findChild(QCheckBox, "incremental_checkbox")
+            self.profile_checkbox = self.ui.findChild(QCheckBox, "profile_checkbox")
+            self.save_profile_button = self.ui.findChild(QPushButton, "save_profile_button")
             self.prepare_layers_button = self.ui.findChild(QPushButton, "prepare_layers_button")
             self.fill_timeline_button = self.ui.findChild(QPushButton, "fill_timeline_button")
+            self.cancel_fill_button = self.ui.findChild(QPushButton, "cancel_fill_button")
+            self.write_kra_button = self.ui.findChild(QPushButton, "write_kra_button")
             self.progress_bar = self.ui.findChild(QProgressBar, "progress_bar")
             self.status_label = self.ui.findChild(QLabel, "status_label")
             self.log_frame = self.ui.findChild(QFrame, "log_frame")
@@ -142,6 +423,13 @@ class PapagayoImporter(DockWidget):
                 self.prepare_layers_button.clicked.connect(self.prepare_krita_layers)
             if self.fill_timeline_button:
                 self.fill_timeline_button.clicked.connect(self.fill_timeline)
+            if self.cancel_fill_button:
+                self.cancel_fill_button.clicked.connect(self.cancel_fill)
+                self.cancel_fill_button.setVisible(False)
+            if self.save_profile_button:
+                self.save_profile_button.clicked.connect(self.save_profile)
+            if self.write_kra_button:
+                self.write_kra_button.clicked.connect(self.write_kra_file)
             # Log visibility toggle (hidden by default)
             if self.log_frame:
                 self.log_frame.setVisible(False)
@@ -177,10 +465,15 @@ class PapagayoImporter(DockWidget):
     # notifies when views are added or removed
     # 'pass' means do not do anything
     def canvasChanged(self, canvas):
-        pass
+        # The Timeline docker shows the new canvas, cached rows and columns are stale
+        self.timeline.invalidate()
+        # A running fill would continue on the newly active document
+        self.cancel_fill()
 
     def open_file_dialog(self):
-        """Open file dialog and validate the selected Papagayo file."""
+        """Open file dialog and load the selected Papagayo file in the background.
+        Another file can be picked while a load runs, only the last pick is used.
+        """
         file_path, _ = QFileDialog.getOpenFileName(
             self, 'Select Papagayo-NG File', 
             os.path.expanduser("~"),
@@ -191,26 +484,122 @@ class PapagayoImporter(DockWidget):
             return
             
         try:
-            self.set_status("Loading file...", "orange")
-            QApplication.processEvents()
-            
-            # Validate and load the file
-            if self.load_papagayo_file(file_path):
-                self.papagayo_file_path = file_path
-                self.update_ui_after_file_load()
-                self.set_status("File loaded successfully", "green")
-            else:
-                self.set_status("Failed to load file", "red")
-                
+            self.start_loading(file_path)
         except Exception as e:
+            self.stop_spinner()
             self.show_error(f"Error loading file: {str(e)}")
             self.set_status("Error loading file", "red")
 
+    def start_loading(self, file_path):
+        """Start a ProjectLoader thread for 'file_path', superseding a load that is still running."""
+        # Threads that are done can go, running ones must stay referenced until they finish
+        self.loaders = [loader for loader in self.loaders if loader.isRunning()]
+        self.load_generation += 1
+        self.loading = True
+        use_cache = bool(self.use_cache_checkbox and self.use_cache_checkbox.isChecked())
+        loader = ProjectLoader(self.load_generation, file_path, use_cache, self)
+        loader.progress.connect(self.on_load_progress)
+        loader.loaded.connect(self.on_project_loaded)
+        loader.failed.connect(self.on_load_failed)
+        self.loaders.append(loader)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.start_spinner(f"Loading {Path(file_path).name}...")
+        loader.start()
+
+    def is_current_load(self, generation):
+        return self.loading and generation == self.load_generation
+
+    def on_load_progress(self, generation, value):
+        if self.is_current_load(generation):
+            self.progress_bar.setValue(value)
+
+    def on_project_loaded(self, generation, file_path, project, phoneme_list):
+        """Take over the project of the latest load, results of superseded loads are dropped."""
+        if not self.is_current_load(generation):
+            return
+        self.loading = False
+        self.stop_spinner()
+        self.progress_bar.setVisible(False)
+        for voice in project.voices:
+            if voice.used_phonemes_generated:
+                self.log(f"Generated used_phonemes for voice '{voice.name}': {voice.used_phonemes}")
+        self.project = project
+        self.papagayo_file_path = file_path
+        # Layers of the previous project may have been renamed or replaced since the rows were mapped
+        self.timeline.invalidate()
+        self.update_ui_after_file_load(phoneme_list)
+        self.set_status("File loaded successfully", "green")
+
+    def on_load_failed(self, generation, file_path, message):
+        if not self.is_current_load(generation):
+            return
+        self.loading = False
+        self.stop_spinner()
+        self.progress_bar.setVisible(False)
+        self.set_status("Failed to load file", "red")
+        self.show_error(message)
+
+    def start_spinner(self, message):
+        self.spinner_message = message
+        self.spinner_index = 0
+        self.advance_spinner()
+        self.spinner_timer.start()
+
+    def stop_spinner(self):
+        self.spinner_timer.stop()
+
+    def advance_spinner(self):
+        """Show the next spinner frame in front of the loading message."""
+        frame = SPINNER_FRAMES[self.spinner_index % len(SPINNER_FRAMES)]
+        self.spinner_index += 1
+        self.status_label.setText(f"{frame} {self.spinner_message}")
+        self.status_label.setStyleSheet("color: orange;")
+
     def set_status(self, message, color="black"):
         """Update the status label with a message and color."""
         self.status_label.setText(message)
         self.status_label.setStyleSheet(f"color: {color};")
-        QApplication.processEvents()
+        self.process_events()
+
+    def process_events(self):
+        """Let Qt repaint the UI, timed as 'processEvents' when profiling."""
+        with self.profiler.timer("processEvents"):
+            QApplication.processEvents()
+
+    def begin_profile(self):
+        """Start a new profile if 'Profile Host Calls' is checked."""
+        self.profiler.enabled = bool(self.profile_checkbox and self.profile_checkbox.isChecked())
+        self.profiler.reset()
+
+    def end_profile(self, title):
+        """Log the timing summary of the current run."""
+        if not self.profiler.enabled:
+            return
+        self.profiler.stop()
+        self.log(f"{title} profile:")
+        for line in self.profiler.format_summary():
+            self.log(line)
+        if self.save_profile_button:
+            self.save_profile_button.setEnabled(True)
+
+    def save_profile(self):
+        """Write the raw samples of the last profiled run to a JSON file."""
+        if not self.profiler.samples:
+            self.show_info("No profile recorded yet. Enable 'Profile Host Calls' and run an action first.")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, 'Save Profile',
+            os.path.join(os.path.expanduser("~"), "papagayo_profile.json"),
+            "JSON Files (*.json);;All Files (*.*)"
+        )
+        if not file_path:
+            return
+        try:
+            self.profiler.save(file_path, version=VERSION, papagayo_file=self.papagayo_file_path)
+            self.set_status(f"Profile saved: {Path(file_path).name}", "green")
+        except Exception as e:
+            self.show_error(f"Error saving profile: {str(e)}")
     
     def show_error(self, message):
         """Show an error message dialog."""
@@ -228,13 +617,13 @@ class PapagayoImporter(DockWidget):
             if not frames:
                 return False
 
-            # Find timeline view safely
-            view = self.find_kis_anim_timeline_view()
+            # Find timeline view safely, it is cached until the canvas or the timeline model changes
+            view = self.timeline.view()
             if not view:
                 self.log("[Timeline] KisAnimTimelineFramesView not found.", "warning")
                 return False
 
-            model = view.model()
+            model = self.timeline.model()
             if model is None:
                 self.log("[Timeline] Timeline model not available.", "warning")
                 return False
@@ -246,37 +635,20 @@ class PapagayoImporter(DockWidget):
 
             # Lazy import with Qt compatibility
             try:
-                from PyQt5.QtCore import QItemSelection, QItemSelectionModel, Qt
+                from PyQt5.QtCore import QItemSelection, QItemSelectionModel
             except Exception:
                 try:
-                    from PySide2.QtCore import QItemSelection, QItemSelectionModel, Qt
+                    from PySide2.QtCore import QItemSelection, QItemSelectionModel
                 except Exception:
                     try:
-                        from PyQt6.QtCore import QItemSelection, QItemSelectionModel, Qt
+                        from PyQt6.QtCore import QItemSelection, QItemSelectionModel
                     except Exception:
-                        from PySide6.QtCore import QItemSelection, QItemSelectionModel, Qt
-
-            # Map a given frame number to a model column
-            def frame_to_col(frame):
-                # Try header mapping first
-                try:
-                    col_count = model.columnCount()
-                except Exception:
-                    col_count = 0
-                for col in range(col_count):
-                    try:
-                        hd = model.headerData(col, Qt.Horizontal)
-                    except Exception:
-                        hd = None
-                    if hd is not None and (hd == frame or str(hd) == str(frame)):
-                        return col
-                # Fallback: assume column 0 is labels, frames start at 1
-                return frame + 1
+                        from PySide6.QtCore import QItemSelection, QItemSelectionModel
 
             new_selection = QItemSelection()
             indices = []
             for frame in frames:
-                col = frame_to_col(frame)
+                col = self.timeline.column_for_frame(frame)
                 index = model.index(row, col)
                 if not index.isValid():
                     self.log(f"[Timeline] Invalid index for frame {frame} (row={row}, col={col}).", "warning")
@@ -311,9 +683,11 @@ class PapagayoImporter(DockWidget):
             except Exception:
                 pass
 
-            QApplication.processEvents()
+            self.process_events()
             return True
         except Exception as e:
+            # The view may have been deleted with its docker, look it up again next time
+            self.timeline.invalidate()
             self.log(f"[Timeline] select_anim_frames failed: {e}", "warning")
             return False
 
@@ -325,6 +699,10 @@ class PapagayoImporter(DockWidget):
                 return docker
 
     def find_kis_anim_timeline_view(self):
+        with self.profiler.timer("find_kis_anim_timeline_view"):
+            return self._find_kis_anim_timeline_view()
+
+    def _find_kis_anim_timeline_view(self):
         timeline_docker = self.find_timeline_docker()
         if not timeline_docker:
             return None
@@ -348,28 +726,16 @@ class PapagayoImporter(DockWidget):
         return None
 
     def find_timeline_row_for_layer(self, layer):
-        view = self.find_kis_anim_timeline_view()
-        if not view:
-            return -1
-        model = view.model()
-        if model is None:
-            return -1
-        try:
-            row_count = model.rowCount()
-        except Exception:
-            row_count = 0
-        for row in range(row_count):
-            try:
-                if model.data(model.index(row, 0)) == layer.name():
-                    return row
-            except Exception:
-                continue
-        return -1
+        return self.timeline.row_for_layer(layer.name())
         
     def ensure_keyframe_at_time(self, node, frame_time):
         """Ensure a keyframe exists on 'node' at 'frame_time'.
         Tries add_blank_frame; if it fails (e.g., timeline not selecting this node), falls back to writing a 1x1 transparent pixel.
         """
+        with self.profiler.timer("ensure_keyframe_at_time"):
+            return self._ensure_keyframe_at_time(node, frame_time)
+
+    def _ensure_keyframe_at_time(self, node, frame_time):
         try:
             doc = self.document
             if not doc or not node:
@@ -394,7 +760,8 @@ class PapagayoImporter(DockWidget):
                 pass
             action = self.application.action("add_blank_frame")
             if action:
-                action.trigger()
+                with self.profiler.timer("add_blank_frame"):
+                    action.trigger()
 
             return node.hasKeyframeAtTime(frame_time)
         except Exception as e:
@@ -446,85 +813,11 @@ class PapagayoImporter(DockWidget):
         
         return True
     
-    def validate_papagayo_data(self, data):
-        """Validate the structure of Papagayo data."""
-        required_fields = ["version", "fps"]
-        
-        for field in required_fields:
-            if field not in data:
-                raise ValueError(f"Missing required field: {field}")
-        
-        # Check for voices (pg2 format) or direct voice data (json format)
-        if "voices" in data:
-            if not isinstance(data["voices"], list) or len(data["voices"]) == 0:
-                raise ValueError("No voices found in file")
-            
-            for voice in data["voices"]:
-                if "name" not in voice or "phrases" not in voice:
-                    raise ValueError("Invalid voice structure")
-                    
-                # Check if used_phonemes exists and create if missing
-                if "used_phonemes" not in voice:
-                    voice["used_phonemes"] = self.extract_used_phonemes_from_voice(voice)
-                    self.log(f"Generated used_phonemes for voice '{voice['name']}': {voice['used_phonemes']}")
-                    
-        elif "name" in data and "phrases" in data:
-            # Legacy json format
-            if "used_phonemes" not in data:
-                data["used_phonemes"] = self.extract_used_phonemes_from_voice(data)
-                self.log(f"Generated used_phonemes for legacy format: {data['used_phonemes']}")
-        else:
-            raise ValueError("Invalid file format: no voices or voice data found")
-            
-        return True
-        
-    def extract_used_phonemes_from_voice(self, voice):
-        """Extract unique phonemes from a voice's phrases/words/phonemes structure."""
-        used_phonemes = set()
-        
-        try:
-            for phrase in voice.get("phrases", []):
-                for word in phrase.get("words", []):
-                    for phoneme in word.get("phonemes", []):
-                        phoneme_text = phoneme.get("text", "")
-                        if phoneme_text:
-                            used_phonemes.add(phoneme_text)
-                            
-            # Convert to sorted list for consistent ordering
-            return sorted(list(used_phonemes))
-            
-        except Exception as e:
-            self.log(f"Warning: Could not extract phonemes from voice data: {e}")
-            return []
-        
-    def load_papagayo_file(self, file_path):
-        """Load and validate a Papagayo file."""
-        try:
-            file_path_obj = Path(file_path)
-            if not file_path_obj.exists():
-                raise FileNotFoundError(f"File does not exist: {file_path}")
-                
-            if not file_path_obj.suffix.lower() in ['.pg2', '.json']:
-                raise ValueError("Unsupported file format. Please select a .pg2 or .json file.")
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Validate the data structure
-            self.validate_papagayo_data(data)
-            self.papagayo_data = data
-            return True
-            
-        except json.JSONDecodeError as e:
-            self.show_error(f"Invalid JSON file: {str(e)}")
-            return False
-        except Exception as e:
-            self.show_error(f"Error loading file: {str(e)}")
-            return False
-    
-    def update_ui_after_file_load(self):
-        """Update the UI elements after successfully loading a file."""
-        if not self.papagayo_data:
+    def update_ui_after_file_load(self, phoneme_list=None):
+        """Update the UI elements after successfully loading a file.
+        'phoneme_list' are the lines of the phoneme list when they were already built by the loader.
+        """
+        if not self.project:
             return
             
         # Update file path display
@@ -533,82 +826,47 @@ class PapagayoImporter(DockWidget):
         self.file_path_label.setStyleSheet("color: black; font-weight: bold;")
         
         # Update file info
-        fps = self.papagayo_data.get("fps", "Unknown")
-        version = self.papagayo_data.get("version", "Unknown")
-        duration = self.papagayo_data.get("sound_duration", "Unknown")
-        num_voices = len(self.papagayo_data.get("voices", []))
-        
-        if num_voices == 0 and "name" in self.papagayo_data:
-            num_voices = 1  # Legacy format
+        fps = self.project.fps
+        version = self.project.version if self.project.version is not None else "Unknown"
+        duration = self.project.sound_duration if self.project.sound_duration is not None else "Unknown"
+        num_voices = len(self.project.voices)
             
         info_text = f"FPS: {fps} | Duration: {duration} frames | Voices: {num_voices} | Version: {version}"
         self.file_info_label.setText(info_text)
         
         # Update phoneme list
-        phoneme_list = self.get_list_of_phonemes()
+        if phoneme_list is None:
+            phoneme_list = self.get_list_of_phonemes()
         self.phoneme_list_text.setPlainText("\n".join(phoneme_list))
         
         # Enable action buttons
         self.prepare_layers_button.setEnabled(True)
         self.fill_timeline_button.setEnabled(True)
+        if self.write_kra_button:
+            self.write_kra_button.setEnabled(True)
 
     def get_list_of_phonemes(self):
         """Get a formatted list of phonemes from the loaded data."""
-        if not self.papagayo_data:
+        if not self.project:
             return []
-            
-        list_of_used_phonemes = []
-        
-        try:
-            # Handle pg2 format (with voices array)
-            if "voices" in self.papagayo_data:
-                for voice in self.papagayo_data["voices"]:
-                    voice_name = voice.get("name", "Unknown Voice")
-                    list_of_used_phonemes.append(f"{voice_name}:")
-                    
-                    used_phonemes = voice.get("used_phonemes", [])
-                    if used_phonemes:
-                        # Group phonemes in pairs for better display
-                        for i in range(0, len(used_phonemes), 2):
-                            if i + 1 < len(used_phonemes):
-                                list_of_used_phonemes.append(f"  {used_phonemes[i]}  |  {used_phonemes[i+1]}")
-                            else:
-                                list_of_used_phonemes.append(f"  {used_phonemes[i]}")
-                    else:
-                        list_of_used_phonemes.append("  No phonemes found")
-            
-            # Handle legacy json format
-            elif "name" in self.papagayo_data:
-                voice_name = self.papagayo_data.get("name", "Unknown Voice")
-                list_of_used_phonemes.append(f"{voice_name}:")
-                
-                used_phonemes = self.papagayo_data.get("used_phonemes", [])
-                if used_phonemes:
-                    for i in range(0, len(used_phonemes), 2):
-                        if i + 1 < len(used_phonemes):
-                            list_of_used_phonemes.append(f"  {used_phonemes[i]}  |  {used_phonemes[i+1]}")
-                        else:
-                            list_of_used_phonemes.append(f"  {used_phonemes[i]}")
-                else:
-                    list_of_used_phonemes.append("  No phonemes found")
-                    
-        except Exception as e:
-            list_of_used_phonemes = [f"Error reading phonemes: {str(e)}"]
-            
-        return list_of_used_phonemes
+        return phoneme_list_lines(self.project)
 
     def prepare_krita_layers(self):
-        """Create layer groups and phoneme layers in Krita."""
+        """Create layer groups and phoneme layers in Krita.
+        With 'Batch Layer Creation' all nodes are created first, then their keyframes are initialized and the
+        projection is refreshed once, instead of recompositing after every layer.
+        """
         if self.is_processing:
             self.show_info("Already processing. Please wait...")
             return
             
-        if not self.papagayo_data:
+        if not self.project:
             self.show_error("No Papagayo file loaded. Please select a file first.")
             return
             
         try:
             self.is_processing = True
+            self.begin_profile()
             self.set_status("Preparing Krita layers...", "orange")
             self.progress_bar.setVisible(True)
             self.progress_bar.setValue(0)
@@ -625,7 +883,7 @@ class PapagayoImporter(DockWidget):
                 raise RuntimeError("Document root node is invalid. Please create a new document.")
             
             # Set document properties
-            fps = self.papagayo_data.get("fps", 24)
+            fps = self.project.fps
             try:
                 self.document.setFramesPerSecond(fps)
             except Exception as e:
@@ -633,29 +891,34 @@ class PapagayoImporter(DockWidget):
             
             # Handle sound loading
             if self.load_sound_checkbox.isChecked():
-                self.load_sound_file(self.document)
+                self.load_sound_file()
             
             # Set up timeline
-            num_frames = self.papagayo_data.get("sound_duration", 
-                                              self.papagayo_data.get("end_frame", 100))
+            num_frames = self.project.duration or 100
             self.document.setPlayBackRange(0, num_frames)
             self.document.setCurrentTime(0)
             
             # Get voice list
             voice_list = self.get_voice_list()
-            total_steps = sum(len(voice.get("used_phonemes", [])) for voice in voice_list) + len(voice_list)
+            batch = bool(self.batch_layers_checkbox and self.batch_layers_checkbox.isChecked())
+            total_steps = sum(len(voice.used_phonemes) for voice in voice_list) + len(voice_list)
+            if batch:
+                total_steps *= 2
             current_step = 0
+            new_layers = []
+            started = time.perf_counter()
             
             # Process each voice
             for voice in voice_list:
-                voice_name = voice.get("name", "Unknown Voice")
+                voice_name = voice.name
                 self.set_status(f"Processing voice: {voice_name}", "orange")
                 
                 # Create or get group layer for voice
-                group_layer = self.create_voice_group_layer(parent_layer, voice_name)
+                group_layer = self.create_voice_group_layer(parent_layer, voice_name, refresh=not batch)
+                layers = self.build_layer_index(group_layer)
                 
                 # Create phoneme layers
-                used_phonemes = voice.get("used_phonemes", [])
+                used_phonemes = voice.used_phonemes
                 if not used_phonemes:
                     self.log(f"Warning: No phonemes found for voice '{voice_name}'")
                     continue
@@ -665,8 +928,12 @@ class PapagayoImporter(DockWidget):
                         self.log(f"Warning: Invalid phoneme data: {phoneme}")
                         continue
                         
-                    phoneme_layer = self.create_phoneme_layer(group_layer, phoneme)
+                    known = phoneme in layers
+                    phoneme_layer = self.create_phoneme_layer(group_layer, phoneme, layers, initialize=not batch)
+                    if phoneme_layer and not known:
+                        new_layers.append((phoneme, phoneme_layer))
                     if phoneme_layer:
+                        self.profiler.count("layers")
                         self.log(f"Created phoneme layer: {phoneme}")
                     else:
                         self.log(f"Failed to create phoneme layer: {phoneme}")
@@ -679,7 +946,20 @@ class PapagayoImporter(DockWidget):
                 progress = int((current_step / total_steps) * 100)
                 self.progress_bar.setValue(progress)
             
+            if batch:
+                # All nodes exist now, key them at frame 0 and recomposite once
+                self.set_status("Initializing keyframes...", "orange")
+                self.document.setCurrentTime(0)
+                for phoneme, phoneme_layer in new_layers:
+                    self.initialize_phoneme_layer(phoneme_layer, phoneme)
+                    current_step += 1
+                    self.progress_bar.setValue(int((current_step / total_steps) * 100))
+                self.refresh_projection()
+            
+            self.log(f"Prepared {len(new_layers)} new layers in {(time.perf_counter() - started) * 1000:.1f} ms "
+                     f"({'batched' if batch else 'one layer at a time'})")
             self.progress_bar.setValue(100)
+            self.end_profile("Prepare layers")
             self.set_status("Layers prepared successfully!", "green")
             self.show_info("Krita layers have been prepared successfully!\n\n"
                           "You can now draw on the phoneme layers and then use 'Fill Timeline' "
@@ -698,13 +978,10 @@ class PapagayoImporter(DockWidget):
     def load_sound_file(self):
         """Load the sound file referenced in the Papagayo data."""
         try:
-            sound_path = self.papagayo_data.get("sound_path", "")
+            # Relative paths are resolved against the project file
+            sound_path = self.project.resolve_sound_path()
             if not sound_path:
                 return
-                
-            # Handle relative paths
-            if not os.path.isabs(sound_path):
-                sound_path = os.path.join(os.path.dirname(self.papagayo_file_path), sound_path)
             
             if os.path.exists(sound_path):
                 self.document.setAudioTracks([sound_path])
@@ -717,16 +994,18 @@ class PapagayoImporter(DockWidget):
     
     def get_voice_list(self):
         """Get the list of voices from the Papagayo data."""
-        if "voices" in self.papagayo_data:
-            return self.papagayo_data["voices"]
-        elif "name" in self.papagayo_data:
-            # Legacy format - wrap in list
-            return [self.papagayo_data]
-        else:
-            return []
+        # Legacy single voice files are parsed into a one voice project as well
+        return self.project.voices
     
-    def create_voice_group_layer(self, parent_layer, voice_name):
-        """Create or get a group layer for a voice."""
+    def refresh_projection(self):
+        """Recomposite the document, timed as 'refreshProjection' when profiling."""
+        with self.profiler.timer("refreshProjection"):
+            self.document.refreshProjection()
+
+    def create_voice_group_layer(self, parent_layer, voice_name, refresh=True):
+        """Create or get a group layer for a voice.
+        Without 'refresh' the projection is left for the caller to refresh once all layers exist.
+        """
         try:
             # Check if layer already exists
             existing_layer = self.document.nodeByName(voice_name)
@@ -742,7 +1021,8 @@ class PapagayoImporter(DockWidget):
             parent_layer.addChildNode(group_layer, None)
             
             # Refresh document to ensure proper node management
-            self.document.refreshProjection()
+            if refresh:
+                self.refresh_projection()
             
             # Set properties after adding to parent
             try:
@@ -757,13 +1037,29 @@ class PapagayoImporter(DockWidget):
             print(f"Error creating voice group layer '{voice_name}': {e}")
             raise
     
-    def create_phoneme_layer(self, group_layer, phoneme):
-        """Create a phoneme layer if it doesn't exist."""
+    def build_layer_index(self, group_layer):
+        """Map the names of the child layers of 'group_layer' to their nodes.
+        Built once per voice and updated as layers are created, so layer lookups don't scan childNodes().
+        """
+        layers = {}
+        with self.profiler.timer("childNodes"):
+            children = group_layer.childNodes()
+        for child in children:
+            # Keep the first layer of a name like the linear scans did
+            layers.setdefault(child.name(), child)
+        return layers
+
+    def create_phoneme_layer(self, group_layer, phoneme, layers=None, initialize=True):
+        """Create a phoneme layer if it doesn't exist.
+        Without 'initialize' the new node is only added, initialize_phoneme_layer() keys it later.
+        """
         try:
+            if layers is None:
+                layers = self.build_layer_index(group_layer)
             # Check if phoneme layer already exists
-            for child in group_layer.childNodes():
-                if child.name() == phoneme:
-                    return child
+            phoneme_layer = layers.get(phoneme)
+            if phoneme_layer:
+                return phoneme_layer
             
             # Create new phoneme layer
             phoneme_layer = self.document.createNode(phoneme, "paintLayer")
@@ -773,16 +1069,28 @@ class PapagayoImporter(DockWidget):
                 
             # Add to group layer first, then enable animation
             group_layer.addChildNode(phoneme_layer, None)
+            layers[phoneme] = phoneme_layer
             
             # Enable animation after adding to parent
             phoneme_layer.enableAnimation()
             
-            # Refresh the document to ensure proper node management
-            self.document.refreshProjection()
-            
-            # Create initial keyframe at frame 0 programmatically
-            try:
+            if initialize:
+                # Refresh the document to ensure proper node management
+                self.refresh_projection()
                 self.document.setCurrentTime(0)
+                self.initialize_phoneme_layer(phoneme_layer, phoneme)
+            
+            return phoneme_layer
+            
+        except Exception as e:
+            print(f"Error creating phoneme layer '{phoneme}': {e}")
+            return None
+
+    def initialize_phoneme_layer(self, phoneme_layer, phoneme):
+        """Create the initial keyframe of a new phoneme layer at the current time (frame 0)."""
+        # Create initial keyframe at frame 0 programmatically
+        try:
+            with self.profiler.timer("initialize_keyframe"):
                 self.document.setActiveNode(phoneme_layer)
                 self.application.action("add_blank_frame").trigger()
 
@@ -797,29 +1105,26 @@ class PapagayoImporter(DockWidget):
                     # If there's no pixel data, we need to paint something
                     # This is a workaround to ensure a keyframe exists
                     phoneme_layer.setPixelData(bytes([0, 0, 0, 0]), 0, 0, 1, 1)
-                
-                print(f"Created initial keyframe for phoneme layer: {phoneme}")
-            except Exception as e:
-                print(f"Note: Could not create initial keyframe for {phoneme}: {e}")
-            
-            return phoneme_layer
             
+            print(f"Created initial keyframe for phoneme layer: {phoneme}")
         except Exception as e:
-            print(f"Error creating phoneme layer '{phoneme}': {e}")
-            return None
+            print(f"Note: Could not create initial keyframe for {phoneme}: {e}")
 
     def fill_timeline(self):
-        """Apply phoneme timing to the Krita timeline."""
+        """Apply phoneme timing to the Krita timeline.
+        The keys are applied in slices of FILL_SLICE_MS from a timer, so Krita stays responsive and the fill can be cancelled.
+        """
         if self.is_processing:
             self.show_info("Already processing. Please wait...")
             return
             
-        if not self.papagayo_data:
+        if not self.project:
             self.show_error("No Papagayo file loaded. Please select a file first.")
             return
             
         try:
             self.is_processing = True
+            self.begin_profile()
             self.set_status("Filling timeline with frames...", "orange")
             self.progress_bar.setVisible(True)
             self.progress_bar.setValue(0)
@@ -830,94 +1135,467 @@ class PapagayoImporter(DockWidget):
             
             # Get voice list and calculate total operations
             voice_list = self.get_voice_list()
-            total_phonemes = 0
-            for voice in voice_list:
-                for phrase in voice.get("phrases", []):
-                    for word in phrase.get("words", []):
-                        total_phonemes += len(word.get("phonemes", []))
+            total_phonemes = sum(len(voice) for voice in voice_list)
             
             if total_phonemes == 0:
                 raise ValueError("No phonemes found in the file. Please check your Papagayo data.")
             
-            current_phoneme = 0
-            
-            # Process each voice
-            for voice in voice_list:
-                voice_name = voice.get("name", "Unknown Voice")
-                self.set_status(f"Processing timeline for voice: {voice_name}", "orange")
-                
-                # Get or create the voice group layer
-                group_layer = self.document.nodeByName(voice_name)
-                if not group_layer:
-                    raise RuntimeError(f"Voice group layer '{voice_name}' not found. Please run 'Prepare Krita Layers' first.")
-                
-                # Create or get combined layer
-                combined_layer_name = f"{voice_name}_combined"
-                combine_layer = self.get_or_create_combined_layer(group_layer, combined_layer_name)
-                self.document.setActiveNode(combine_layer)
-
-                self.log(f"Combined layer has keyframe at frame 0: {combine_layer.hasKeyframeAtTime(0)}")
-                self.log(f"Currently active Layer: {self.document.activeNode().name()}")
-                self.log(f"Currently Active Layer Animated: {self.document.activeNode().animated()}")
-                self.log(f"Currently active Time: {self.document.currentTime()}")
-                self.document.setCurrentTime(0)
-                self.ensure_keyframe_at_time(combine_layer, 0)
-                self.log(f"Combined layer has keyframe at frame 0: {combine_layer.hasKeyframeAtTime(0)}")
-                last_pos = 0
-                
-                # Process phrases
-                for phrase in voice.get("phrases", []):
-                    # Handle rest frames between phrases
-                    if self.insert_rest_frames.isChecked():
-                        phrase_start = phrase.get("start_frame", 0)
-                        if phrase_start > last_pos + 1:
-                            self.insert_rest_frame(group_layer, combine_layer, 
-                                                 last_pos + 1)
-                    
-                    # Process words in phrase
-                    for word in phrase.get("words", []):
-                        # Handle rest frames between words
-                        if self.insert_rest_frames.isChecked():
-                            word_start = word.get("start_frame", 0)
-                            if word_start > last_pos + 1:
-                                self.insert_rest_frame(group_layer, combine_layer, 
-                                                     last_pos + 1)
-                        
-                        # Process phonemes in word
-                        for phoneme in word.get("phonemes", []):
-                            self.apply_phoneme_to_timeline(group_layer, combine_layer, 
-                                                         phoneme)
-                            
-                            last_pos = phoneme.get("frame", last_pos)
-                            current_phoneme += 1
-                            progress = int((current_phoneme / total_phonemes) * 100)
-                            self.progress_bar.setValue(progress)
+            voice_keys = self.get_voice_keyframes(voice_list)
+            self.pixel_cache.max_bytes = self.get_pixel_cache_limit()
+            self.clone_frames = bool(self.clone_frames_checkbox and self.clone_frames_checkbox.isChecked())
             
-            self.progress_bar.setValue(100)
-            self.set_status("Timeline filled successfully!", "green")
-            self.show_info("Timeline has been filled with phoneme frames successfully!\n\n"
-                          "Your animation is now ready. You can play the timeline to see the results.")
+            incremental = bool(self.incremental_checkbox and self.incremental_checkbox.isChecked())
+            recorded = recorded_drawings = None
+            if incremental:
+                data = self.read_applied_record()
+                recorded, recorded_drawings = decode_keyframe_record(data), decode_drawing_signatures(data)
+            self.fill_job = FillJob(voice_list, voice_keys, recorded, recorded_drawings, incremental)
+            self.set_fill_running(True)
+            self.fill_timer.start(0)
             
         except Exception as e:
-            error_msg = f"Error filling timeline: {str(e)}"
-            self.set_status("Error filling timeline", "red")
-            self.show_error(error_msg)
             print(f"Traceback: {traceback.format_exc()}")
-            
+            self.finish_fill(error=e)
+
+    def fill_timeline_step(self):
+        """Apply keys of the running fill until FILL_SLICE_MS are used up, then hand control back to Krita.
+        Cancelling only takes effect between two keys, so no key is left half written.
+        """
+        job = self.fill_job
+        if job is None:
+            return
+        try:
+            deadline = time.perf_counter() + FILL_SLICE_MS / 1000
+            while not job.cancelled:
+                if job.combine_layer is None:
+                    if job.voice is None:
+                        self.finish_fill()
+                        return
+                    self.begin_fill_voice(job)
+                if job.key_index >= len(job.operations):
+                    self.end_fill_voice(job)
+                    continue
+
+                # Keys come in frame order, rest keys already sit in the gaps before words and phrases
+                frame, old_text, phoneme_text = job.operations[job.key_index]
+                if old_text is not None:
+                    self.remove_combined_frame(job.combine_layer, frame)
+                    job.applied.pop(frame, None)
+                if phoneme_text == REST_PHONEME:
+                    keyed = self.insert_rest_frame(job.group_layer, job.combine_layer, frame, job.layers)
+                elif phoneme_text is not None:
+                    keyed = self.apply_phoneme_to_timeline(job.group_layer, job.combine_layer, phoneme_text, frame,
+                                                           job.layers)
+                else:
+                    keyed = False
+                # Only keys the combined layer really shows are recorded, failed ones are keyed again next time
+                if keyed:
+                    job.applied[frame] = phoneme_text
+                job.key_index += 1
+                job.done += 1
+                job.last_frame = frame
+                if time.perf_counter() >= deadline:
+                    break
+
+            if job.cancelled:
+                self.finish_fill(cancelled=True)
+                return
+            self.update_fill_progress(job)
+            self.fill_timer.start(0)
+        except Exception as e:
+            print(f"Traceback: {traceback.format_exc()}")
+            self.finish_fill(error=e)
+
+    def begin_fill_voice(self, job):
+        """Look up the layers of the next voice and prepare its combined layer.
+        The drawing signatures are only read for an incremental fill, the others key everything anyway.
+        """
+        voice_name = job.voice.name
+        self.set_status(f"Processing timeline for voice: {voice_name}", "orange")
+        
+        # Get or create the voice group layer
+        group_layer = self.document.nodeByName(voice_name)
+        if not group_layer:
+            raise RuntimeError(f"Voice group layer '{voice_name}' not found. Please run 'Prepare Krita Layers' first.")
+        layers = self.build_layer_index(group_layer)
+        # Phoneme drawings are cached per voice, layers of other voices share names
+        self.pixel_cache.clear()
+        self.reset_placed_frames()
+        
+        # Create or get combined layer
+        combined_layer_name = f"{voice_name}_combined"
+        existed = combined_layer_name in layers
+        combine_layer = self.get_or_create_combined_layer(group_layer, combined_layer_name, layers)
+        self.document.setActiveNode(combine_layer)
+
+        self.log(f"Combined layer has keyframe at frame 0: {combine_layer.hasKeyframeAtTime(0)}")
+        self.log(f"Currently active Layer: {self.document.activeNode().name()}")
+        self.log(f"Currently Active Layer Animated: {self.document.activeNode().animated()}")
+        self.log(f"Currently active Time: {self.document.currentTime()}")
+        self.document.setCurrentTime(0)
+        self.ensure_keyframe_at_time(combine_layer, 0)
+        self.log(f"Combined layer has keyframe at frame 0: {combine_layer.hasKeyframeAtTime(0)}")
+        job.group_layer, job.combine_layer, job.layers = group_layer, combine_layer, layers
+        job.key_index = 0
+
+        keys = job.keys()
+        if not job.incremental:
+            # Without signatures a later incremental fill counts every phoneme as redrawn
+            job.signatures = {}
+            job.set_operations([(frame, None, phoneme) for frame, phoneme in keys], {})
+            return
+        job.signatures = {phoneme: self.drawing_signature(layers[phoneme], phoneme)
+                          for phoneme in sorted({phoneme for _, phoneme in keys}) if phoneme in layers}
+        recorded = job.recorded.get(voice_name) if existed else None
+        if recorded is None:
+            job.set_operations([(frame, None, phoneme) for frame, phoneme in keys], {})
+            return
+        # The combined layer already shows 'recorded', only the differences and the keys of
+        # phonemes drawn differently since then are keyed
+        redrawn = redrawn_phonemes(job.recorded_drawings.get(voice_name, {}), job.signatures)
+        diff = diff_keyframes(recorded, keys, redrawn)
+        job.set_operations(diff.operations(), dict(recorded))
+        for frame, phoneme in diff.unchanged:
+            self.remember_placed_frame(phoneme, frame)
+        self.log(f"Voice '{voice_name}': {len(diff.added)} keys added, {len(diff.removed)} removed, "
+                 f"{len(diff.changed)} changed, {len(diff.unchanged)} unchanged")
+        self.profiler.count("keys unchanged", len(diff.unchanged))
+
+    def end_fill_voice(self, job):
+        """Log the cache and clone statistics of the finished voice and move on to the next one."""
+        voice_name = job.voice.name
+        self.log(f"Pixel cache for voice '{voice_name}': {self.pixel_cache.hits} hits, "
+                 f"{self.pixel_cache.misses} misses, {self.pixel_cache.size / (1024 * 1024):.1f} MB")
+        self.profiler.count("pixel cache hits", self.pixel_cache.hits)
+        self.profiler.count("pixel cache misses", self.pixel_cache.misses)
+        if self.cloned_keyframes:
+            self.log(f"Voice '{voice_name}': {self.cloned_keyframes} keyframes cloned from "
+                     f"{len(self.placed_sizes)} drawings, {self.cloned_bytes / (1024 * 1024):.1f} MB "
+                     f"of pixel data not duplicated")
+            self.profiler.count("cloned keyframes", self.cloned_keyframes)
+        self.record_applied_keys(voice_name, job.applied, job.signatures)
+        job.voice_index += 1
+        job.group_layer = job.combine_layer = job.layers = None
+
+    def update_fill_progress(self, job, force=False):
+        """Show progress and remaining time, at most every PROGRESS_INTERVAL_MS unless 'force' is set."""
+        now = time.perf_counter()
+        if not force and (now - job.last_progress) * 1000 < PROGRESS_INTERVAL_MS:
+            return
+        job.last_progress = now
+        self.progress_bar.setValue(int(job.done / job.total * 100) if job.total else 100)
+        eta = job.eta()
+        remaining = f", about {eta:.0f}s left" if eta is not None else ""
+        voice_name = job.voice.name if job.voice else ""
+        self.set_status(f"Filling '{voice_name}': {job.done}/{job.total} keyframes{remaining}", "orange")
+
+    def cancel_fill(self):
+        """Stop the running fill after the key that is being applied."""
+        if self.fill_job is not None:
+            self.fill_job.cancelled = True
+            if self.cancel_fill_button:
+                self.cancel_fill_button.setEnabled(False)
+            if not self.fill_timer.isActive():
+                # Cancelled from within a slice, the slice finishes the job itself
+                return
+            self.fill_timer.stop()
+            self.finish_fill(cancelled=True)
+
+    def set_fill_running(self, running):
+        """Swap the fill button for the cancel button while a fill runs."""
+        if self.fill_timeline_button:
+            self.fill_timeline_button.setEnabled(not running)
+        if self.cancel_fill_button:
+            self.cancel_fill_button.setVisible(running)
+            self.cancel_fill_button.setEnabled(running)
+
+    def finish_fill(self, cancelled=False, error=None):
+        """End the running fill, report the result and give the UI back."""
+        job = self.fill_job
+        self.fill_job = None
+        self.fill_timer.stop()
+        try:
+            self.pixel_cache.clear()
+            if error is not None:
+                self.set_status("Error filling timeline", "red")
+                self.show_error(f"Error filling timeline: {str(error)}")
+            elif cancelled:
+                if job.voice is not None:
+                    if job.applied is not None:
+                        # Keys of a redrawn phoneme may still show the old drawing, so the old
+                        # signatures are kept and they are keyed again next time
+                        self.record_applied_keys(job.voice.name, job.applied,
+                                                 job.recorded_drawings.get(job.voice.name, {}))
+                    keyed = f"keyed up to frame {job.last_frame}" if job.key_index else "not keyed yet"
+                    self.log(f"Fill cancelled after {job.done} of {job.total} keyframes, "
+                             f"voice '{job.voice.name}' is {keyed}.", "warning")
+                self.end_profile("Fill timeline (cancelled)")
+                self.set_status(f"Timeline fill cancelled ({job.done}/{job.total} keyframes)", "orange")
+            else:
+                self.progress_bar.setValue(100)
+                self.end_profile("Fill timeline")
+                self.set_status("Timeline filled successfully!", "green")
+                self.show_info("Timeline has been filled with phoneme frames successfully!\n\n"
+                              "Your animation is now ready. You can play the timeline to see the results.")
         finally:
             self.is_processing = False
+            self.set_fill_running(False)
             self.progress_bar.setVisible(False)
     
-    def get_or_create_combined_layer(self, group_layer, layer_name):
+    def read_applied_record(self):
+        """Return the applied keys annotation written by earlier fills, None if there is none."""
+        try:
+            data = self.document.annotation(APPLIED_KEYS_ANNOTATION)
+        except Exception as e:
+            self.log(f"Could not read the applied keys annotation: {e}", "warning")
+            return None
+        if data is not None and not isinstance(data, (bytes, str)):
+            data = data.data()
+        return data
+
+    def record_applied_keys(self, voice_name, applied, signatures):
+        """Store the keys the combined layer of 'voice_name' shows now and the 'signatures' of their
+        drawings in the document annotation.
+        """
+        try:
+            data = self.read_applied_record()
+            voices = decode_keyframe_record(data)
+            drawings = decode_drawing_signatures(data)
+            voices[voice_name] = sorted(applied.items())
+            drawings[voice_name] = signatures
+            self.document.setAnnotation(APPLIED_KEYS_ANNOTATION, "Papagayo-NG keys applied to the combined layers",
+                                        encode_keyframe_record(voices, drawings).encode("utf-8"))
+        except Exception as e:
+            self.log(f"Could not record the applied keys of voice '{voice_name}': {e}", "warning")
+
+    def remove_combined_frame(self, combine_layer, frame_time):
+        """Remove the keyframe at 'frame_time' from the combined layer, frame 0 is blanked instead."""
+        self.forget_placed_frame(frame_time)
+        if not combine_layer.hasKeyframeAtTime(frame_time):
+            return
+        action = self.application.action(REMOVE_FRAMES_ACTION)
+        if action:
+            self.document.setActiveNode(combine_layer)
+            self.document.setCurrentTime(frame_time)
+            self._select_layer_for_timeline(combine_layer)
+            self.select_anim_frames([frame_time], combine_layer)
+            with self.profiler.timer("remove_frames"):
+                action.trigger()
+        if frame_time == 0 or combine_layer.hasKeyframeAtTime(frame_time):
+            # Without a key at 0 the layer would show nothing before the first phoneme
+            self.ensure_keyframe_at_time(combine_layer, frame_time)
+            bounds = combine_layer.bounds()
+            if bounds.width() and bounds.height():
+                combine_layer.setPixelData(bytes(bounds.width() * bounds.height() * 4),
+                                           bounds.x(), bounds.y(), bounds.width(), bounds.height())
+        self.profiler.count("keys removed from layer")
+
+    def get_timing_options(self):
+        """Return (min_hold, step) of the timing reduction options."""
+        min_hold = self.min_hold_spinbox.value() if self.min_hold_spinbox else 1
+        step = self.step_spinbox.value() if self.step_spinbox else 1
+        return min_hold, step
+
+    def get_rest_options(self):
+        """Return (min_gap, rest_after) of the rest frame options."""
+        min_gap = self.rest_min_gap_spinbox.value() if self.rest_min_gap_spinbox else 1
+        rest_after = self.rest_after_spinbox.value() if self.rest_after_spinbox else 0
+        return min_gap, rest_after
+
+    def get_voice_keyframes(self, voice_list):
+        """Return the reduced (frame, phoneme) keys of every voice, keyed by voice name.
+        Repeated phonemes are merged and the minimum hold and step options applied.
+        """
+        min_hold, step = self.get_timing_options()
+        min_gap, rest_after = self.get_rest_options()
+        rest_frames = self.insert_rest_frames.isChecked()
+        voice_keys = {}
+        for voice in voice_list:
+            keys = voice_keyframes(voice, rest_frames, min_gap, rest_after, self.project.last_frame)
+            keys, removed = reduce_keyframes(keys, min_hold, step)
+            voice_keys[voice.name] = keys
+            self.log(f"Voice '{voice.name}': {len(keys)} keyframes, {removed} removed by timing reduction "
+                     f"(minimum hold {min_hold}, step {step})")
+            self.profiler.count("keys removed", removed)
+        return voice_keys
+
+    def get_pixel_cache_limit(self):
+        """Return the pixel cache budget in bytes from the 'Pixel Cache (MB)' option."""
+        megabytes = self.pixel_cache_spinbox.value() if self.pixel_cache_spinbox else DEFAULT_PIXEL_CACHE_MB
+        return megabytes * 1024 * 1024
+
+    def read_layer_pixels(self, layer, name):
+        """Return ((x, y, width, height), pixel data) of 'layer' at frame 0.
+        The result is kept in the pixel cache so every keyframe of a phoneme reuses one read.
+        """
+        cached = self.pixel_cache.get(name)
+        if cached is not None:
+            return cached
+        self.document.setCurrentTime(0)
+        self.document.setActiveNode(layer)
+        bounds = layer.bounds()
+        rect = (bounds.x(), bounds.y(), bounds.width(), bounds.height())
+        with self.profiler.timer("pixelData"):
+            pixel_data = layer.pixelData(*rect)
+        self.pixel_cache.put(name, (rect, pixel_data), len(pixel_data))
+        return rect, pixel_data
+
+    def drawing_signature(self, layer, name):
+        """Return a short hash of the bounds and pixels of a phoneme layer at frame 0.
+        It changes whenever the drawing is edited, the pixels are read through the pixel cache.
+        """
+        rect, pixel_data = self.read_layer_pixels(layer, name)
+        digest = hashlib.sha1(repr(rect).encode("ascii"))
+        digest.update(bytes(pixel_data))
+        return digest.hexdigest()[:16]
+
+    def write_kra_file(self):
+        """Write a copy of the saved document with the combined layers keyed directly into the .kra file.
+        This doesn't drive the timeline at all, the phoneme layers are read from the file on disk.
+        """
+        if self.is_processing:
+            self.show_info("Already processing. Please wait...")
+            return
+
+        if not self.project:
+            self.show_error("No Papagayo file loaded. Please select a file first.")
+            return
+
+        doc = self.document
+        source_path = doc.fileName() if doc else ""
+        if not source_path or not source_path.lower().endswith(".kra"):
+            self.show_error("Please save the document as a .kra file first, its phoneme layers are read from disk.")
+            return
+        try:
+            if doc.modified():
+                self.show_info("The document has unsaved changes, the last saved version is used.")
+        except Exception:
+            pass
+
+        output_path, _ = QFileDialog.getSaveFileName(
+            self, 'Write Lipsync .kra File',
+            str(Path(source_path).with_name(f"{Path(source_path).stem}_lipsync.kra")),
+            "Krita Documents (*.kra)"
+        )
+        if not output_path:
+            return
+
+        try:
+            self.is_processing = True
+            self.set_status("Writing .kra file...", "orange")
+            min_hold, step = self.get_timing_options()
+            min_gap, rest_after = self.get_rest_options()
+            report = write_lipsync_kra(self.project, output_path, source_path,
+                                       rest_frames=self.insert_rest_frames.isChecked(),
+                                       min_hold=min_hold, step=step, min_gap=min_gap, rest_after=rest_after)
+            written = verify_kra(output_path)
+            for voice_name, voice_report in report.items():
+                self.log(f"Voice '{voice_name}': {voice_report['keyframes']} keyframes written, "
+                         f"{len(written.get(f'{voice_name}_combined', []))} read back, "
+                         f"{voice_report['removed']} removed by timing reduction")
+                if voice_report["missing"]:
+                    self.log(f"No phoneme layer for {', '.join(voice_report['missing'])} in voice '{voice_name}'",
+                             "warning")
+            self.set_status(f"Written: {Path(output_path).name}", "green")
+            self.open_written_document(output_path)
+        except Exception as e:
+            self.set_status("Error writing .kra file", "red")
+            self.show_error(f"Error writing .kra file: {str(e)}")
+            self.log(f"Traceback: {traceback.format_exc()}")
+        finally:
+            self.is_processing = False
+
+    def open_written_document(self, path):
+        """Open a written .kra file in a new view."""
+        try:
+            new_document = self.application.openDocument(path)
+            window = self.application.activeWindow()
+            if new_document and window:
+                window.addView(new_document)
+        except Exception as e:
+            self.log(f"Could not open {path}: {e}", "warning")
+
+    def reset_placed_frames(self):
+        """Forget the keyframes placed on the combined layer of the previous voice."""
+        self.placed_frames = {}
+        self.placed_names = {}
+        self.placed_sizes = {}
+        self.cloned_keyframes = 0
+        self.cloned_bytes = 0
+
+    def forget_placed_frame(self, frame_time):
+        """Forget the drawing keyed at 'frame_time', its key is about to be removed."""
+        name = self.placed_names.pop(frame_time, None)
+        if name is not None and self.placed_frames.get(name) == frame_time:
+            del self.placed_frames[name]
+
+    def remember_placed_frame(self, name, frame_time, size=None):
+        """Record that the combined layer shows drawing 'name' from 'frame_time' on."""
+        previous = self.placed_names.get(frame_time)
+        if previous is not None and previous != name and self.placed_frames.get(previous) == frame_time:
+            # The first key of 'previous' got overwritten, it can't be cloned from anymore
+            del self.placed_frames[previous]
+        self.placed_names[frame_time] = name
+        self.placed_frames.setdefault(name, frame_time)
+        if size is not None:
+            self.placed_sizes.setdefault(name, size)
+
+    def clone_keyframe(self, node, source_time, frame_time):
+        """Make the keyframe at 'frame_time' on 'node' a clone of the one at 'source_time'.
+        Returns False when clone frames are not available in this Krita version.
+        """
+        copy_action = self.application.action(CLONE_FRAMES_ACTION)
+        paste_action = self.application.action(PASTE_FRAMES_ACTION)
+        if not copy_action or not paste_action:
+            return False
+        self.document.setActiveNode(node)
+        self._select_layer_for_timeline(node)
+        if not self.select_anim_frames([source_time], node):
+            return False
+        with self.profiler.timer("clone_keyframe"):
+            copy_action.trigger()
+            if not self.select_anim_frames([frame_time], node):
+                return False
+            paste_action.trigger()
+        return node.hasKeyframeAtTime(frame_time)
+
+    def key_combined_frame(self, combine_layer, name, source_layer, frame_time):
+        """Key the frame 0 drawing of 'source_layer' on 'combine_layer' at 'frame_time'.
+        With 'Clone Repeated Frames' later keys of a drawing clone its first key instead of copying the pixels.
+        """
+        first_time = self.placed_frames.get(name)
+        if self.clone_frames and first_time is not None and first_time != frame_time:
+            if self.clone_keyframe(combine_layer, first_time, frame_time):
+                self.remember_placed_frame(name, frame_time)
+                self.cloned_keyframes += 1
+                self.cloned_bytes += self.placed_sizes.get(name, 0)
+                return
+            self.clone_frames = False
+            self.log("Clone frames are not available, copying the pixel data of every keyframe.", "warning")
+
+        pixel_data_bounds, pixel_data = self.read_layer_pixels(source_layer, name)
+        
+        self.document.setActiveNode(combine_layer)
+        self.document.setCurrentTime(frame_time)
+        self.ensure_keyframe_at_time(combine_layer, frame_time)
+        with self.profiler.timer("setPixelData"):
+            combine_layer.setPixelData(pixel_data, *pixel_data_bounds)
+        self.remember_placed_frame(name, frame_time, len(pixel_data))
+
+    def get_or_create_combined_layer(self, group_layer, layer_name, layers=None):
         """Get or create a combined layer for the voice."""
+        if layers is None:
+            layers = self.build_layer_index(group_layer)
         # Check if combined layer already exists
-        if self.document.nodeByName(layer_name):
-            return self.document.nodeByName(layer_name)
+        combine_layer = layers.get(layer_name)
+        if combine_layer:
+            return combine_layer
         else:
             # Create new combined layer
             combine_layer = self.document.createNode(layer_name, "paintLayer")
             # Add to the document tree before enabling animation
             group_layer.addChildNode(combine_layer, None)
+            layers[layer_name] = combine_layer
             try:
                 if not combine_layer.animated():
                     combine_layer.enableAnimation()
@@ -926,21 +1604,20 @@ class PapagayoImporter(DockWidget):
             return combine_layer
 
     
-    def insert_rest_frame(self, group_layer, combine_layer, frame_time):
-        """Insert a rest frame at the specified time."""
+    def insert_rest_frame(self, group_layer, combine_layer, frame_time, layers=None):
+        """Insert a rest frame at the specified time, returns whether it was keyed."""
         try:
+            if layers is None:
+                layers = self.build_layer_index(group_layer)
             # Find rest layer
-            rest_layer = None
-            for child in group_layer.childNodes():
-                if child.name() == "rest":
-                    rest_layer = child
-                    break
+            rest_layer = layers.get("rest")
             
             if not rest_layer:
                 # Create rest layer if it doesn't exist
-                rest_layer = document.createNode("rest", "paintLayer")
+                rest_layer = self.document.createNode("rest", "paintLayer")
                 group_layer.addChildNode(rest_layer, None)
-                self.document.refreshProjection()
+                layers["rest"] = rest_layer
+                self.refresh_projection()
                 
                 rest_layer.enableAnimation()
                 self.document.setCurrentTime(0)
@@ -962,58 +1639,37 @@ class PapagayoImporter(DockWidget):
                     self.log(f"Could not create initial keyframe for rest layer: {e}", "warning")
             
             # Copy rest frame to combined layer
-            if rest_layer.hasKeyframeAtTime(0):
-                self.document.setCurrentTime(0)
-                self.document.setActiveNode(rest_layer)
-                pixel_data_bounds = rest_layer.bounds()
-                pixel_data = rest_layer.pixelData(pixel_data_bounds.x(), pixel_data_bounds.y(), pixel_data_bounds.width(), pixel_data_bounds.height())
-                
-                self.document.setActiveNode(combine_layer)
-                self.document.setCurrentTime(frame_time)
-                self.ensure_keyframe_at_time(combine_layer, frame_time)
-                combine_layer.setPixelData(pixel_data, pixel_data_bounds.x(), pixel_data_bounds.y(), pixel_data_bounds.width(), pixel_data_bounds.height())
-            else:
-                self.log(f"Rest layer has no keyframe at frame 0. Skipping rest frame at {frame_time}", "warning")
+            if "rest" in self.placed_frames or "rest" in self.pixel_cache or rest_layer.hasKeyframeAtTime(0):
+                self.key_combined_frame(combine_layer, "rest", rest_layer, frame_time)
+                self.profiler.count("keyframes")
+                self.profiler.count("rest keyframes")
+                return True
+            self.log(f"Rest layer has no keyframe at frame 0. Skipping rest frame at {frame_time}", "warning")
             
         except Exception as e:
             self.log(f"Could not insert rest frame at {frame_time}: {e}", "error")
+        return False
     
-    def apply_phoneme_to_timeline(self, group_layer, combine_layer, phoneme):
-        """Apply a single phoneme to the timeline."""
+    def apply_phoneme_to_timeline(self, group_layer, combine_layer, phoneme_text, phoneme_frame, layers=None):
+        """Apply a single phoneme to the timeline, returns whether it was keyed."""
         try:
-            phoneme_text = phoneme.get("text", "")
-            phoneme_frame = phoneme.get("frame", 0)
-            
             if not phoneme_text:
-                return
+                return False
             
+            if layers is None:
+                layers = self.build_layer_index(group_layer)
             # Find phoneme layer
-            phoneme_layer = None
-            for child in group_layer.childNodes():
-                if child.name() == phoneme_text:
-                    phoneme_layer = child
-                    break
+            phoneme_layer = layers.get(phoneme_text)
             
             if not phoneme_layer:
                 self.log(f"Phoneme layer '{phoneme_text}' not found. Skipping.", "warning")
-                return
-            
-            # Copy phoneme frame to combined layer
-            self.document.setCurrentTime(0)
-            self.document.setActiveNode(phoneme_layer)
-            
-            # Check if the phoneme layer has a keyframe to copy
-
-            # Copy frame data
-            pixel_data_bounds = phoneme_layer.bounds()
-            pixel_data = phoneme_layer.pixelData(pixel_data_bounds.x(), pixel_data_bounds.y(), pixel_data_bounds.width(), pixel_data_bounds.height())
+                return False
             
-            self.document.setActiveNode(combine_layer)
-            self.document.setCurrentTime(phoneme_frame)
-            self.ensure_keyframe_at_time(combine_layer, phoneme_frame)
-
-            combine_layer.setPixelData(pixel_data, pixel_data_bounds.x(), pixel_data_bounds.y(), pixel_data_bounds.width(), pixel_data_bounds.height())
-
+            # Copy phoneme frame to combined layer, the frame 0 data is read once per voice
+            self.key_combined_frame(combine_layer, phoneme_text, phoneme_layer, phoneme_frame)
+            self.profiler.count("keyframes")
+            return True
             
         except Exception as e:
-            self.log(f"Could not apply phoneme '{phoneme.get('text', 'unknown')}' at frame {phoneme.get('frame', 0)}: {e}", "error")
+            self.log(f"Could not apply phoneme '{phoneme_text}' at frame {phoneme_frame}: {e}", "error")
+        return False
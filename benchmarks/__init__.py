@@ -0,0 +1 @@
+"""Benchmarks for the Papagayo-NG importers, run them with ``python -m benchmarks.<name>``."""
@@ -0,0 +1,59 @@
+"""Compare cold JSON loads of Papagayo projects with warm loads from the mmap sidecar.
+
+Usage::
+
+    python -m benchmarks.bench_sidecar shot01.pg2 [shot02.pg2 ...] [--repeat 5] [--cache-dir DIR]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from papagayo_core import load_project, load_project_cached, stream_project, write_sidecar
+
+
+def best_of(repeat, func, *args, **kwargs):
+    """Return the fastest of 'repeat' runs of func in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_file(file_path, repeat, cache_dir):
+    project = load_project(file_path)
+    write_sidecar(project, file_path, cache_dir)
+    return {
+        "file": file_path,
+        "size_bytes": os.path.getsize(file_path),
+        "phonemes": project.num_phonemes,
+        "json_load": best_of(repeat, load_project, file_path),
+        "stream": best_of(repeat, stream_project, file_path),
+        "sidecar_mmap": best_of(repeat, load_project_cached, file_path, cache_dir, write=False),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+", help=".pg2 or .json files")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, the best one is kept")
+    parser.add_argument("--cache-dir", help="where to write the sidecars (default: a temporary directory)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = args.cache_dir or temp_dir
+        print(f"{'file':40} {'phonemes':>9} {'json.load':>10} {'stream':>10} {'mmap':>10} {'speedup':>8}")
+        for file_path in args.files:
+            result = bench_file(file_path, args.repeat, cache_dir)
+            print(f"{os.path.basename(file_path):40} {result['phonemes']:>9} "
+                  f"{result['json_load'] * 1000:>8.2f}ms {result['stream'] * 1000:>8.2f}ms "
+                  f"{result['sidecar_mmap'] * 1000:>8.2f}ms {result['json_load'] / result['sidecar_mmap']:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+"""Lightweight stand-ins for the bpy, krita and Qt modules.
+
+They implement just enough of the host APIs used by the importers to run them
+outside of Blender and Krita, and count every host call in RECORDER so
+benchmarks can report how many cross-language calls an operation needs.
+"""
+from .recorder import RECORDER, CallRecorder, record_methods
@@ -0,0 +1,789 @@
+"""Fake ``bpy`` with Grease Pencil (v2 API, or v3 after reset(grease_pencil_v3=True)) data, operators and scene context."""
+import os
+import sys
+import types
+
+from .recorder import RECORDER, record_methods
+
+
+class _Property:
+    """Result of the bpy.props functions, keeps the default value."""
+
+    def __init__(self, kind, **kwargs):
+        self.kind = kind
+        self.kwargs = kwargs
+        self.default = kwargs.get("default")
+
+
+def _prop_function(kind):
+    def make(**kwargs):
+        return _Property(kind, **kwargs)
+    make.__name__ = kind
+    return make
+
+
+@record_methods
+class Collection:
+    """Name keyed collection like bpy_prop_collection."""
+
+    def __init__(self, factory=None):
+        self._factory = factory
+        self._items = {}
+
+    def _unique(self, name):
+        unique = name
+        counter = 0
+        while unique in self._items:
+            counter += 1
+            unique = f"{name}.{counter:03d}"
+        return unique
+
+    def new(self, name, *args, **kwargs):
+        unique = self._unique(name)
+        item = self._factory(unique, *args, **kwargs)
+        self._items[unique] = item
+        return item
+
+    def link(self, item):
+        item.name = self._unique(item.name)
+        self._items[item.name] = item
+
+    def remove(self, item, **kwargs):
+        self._items.pop(item.name, None)
+
+    def get(self, name, default=None):
+        return self._items.get(name, default)
+
+    def items(self):
+        return list(self._items.items())
+
+    def keys(self):
+        return list(self._items)
+
+    def values(self):
+        return list(self._items.values())
+
+    def __contains__(self, name):
+        return name in self._items
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self._items.values())[key]
+        return self._items[key]
+
+    def __iter__(self):
+        return iter(list(self._items.values()))
+
+    def __len__(self):
+        return len(self._items)
+
+
+class GPencilStrokePoints(list):
+    """Stroke points as (x, y, z) tuples, foreach_get() reads 'co' and default values for the rest."""
+    DEFAULTS = {"pressure": (1.0,), "strength": (1.0,), "vertex_color": (0.0, 0.0, 0.0, 0.0)}
+
+    def foreach_get(self, attribute, values):
+        if attribute == "co":
+            flat = [value for point in self for value in point]
+        else:
+            flat = list(self.DEFAULTS[attribute]) * len(self)
+        if len(values) != len(flat):
+            raise RuntimeError(f"foreach_get('{attribute}'): expected {len(flat)} values, got {len(values)}")
+        values[:] = flat
+
+
+class GPencilStroke:
+    def __init__(self, points):
+        self.points = GPencilStrokePoints(points)
+        self.line_width = 4
+        self.material_index = 0
+        self.use_cyclic = False
+
+
+@record_methods
+class GPencilFrame:
+    def __init__(self, frame_number, strokes=None):
+        self.frame_number = frame_number
+        self.strokes = strokes if strokes is not None else []
+
+    def clear(self):
+        self.strokes = []
+
+
+@record_methods
+class GPencilFrames:
+    """Frames of a layer, copies duplicate all stroke points like Blender does."""
+
+    def __init__(self):
+        self._frames = []
+
+    def new(self, frame_number, active=False):
+        if any(frame.frame_number == frame_number for frame in self._frames):
+            raise RuntimeError(f"Frame already exists on this frame number {frame_number}")
+        frame = GPencilFrame(frame_number)
+        self._frames.append(frame)
+        return frame
+
+    def copy(self, source):
+        strokes = [GPencilStroke([tuple(point) for point in stroke.points]) for stroke in source.strokes]
+        frame = GPencilFrame(source.frame_number, strokes)
+        self._frames.append(frame)
+        return frame
+
+    def remove(self, frame):
+        self._frames.remove(frame)
+
+    def __getitem__(self, index):
+        return self._frames[index]
+
+    def __iter__(self):
+        return iter(list(self._frames))
+
+    def __len__(self):
+        return len(self._frames)
+
+
+@record_methods
+class GPencilLayer:
+    def __init__(self, name, set_active=True):
+        self.name = name
+        self.info = name
+        self.hide = False
+        self.frames = GPencilFrames()
+
+    def clear(self):
+        self.frames = GPencilFrames()
+
+
+class AttributeData:
+    """Flat values of an attribute, foreach_get()/foreach_set() check the length like Blender."""
+
+    def __init__(self, key, width, count):
+        self._key = key
+        self._width = width
+        self._values = [0] * (width * count)
+
+    def _resize(self, count):
+        del self._values[self._width * count:]
+        self._values.extend([0] * (self._width * count - len(self._values)))
+
+    def foreach_get(self, key, values):
+        if key != self._key or len(values) != len(self._values):
+            raise RuntimeError(f"foreach_get('{key}'): expected {len(self._values)} values, got {len(values)}")
+        values[:] = self._values
+
+    def foreach_set(self, key, values):
+        if key != self._key or len(values) != len(self._values):
+            raise RuntimeError(f"foreach_set('{key}'): expected {len(self._values)} values, got {len(values)}")
+        self._values = list(values)
+
+    def __len__(self):
+        return len(self._values) // self._width
+
+
+ATTRIBUTE_ITEMS = {'FLOAT': ("value", 1), 'INT': ("value", 1), 'BOOLEAN': ("value", 1),
+                   'FLOAT_VECTOR': ("vector", 3), 'FLOAT_COLOR': ("color", 4)}
+
+
+class Attribute:
+    def __init__(self, name, data_type, domain, count):
+        self.name = name
+        self.data_type = data_type
+        self.domain = domain
+        self.is_internal = name.startswith(".")
+        self.data = AttributeData(*ATTRIBUTE_ITEMS[data_type], count)
+
+
+@record_methods
+class Attributes:
+    def __init__(self, drawing):
+        self._drawing = drawing
+        self._items = {}
+
+    def new(self, name, type, domain):
+        if name in self._items:
+            raise RuntimeError(f"Attribute '{name}' already exists")
+        attribute = Attribute(name, type, domain, self._drawing._count(domain))
+        self._items[name] = attribute
+        return attribute
+
+    def get(self, name, default=None):
+        return self._items.get(name, default)
+
+    def __getitem__(self, name):
+        return self._items[name]
+
+    def __iter__(self):
+        return iter(list(self._items.values()))
+
+
+@record_methods
+class GreasePencilDrawing:
+    """Grease Pencil v3 drawing, strokes are slices of the point domain attributes."""
+
+    def __init__(self):
+        self._sizes = []
+        self.attributes = Attributes(self)
+        self.attributes.new("position", 'FLOAT_VECTOR', 'POINT')
+        self.attributes.new("radius", 'FLOAT', 'POINT')
+        self.attributes.new(".selection", 'BOOLEAN', 'POINT')
+
+    def _count(self, domain):
+        return sum(self._sizes) if domain == 'POINT' else len(self._sizes)
+
+    def add_strokes(self, sizes):
+        self._sizes.extend(sizes)
+        for attribute in self.attributes:
+            attribute.data._resize(self._count(attribute.domain))
+
+    @property
+    def strokes(self):
+        positions = self.attributes["position"].data._values
+        strokes = []
+        start = 0
+        for size in self._sizes:
+            strokes.append(GPencilStroke([tuple(positions[3 * i:3 * i + 3]) for i in range(start, start + size)]))
+            start += size
+        return strokes
+
+    def as_pointer(self):
+        return id(self)
+
+
+class GreasePencilFrame:
+    def __init__(self, frame_number, drawing=None):
+        self.frame_number = frame_number
+        self.drawing = drawing if drawing is not None else GreasePencilDrawing()
+
+
+@record_methods
+class GreasePencilFrames:
+    """Frames of a Grease Pencil v3 layer, addressed by frame number, copies can instance the drawing."""
+
+    def __init__(self):
+        self._frames = []
+
+    def _at(self, frame_number):
+        return next((frame for frame in self._frames if frame.frame_number == frame_number), None)
+
+    def new(self, frame_number):
+        if self._at(frame_number) is not None:
+            raise RuntimeError(f"Frame already exists on frame number {frame_number}")
+        frame = GreasePencilFrame(frame_number)
+        self._frames.append(frame)
+        return frame
+
+    def copy(self, from_frame_number, to_frame_number, instance_drawing=False):
+        source = self._at(from_frame_number)
+        if source is None or self._at(to_frame_number) is not None:
+            raise RuntimeError(f"Can't copy frame {from_frame_number} to {to_frame_number}")
+        drawing = source.drawing
+        if not instance_drawing:
+            drawing = GreasePencilDrawing()
+            drawing.add_strokes(source.drawing._sizes)
+            for attribute in source.drawing.attributes:
+                target = drawing.attributes.get(attribute.name) or drawing.attributes.new(
+                    attribute.name, attribute.data_type, attribute.domain)
+                target.data._values = list(attribute.data._values)
+        frame = GreasePencilFrame(to_frame_number, drawing)
+        self._frames.append(frame)
+        return frame
+
+    def remove(self, frame_number):
+        if not isinstance(frame_number, int):
+            raise TypeError("frame_number must be an int")
+        frame = self._at(frame_number)
+        if frame is None:
+            raise RuntimeError(f"No frame on frame number {frame_number}")
+        self._frames.remove(frame)
+
+    def __getitem__(self, index):
+        return self._frames[index]
+
+    def __iter__(self):
+        return iter(list(self._frames))
+
+    def __len__(self):
+        return len(self._frames)
+
+
+@record_methods
+class GreasePencilLayer:
+    """Grease Pencil v3 layer, it has no clear() and no 'info'."""
+
+    def __init__(self, name):
+        self.name = name
+        self.hide = False
+        self.frames = GreasePencilFrames()
+
+    def get_frame_at(self, frame_number):
+        shown = [frame for frame in self.frames if frame.frame_number <= frame_number]
+        return max(shown, key=lambda frame: frame.frame_number) if shown else None
+
+
+class ID:
+    """Custom properties like bpy ID blocks, id["key"] = value."""
+
+    def __init__(self, name):
+        self.name = name
+        self._properties = {}
+
+    def __getitem__(self, key):
+        return self._properties[key]
+
+    def __setitem__(self, key, value):
+        self._properties[key] = value
+
+    def __delitem__(self, key):
+        del self._properties[key]
+
+    def __contains__(self, key):
+        return key in self._properties
+
+    def get(self, key, default=None):
+        return self._properties.get(key, default)
+
+
+class GreasePencil(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.layers = Collection(GPencilLayer)
+        self.users = 0
+
+
+class GreasePencilV3(GreasePencil):
+    def __init__(self, name):
+        super().__init__(name)
+        self.layers = Collection(GreasePencilLayer)
+
+
+@record_methods
+class KeyframePoints:
+    """keyframe_points of an F-Curve, foreach_set() takes flat sequences like Blender."""
+
+    def __init__(self):
+        self.co = []
+        self.interpolation = []
+
+    def add(self, count):
+        self.co.extend([0.0, 0.0] * count)
+        self.interpolation.extend([0] * count)
+
+    def foreach_set(self, attribute, values):
+        if len(values) != len(getattr(self, attribute)):
+            raise RuntimeError(f"foreach_set: expected {len(getattr(self, attribute))} values, got {len(values)}")
+        setattr(self, attribute, list(values))
+
+    def __len__(self):
+        return len(self.interpolation)
+
+
+@record_methods
+class FCurve:
+    def __init__(self, data_path, index=0, action_group=""):
+        self.data_path = data_path
+        self.array_index = index
+        self.group = action_group
+        self.keyframe_points = KeyframePoints()
+
+    def update(self):
+        pass
+
+
+@record_methods
+class FCurves:
+    def __init__(self):
+        self._curves = []
+
+    def new(self, data_path, index=0, action_group=""):
+        if self.find(data_path, index=index) is not None:
+            raise RuntimeError(f"F-Curve '{data_path}[{index}]' already exists in action")
+        fcurve = FCurve(data_path, index, action_group)
+        self._curves.append(fcurve)
+        return fcurve
+
+    def find(self, data_path, index=0):
+        for fcurve in self._curves:
+            if fcurve.data_path == data_path and fcurve.array_index == index:
+                return fcurve
+        return None
+
+    def remove(self, fcurve):
+        self._curves.remove(fcurve)
+
+    def __iter__(self):
+        return iter(list(self._curves))
+
+    def __len__(self):
+        return len(self._curves)
+
+
+class Action(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.fcurves = FCurves()
+
+
+class AnimData:
+    def __init__(self):
+        self.action = None
+
+
+class Animatable(ID):
+    """ID with animation data, like objects and shape key datablocks."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.animation_data = None
+
+    def animation_data_create(self):
+        if self.animation_data is None:
+            self.animation_data = AnimData()
+        return self.animation_data
+
+
+class ShapeKey:
+    def __init__(self, name):
+        self.name = name
+        self.value = 0.0
+
+
+class Key(Animatable):
+    def __init__(self, name):
+        super().__init__(name)
+        self.key_blocks = Collection(ShapeKey)
+
+
+class Mesh(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.shape_keys = None
+
+
+class PoseBone(ID):
+    pass
+
+
+class TimeModifier:
+    def __init__(self, name, type):
+        self.name = name
+        self.type = type
+        self.mode = 'NORMAL'
+        self.offset = 1
+        self.layer = ""
+        self.use_keep_loop = True
+
+
+class Object(Animatable):
+    def __init__(self, name, data=None):
+        super().__init__(name)
+        self.data = data
+        self.grease_pencil_modifiers = Collection(TimeModifier)
+        self.mode = "OBJECT"
+        self.pose = None
+        self.type = "MESH" if isinstance(data, Mesh) else "GPENCIL"
+
+    def shape_key_add(self, name="Key", from_mix=True):
+        if self.data.shape_keys is None:
+            self.data.shape_keys = Key("Key")
+        return self.data.shape_keys.key_blocks.new(name)
+
+
+class Sound(ID):
+    def __init__(self, name, filepath=""):
+        super().__init__(name)
+        self.filepath = filepath
+        self.users = 0
+
+
+class SoundStrip:
+    def __init__(self, name, sound, channel, frame_start):
+        self.name = name
+        self.type = 'SOUND'
+        self.sound = sound
+        self.channel = channel
+        self.frame_start = frame_start
+
+
+class MetaStrip:
+    def __init__(self, name, channel, frame_start):
+        self.name = name
+        self.type = 'META'
+        self.channel = channel
+        self.frame_start = frame_start
+        self.sequences = Sequences()
+
+
+@record_methods
+class Sequences:
+    """Strips of the sequence editor, new_sound() loads a new sound datablock like Blender does."""
+
+    def __init__(self):
+        self._strips = []
+
+    def new_sound(self, name, filepath, channel, frame_start):
+        sound = sys.modules["bpy"].data.sounds.new(os.path.basename(filepath), filepath)
+        sound.users += 1
+        strip = SoundStrip(name, sound, channel, frame_start)
+        self._strips.append(strip)
+        return strip
+
+    def new_meta(self, name, channel, frame_start):
+        strip = MetaStrip(name, channel, frame_start)
+        self._strips.append(strip)
+        return strip
+
+    def remove(self, strip):
+        # Like Blender, only the collection holding the strip can remove it
+        self._strips.remove(strip)
+        if strip.type == 'SOUND':
+            strip.sound.users -= 1
+
+    def __iter__(self):
+        return iter(list(self._strips))
+
+    def __len__(self):
+        return len(self._strips)
+
+
+class SequenceEditor:
+    def __init__(self):
+        self.sequences = Sequences()
+
+    @property
+    def sequences_all(self):
+        """All strips, those inside meta strips included, as a live view like Blender's."""
+        return _AllStrips(self.sequences)
+
+
+class _AllStrips:
+    def __init__(self, sequences):
+        self._sequences = sequences
+
+    def __iter__(self):
+        # Iterates the live collections, removing strips while iterating skips strips as in Blender
+        pending = [self._sequences]
+        while pending:
+            sequences = pending.pop(0)
+            for strip in sequences._strips:
+                yield strip
+                if strip.type == 'META':
+                    pending.append(strip.sequences)
+
+
+class Area:
+    def __init__(self):
+        self.type = "VIEW_3D"
+
+
+@record_methods
+class WindowManager:
+    """Timers, modal handlers and progress of the window manager, pending timers fire in run_modal()."""
+
+    def __init__(self):
+        self.timers = []
+        self.handlers = []
+        self.progress = None
+
+    def event_timer_add(self, time_step, window=None):
+        timer = types.SimpleNamespace(time_step=time_step)
+        self.timers.append(timer)
+        return timer
+
+    def event_timer_remove(self, timer):
+        self.timers.remove(timer)
+
+    def modal_handler_add(self, operator):
+        self.handlers.append(operator)
+
+    def progress_begin(self, minimum, maximum):
+        self.progress = minimum
+
+    def progress_update(self, value):
+        self.progress = value
+
+    def progress_end(self):
+        self.progress = None
+
+
+class WorkSpace:
+    def __init__(self):
+        self.status_text = None
+
+    def status_text_set(self, text):
+        self.status_text = text
+
+
+class Render:
+    def __init__(self):
+        self.fps = 24
+
+
+def _dispatch_op(category, name, kwargs):
+    RECORDER.record(f"ops.{category}.{name}")
+    bpy = sys.modules["bpy"]
+    if (category, name) == ("object", "gpencil_add"):
+        gp = bpy.data.grease_pencils.new("GPencil")
+        obj = Object("GPencil", gp)
+        bpy.data.objects.link(obj)
+        bpy.context.object = bpy.context.active_object = obj
+    elif (category, name) == ("sound", "open_mono"):
+        path = kwargs.get("filepath", "")
+        bpy.data.sounds.new(os.path.basename(path), path)
+    return {"FINISHED"}
+
+
+class _OpsCategory:
+    def __init__(self, category):
+        self._category = category
+
+    def __getattr__(self, name):
+        def operator(*args, **kwargs):
+            return _dispatch_op(self._category, name, kwargs)
+        return operator
+
+
+class _Ops:
+    def __getattr__(self, category):
+        return _OpsCategory(category)
+
+
+class _ObjectCollection(Collection):
+    """bpy.data.objects, renaming an object re-keys it like Blender does."""
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            for item in self._items.values():
+                if item.name == key:
+                    return item
+            raise KeyError(key)
+        return super().__getitem__(key)
+
+    def remove(self, item, **kwargs):
+        for key, value in list(self._items.items()):
+            if value is item:
+                del self._items[key]
+
+
+def _make_data(grease_pencil_v3=False):
+    return types.SimpleNamespace(
+        filepath="",
+        actions=Collection(Action),
+        grease_pencils=Collection(GreasePencilV3 if grease_pencil_v3 else GreasePencil),
+        meshes=Collection(Mesh),
+        objects=_ObjectCollection(Object),
+        sounds=Collection(Sound),
+    )
+
+
+def install():
+    """Register the fake bpy modules in sys.modules and return bpy."""
+    bpy = types.ModuleType("bpy")
+    bpy_types = types.ModuleType("bpy.types")
+    bpy_props = types.ModuleType("bpy.props")
+    bpy_utils = types.ModuleType("bpy.utils")
+    bpy_app = types.ModuleType("bpy.app")
+    bpy_extras = types.ModuleType("bpy_extras")
+    io_utils = types.ModuleType("bpy_extras.io_utils")
+
+    for name in ("Operator", "Panel", "PropertyGroup", "Scene", "Object", "GreasePencil"):
+        setattr(bpy_types, name, type(name, (), {}))
+    for kind in ("StringProperty", "BoolProperty", "EnumProperty", "PointerProperty",
+                 "IntProperty", "FloatProperty"):
+        setattr(bpy_props, kind, _prop_function(kind))
+    bpy_utils.register_class = lambda cls: RECORDER.record("utils.register_class")
+    bpy_utils.unregister_class = lambda cls: RECORDER.record("utils.unregister_class")
+    bpy_app.version = (2, 93, 0)
+    bpy_app.background = True
+    bpy_handlers = types.ModuleType("bpy.app.handlers")
+    bpy_handlers.frame_change_pre = []
+    bpy_handlers.frame_change_post = []
+    bpy_handlers.load_post = []
+    bpy_handlers.persistent = lambda function: function
+    bpy_app.handlers = bpy_handlers
+    io_utils.ImportHelper = type("ImportHelper", (), {"filepath": ""})
+    bpy_extras.io_utils = io_utils
+
+    bpy.types = bpy_types
+    bpy.props = bpy_props
+    bpy.utils = bpy_utils
+    bpy.app = bpy_app
+    bpy.ops = _Ops()
+    bpy.path = types.SimpleNamespace(abspath=lambda path: path)
+    bpy.data = _make_data()
+    bpy.context = None
+    sys.modules.update({"bpy": bpy, "bpy.types": bpy_types, "bpy.props": bpy_props, "bpy.utils": bpy_utils,
+                        "bpy.app": bpy_app, "bpy.app.handlers": bpy_handlers, "bpy_extras": bpy_extras,
+                        "bpy_extras.io_utils": io_utils})
+    reset(bpy)
+    return bpy
+
+
+def reset(bpy, grease_pencil_v3=False, **tool_settings):
+    """Start from empty data, 'tool_settings' become attributes of scene.my_tool.
+    With 'grease_pencil_v3' the Grease Pencil data has the Blender 4.3 API.
+    """
+    bpy.app.version = (4, 3, 0) if grease_pencil_v3 else (2, 93, 0)
+    bpy.data = _make_data(grease_pencil_v3)
+    scene = bpy.types.Scene()
+    scene.render = Render()
+    scene.frame_start = 1
+    scene.frame_end = 250
+    scene.frame_current = 1
+    scene.collection = types.SimpleNamespace(objects=Collection())
+    scene.sequence_editor = None
+
+    def sequence_editor_create():
+        scene.sequence_editor = scene.sequence_editor or SequenceEditor()
+        return scene.sequence_editor
+    scene.sequence_editor_create = sequence_editor_create
+    scene.my_tool = types.SimpleNamespace(**tool_settings)
+    bpy.context = types.SimpleNamespace(scene=scene, area=Area(), object=None, active_object=None,
+                                        window=None, window_manager=WindowManager(), workspace=WorkSpace())
+    # Most operators need an object to switch modes on
+    _dispatch_op("object", "gpencil_add", {})
+    bpy.context.object.name = "Stroke"
+
+
+def run_modal(bpy, operator, cancel_after=None):
+    """Invoke 'operator' and send it timer events until it finishes, ESC after 'cancel_after' timer events.
+    Returns the result of the last modal() call.
+    """
+    context = bpy.context
+    result = operator.invoke(context, types.SimpleNamespace(type='NONE', value='NOTHING'))
+    ticks = 0
+    while result == {'RUNNING_MODAL'}:
+        if cancel_after is not None and ticks >= cancel_after:
+            event = types.SimpleNamespace(type='ESC', value='PRESS')
+        else:
+            event = types.SimpleNamespace(type='TIMER', value='NOTHING')
+        result = operator.modal(context, event)
+        ticks += 1
+    context.window_manager.handlers.remove(operator)
+    return result
+
+
+def add_mesh_object(bpy, name, bones=()):
+    """Link a mesh object, with a pose holding 'bones' when given, and make it active."""
+    obj = Object(name, bpy.data.meshes.new(name))
+    if bones:
+        obj.pose = types.SimpleNamespace(bones=Collection(PoseBone))
+        for bone in bones:
+            obj.pose.bones.new(bone)
+    bpy.data.objects.link(obj)
+    bpy.context.object = bpy.context.active_object = obj
+    return obj
+
+
+def draw_strokes(layer, strokes=8, points=64):
+    """Give the first frame of 'layer' some stroke data so copies have a realistic cost."""
+    frame = layer.frames[0] if len(layer.frames) else layer.frames.new(0)
+    if not hasattr(frame, "drawing"):
+        frame.strokes = [GPencilStroke([(float(i), float(s), 0.0) for i in range(points)]) for s in range(strokes)]
+        return frame
+    drawing = GreasePencilDrawing()
+    drawing.add_strokes([points] * strokes)
+    drawing.attributes["position"].data.foreach_set(
+        "vector", [value for s in range(strokes) for i in range(points) for value in (float(i), float(s), 0.0)])
+    frame.drawing = drawing
+    return frame
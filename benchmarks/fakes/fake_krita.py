@@ -0,0 +1,460 @@
+"""Fake ``krita`` module: document, nodes with raster keyframes, actions and the Timeline docker."""
+import sys
+import types
+
+from .fake_qt import QModelIndex, QObject, QTableView, QWidget, pyqtSignal
+from .recorder import RECORDER, record_methods
+
+
+class Rect:
+    def __init__(self, x=0, y=0, width=0, height=0):
+        self._rect = (x, y, width, height)
+
+    def x(self):
+        return self._rect[0]
+
+    def y(self):
+        return self._rect[1]
+
+    def width(self):
+        return self._rect[2]
+
+    def height(self):
+        return self._rect[3]
+
+
+@record_methods
+class Node:
+    """Paint or group layer. Raster content is kept per keyframe time as (rect, bytes)."""
+
+    def __init__(self, document, name, node_type):
+        self._document = document
+        self._name = name
+        self._type = node_type
+        self._children = []
+        self._parent = None
+        self._animated = False
+        self._keyframes = {}
+        self._static = (Rect(), b"")
+        self._visible = True
+        self._opacity = 255
+        self._pinned = False
+
+    def name(self):
+        return self._name
+
+    def setName(self, name):
+        self._name = name
+
+    def type(self):
+        return self._type
+
+    def childNodes(self):
+        return list(self._children)
+
+    def parentNode(self):
+        return self._parent
+
+    def addChildNode(self, child, above):
+        child._parent = self
+        if above is None or above not in self._children:
+            self._children.append(child)
+        else:
+            self._children.insert(self._children.index(above) + 1, child)
+        self._document._structure_changed()
+        return True
+
+    def removeChildNode(self, child):
+        self._children.remove(child)
+        self._document._structure_changed()
+        return True
+
+    def remove(self):
+        if self._parent is not None:
+            return self._parent.removeChildNode(self)
+        return False
+
+    def enableAnimation(self):
+        self._animated = True
+        if self._static[1]:
+            self._keyframes.setdefault(0, self._static)
+
+    def animated(self):
+        return self._animated
+
+    def setPinnedToTimeline(self, pinned):
+        self._pinned = pinned
+
+    def isPinnedToTimeline(self):
+        return self._pinned
+
+    def hasKeyframeAtTime(self, time):
+        return time in self._keyframes
+
+    def _content_time(self):
+        time = self._document._time
+        if time in self._keyframes:
+            return time
+        earlier = [t for t in self._keyframes if t <= time]
+        return max(earlier) if earlier else None
+
+    def _content(self):
+        if not self._animated:
+            return self._static
+        time = self._content_time()
+        return self._keyframes[time] if time is not None else (Rect(), b"")
+
+    def bounds(self):
+        return self._content()[0]
+
+    def pixelData(self, x, y, width, height):
+        rect, data = self._content()
+        if (rect.x(), rect.y(), rect.width(), rect.height()) == (x, y, width, height) and data:
+            return bytes(memoryview(data))
+        return bytes(width * height * 4)
+
+    def setPixelData(self, data, x, y, width, height):
+        content = (Rect(x, y, width, height), bytes(data))
+        if not self._animated:
+            self._static = content
+            return True
+        time = self._content_time()
+        if time is None:
+            return False
+        self._keyframes[time] = content
+        return True
+
+    def setVisible(self, visible):
+        self._visible = visible
+
+    def visible(self):
+        return self._visible
+
+    def setOpacity(self, opacity):
+        self._opacity = opacity
+
+    def opacity(self):
+        return self._opacity
+
+    def setSelected(self, selected):
+        pass
+
+    def keyframe_times(self):
+        """Not part of the Krita API, used by benchmarks to check results."""
+        return sorted(self._keyframes)
+
+
+@record_methods
+class Document:
+    def __init__(self, width=512, height=512):
+        self._width = width
+        self._height = height
+        self._time = 0
+        self._fps = 24
+        self._range = (0, 100)
+        self._root = Node(self, "root", "grouplayer")
+        self._active = None
+        self._annotations = {}
+        self._file_name = ""
+        self._clipboard = None
+        self._projection = b""
+        self.structure_listeners = []
+
+    def _structure_changed(self):
+        for listener in self.structure_listeners:
+            listener()
+
+    def _iter_nodes(self):
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node._children))
+
+    def rootNode(self):
+        return self._root
+
+    def nodeByName(self, name):
+        for node in self._iter_nodes():
+            if node._name == name and node is not self._root:
+                return node
+        return None
+
+    def createGroupLayer(self, name):
+        return Node(self, name, "grouplayer")
+
+    def createNode(self, name, node_type):
+        return Node(self, name, node_type)
+
+    def activeNode(self):
+        return self._active
+
+    def setActiveNode(self, node):
+        self._active = node
+
+    def currentTime(self):
+        return self._time
+
+    def setCurrentTime(self, time):
+        self._time = time
+
+    def refreshProjection(self):
+        # Stands in for recompositing, every node is visited and a canvas sized projection is produced
+        for _ in self._iter_nodes():
+            pass
+        self._projection = bytes(self._width * self._height * 4)
+
+    def waitForDone(self):
+        pass
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def setFramesPerSecond(self, fps):
+        self._fps = fps
+
+    def framesPerSecond(self):
+        return self._fps
+
+    def setPlayBackRange(self, start, end):
+        self._range = (start, end)
+
+    def setFullClipRangeStartTime(self, time):
+        self._range = (time, self._range[1])
+
+    def setFullClipRangeEndTime(self, time):
+        self._range = (self._range[0], time)
+
+    def fullClipRangeEndTime(self):
+        return self._range[1]
+
+    def setAudioTracks(self, tracks):
+        pass
+
+    def fileName(self):
+        return self._file_name
+
+    def annotationTypes(self):
+        return list(self._annotations)
+
+    def annotation(self, key):
+        return self._annotations.get(key, (None, b""))[1]
+
+    def annotationDescription(self, key):
+        return self._annotations.get(key, ("", b""))[0]
+
+    def setAnnotation(self, key, description, annotation):
+        self._annotations[key] = (description, bytes(annotation))
+
+    def removeAnnotation(self, key):
+        self._annotations.pop(key, None)
+
+
+class Action:
+    def __init__(self, krita, name):
+        self._krita = krita
+        self._name = name
+
+    def trigger(self):
+        RECORDER.record(f"Action.trigger.{self._name}")
+        handler = ACTIONS.get(self._name)
+        document = self._krita._document
+        if handler is not None and document is not None:
+            handler(document)
+
+
+def _add_blank_frame(document):
+    node = document._active
+    if node is not None and node._animated:
+        node._keyframes[document._time] = (Rect(), b"")
+
+
+def _remove_frames(document):
+    node = document._active
+    if node is not None:
+        node._keyframes.pop(document._time, None)
+
+
+def _copy_frames_as_clones(document):
+    node = document._active
+    if node is not None and document._time in node._keyframes:
+        document._clipboard = (node, document._time)
+
+
+def _paste_frames(document):
+    node = document._active
+    if node is not None and document._clipboard is not None:
+        source, time = document._clipboard
+        # Clones share the frame content instead of copying it
+        node._keyframes[document._time] = source._keyframes[time]
+
+
+ACTIONS = {"add_blank_frame": _add_blank_frame, "remove_frames": _remove_frames,
+           "copy_frames_as_clones": _copy_frames_as_clones, "paste_frames_from_clipboard": _paste_frames}
+
+
+class _MetaObject:
+    def __init__(self, class_name):
+        self._class_name = class_name
+
+    def className(self):
+        return self._class_name
+
+
+@record_methods
+class TimelineModel(QObject):
+    """Rows are the document layers, column n is frame n, header data is the frame number."""
+    modelReset = pyqtSignal()
+    columnsInserted = pyqtSignal()
+    rowsInserted = pyqtSignal()
+    rowsRemoved = pyqtSignal()
+    layoutChanged = pyqtSignal()
+
+    def __init__(self, document):
+        super().__init__()
+        self._document = document
+
+    def _rows(self):
+        return [node for node in self._document._iter_nodes() if node is not self._document._root]
+
+    def rowCount(self, parent=None):
+        return len(self._rows())
+
+    def columnCount(self, parent=None):
+        return self._document._range[1] + 1
+
+    def headerData(self, section, orientation, role=0):
+        return section
+
+    def index(self, row, column, parent=None):
+        if 0 <= row < self.rowCount() and 0 <= column < self.columnCount():
+            return QModelIndex(row, column, self)
+        return QModelIndex()
+
+    def data(self, index, role=0):
+        rows = self._rows()
+        return rows[index.row()]._name if index.isValid() and index.row() < len(rows) else None
+
+
+class SelectionModel:
+    def clear(self):
+        RECORDER.record("SelectionModel.clear")
+
+    def select(self, selection, flags):
+        RECORDER.record("SelectionModel.select")
+
+    def setCurrentIndex(self, index, flags):
+        RECORDER.record("SelectionModel.setCurrentIndex")
+
+
+@record_methods
+class FramesView(QTableView):
+    def __init__(self, document, parent=None):
+        super().__init__(parent)
+        self._model = TimelineModel(document)
+        self._selection = SelectionModel()
+        document.structure_listeners.append(self._model.rowsInserted.emit)
+
+    def metaObject(self):
+        return _MetaObject("KisAnimTimelineFramesView")
+
+    def model(self):
+        return self._model
+
+    def selectionModel(self):
+        return self._selection
+
+    def scrollTo(self, index):
+        pass
+
+
+class Docker(QWidget):
+    pass
+
+
+class Krita:
+    _instance = None
+
+    def __init__(self):
+        self._document = None
+        self._dockers = []
+        self._actions = {}
+
+    @classmethod
+    def instance(cls):
+        RECORDER.record("Krita.instance")
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def activeDocument(self):
+        RECORDER.record("Krita.activeDocument")
+        return self._document
+
+    def action(self, name):
+        RECORDER.record("Krita.action")
+        if name not in self._actions:
+            self._actions[name] = Action(self, name)
+        return self._actions[name]
+
+    def dockers(self):
+        RECORDER.record("Krita.dockers")
+        return list(self._dockers)
+
+    def addDockWidgetFactory(self, factory):
+        pass
+
+    def new_document(self, width=512, height=512, with_timeline=True):
+        """Not part of the Krita API: create the active document (and a Timeline docker)."""
+        self._document = Document(width, height)
+        self._dockers = []
+        if with_timeline:
+            docker = Docker()
+            docker.setObjectName("TimelineDocker")
+            FramesView(self._document, docker)
+            self._dockers.append(docker)
+        return self._document
+
+
+class DockWidget(QWidget):
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._widget = None
+
+    def setWidget(self, widget):
+        self._widget = widget
+
+    def widget(self):
+        return self._widget
+
+
+class DockWidgetFactoryBase:
+    DockRight = 2
+
+
+class DockWidgetFactory:
+    def __init__(self, docker_id, position, cls):
+        self.docker_id = docker_id
+        self.cls = cls
+
+
+def install():
+    """Register the fake krita module in sys.modules and return it."""
+    krita = types.ModuleType("krita")
+    for name in ("Krita", "DockWidget", "DockWidgetFactory", "DockWidgetFactoryBase", "Node", "Document"):
+        setattr(krita, name, globals()[name])
+    Krita._instance = None
+    sys.modules["krita"] = krita
+    return krita
+
+
+def draw(node, width, height, value=255):
+    """Give 'node' a drawing of width x height pixels at frame 0."""
+    content = (Rect(0, 0, width, height), bytes([value]) * (width * height * 4))
+    if node._animated:
+        node._keyframes[0] = content
+    else:
+        node._static = content
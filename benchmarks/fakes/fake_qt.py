@@ -0,0 +1,510 @@
+"""Fake PyQt5 (QtWidgets, QtCore, uic) with widgets created from the real .ui files."""
+import sys
+import types
+import xml.etree.ElementTree as ElementTree
+
+from .recorder import RECORDER, record_methods
+
+
+class Signal:
+    def __init__(self):
+        self._slots = []
+
+    def connect(self, slot):
+        self._slots.append(slot)
+
+    def disconnect(self, slot=None):
+        if slot is None:
+            self._slots = []
+        elif slot in self._slots:
+            self._slots.remove(slot)
+
+    def emit(self, *args):
+        for slot in list(self._slots):
+            slot(*args)
+
+
+class pyqtSignal:
+    """Descriptor creating one Signal per instance, like the real pyqtSignal."""
+
+    def __init__(self, *types_):
+        self._name = None
+
+    def __set_name__(self, owner, name):
+        self._name = "_signal_" + name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        signal = obj.__dict__.get(self._name)
+        if signal is None:
+            signal = obj.__dict__[self._name] = Signal()
+        return signal
+
+
+class QObject:
+    def __init__(self, parent=None, *args, **kwargs):
+        self._object_name = ""
+        self._parent = parent
+        self._children = []
+        if isinstance(parent, QObject):
+            parent._children.append(self)
+
+    def objectName(self):
+        return self._object_name
+
+    def setObjectName(self, name):
+        self._object_name = name
+
+    def parent(self):
+        return self._parent
+
+    def findChildren(self, cls, name=None):
+        found = []
+        for child in self._children:
+            if isinstance(child, cls) and (name is None or child.objectName() == name):
+                found.append(child)
+            found.extend(child.findChildren(cls, name))
+        return found
+
+    def findChild(self, cls, name=None):
+        children = self.findChildren(cls, name)
+        return children[0] if children else None
+
+    def deleteLater(self):
+        pass
+
+
+class QWidget(QObject):
+    def __init__(self, parent=None, *args, **kwargs):
+        super().__init__(parent)
+        self._visible = True
+        self._enabled = True
+        self._text = ""
+        self._style = ""
+        self._tooltip = ""
+        self._layout = None
+        self._title = ""
+
+    def setVisible(self, visible):
+        self._visible = bool(visible)
+
+    def isVisible(self):
+        return self._visible
+
+    def setEnabled(self, enabled):
+        self._enabled = bool(enabled)
+
+    def isEnabled(self):
+        return self._enabled
+
+    def setText(self, text):
+        self._text = text
+
+    def text(self):
+        return self._text
+
+    def setStyleSheet(self, style):
+        self._style = style
+
+    def styleSheet(self):
+        return self._style
+
+    def setToolTip(self, tooltip):
+        self._tooltip = tooltip
+
+    def setLayout(self, layout):
+        self._layout = layout
+
+    def layout(self):
+        return self._layout
+
+    def setWindowTitle(self, title):
+        self._title = title
+
+    def setFocus(self):
+        pass
+
+
+class QFrame(QWidget):
+    pass
+
+
+class QLabel(QWidget):
+    def __init__(self, text="", parent=None):
+        super().__init__(parent)
+        self._text = text
+
+
+class QPushButton(QWidget):
+    clicked = pyqtSignal()
+
+    def __init__(self, text="", parent=None):
+        super().__init__(parent)
+        self._text = text
+
+    def click(self):
+        self.clicked.emit()
+
+
+class QCheckBox(QWidget):
+    toggled = pyqtSignal(bool)
+
+    def __init__(self, text="", parent=None):
+        super().__init__(parent)
+        self._text = text
+        self._checked = False
+
+    def setChecked(self, checked):
+        changed = bool(checked) != self._checked
+        self._checked = bool(checked)
+        if changed:
+            self.toggled.emit(self._checked)
+
+    def isChecked(self):
+        return self._checked
+
+
+class QSpinBox(QWidget):
+    valueChanged = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._value = 0
+        self._minimum = 0
+        self._maximum = 99
+
+    def setValue(self, value):
+        self._value = max(self._minimum, min(self._maximum, value))
+        self.valueChanged.emit(self._value)
+
+    def value(self):
+        return self._value
+
+    def setMinimum(self, value):
+        self._minimum = value
+
+    def setMaximum(self, value):
+        self._maximum = value
+
+    def setRange(self, minimum, maximum):
+        self._minimum, self._maximum = minimum, maximum
+
+
+class QDoubleSpinBox(QSpinBox):
+    pass
+
+
+class QComboBox(QWidget):
+    currentIndexChanged = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items = []
+        self._index = -1
+
+    def addItem(self, text, data=None):
+        self._items.append((text, data))
+        if self._index < 0:
+            self._index = 0
+
+    def currentIndex(self):
+        return self._index
+
+    def setCurrentIndex(self, index):
+        self._index = index
+        self.currentIndexChanged.emit(index)
+
+    def currentText(self):
+        return self._items[self._index][0] if self._index >= 0 else ""
+
+    def currentData(self):
+        return self._items[self._index][1] if self._index >= 0 else None
+
+    def count(self):
+        return len(self._items)
+
+
+class QProgressBar(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._value = 0
+        self._format = ""
+
+    def setValue(self, value):
+        self._value = value
+
+    def value(self):
+        return self._value
+
+    def setFormat(self, text):
+        self._format = text
+
+    def setMaximum(self, value):
+        pass
+
+    def setRange(self, minimum, maximum):
+        pass
+
+
+class QTextEdit(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lines = []
+
+    def setPlainText(self, text):
+        self._lines = text.split("\n") if text else []
+
+    def append(self, text):
+        self._lines.append(text)
+
+    def toPlainText(self):
+        return "\n".join(self._lines)
+
+    def clear(self):
+        self._lines = []
+
+
+class QTableView(QWidget):
+    pass
+
+
+class QLayout(QObject):
+    def addWidget(self, widget, *args):
+        self._children.append(widget)
+
+    def addLayout(self, layout, *args):
+        self._children.append(layout)
+
+
+class QVBoxLayout(QLayout):
+    pass
+
+
+class QHBoxLayout(QLayout):
+    pass
+
+
+@record_methods
+class QApplication:
+    @staticmethod
+    def processEvents(*args):
+        pass
+
+
+@record_methods
+class QMessageBox:
+    Yes = 0x4000
+    No = 0x10000
+
+    @staticmethod
+    def critical(parent, title, message, *args):
+        return QMessageBox.Yes
+
+    @staticmethod
+    def information(parent, title, message, *args):
+        return QMessageBox.Yes
+
+    @staticmethod
+    def warning(parent, title, message, *args):
+        return QMessageBox.Yes
+
+    @staticmethod
+    def question(parent, title, message, *args):
+        return QMessageBox.Yes
+
+
+class QFileDialog:
+    next_file_name = ""
+
+    @staticmethod
+    def getOpenFileName(*args, **kwargs):
+        return QFileDialog.next_file_name, ""
+
+    @staticmethod
+    def getSaveFileName(*args, **kwargs):
+        return QFileDialog.next_file_name, ""
+
+    @staticmethod
+    def getExistingDirectory(*args, **kwargs):
+        return QFileDialog.next_file_name
+
+
+class Qt:
+    Horizontal = 1
+    Vertical = 2
+    DisplayRole = 0
+    UserRole = 256
+
+
+class QTimer(QObject):
+    """Timer driven by run_event_loop() instead of a real event loop."""
+    timeout = pyqtSignal()
+    _active = []
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._interval = 0
+        self._single_shot = False
+
+    def setInterval(self, msec):
+        self._interval = msec
+
+    def setSingleShot(self, single_shot):
+        self._single_shot = single_shot
+
+    def start(self, msec=None):
+        if msec is not None:
+            self._interval = msec
+        if self not in QTimer._active:
+            QTimer._active.append(self)
+
+    def stop(self):
+        if self in QTimer._active:
+            QTimer._active.remove(self)
+
+    def isActive(self):
+        return self in QTimer._active
+
+    @staticmethod
+    def singleShot(msec, slot):
+        timer = QTimer()
+        timer.setSingleShot(True)
+        timer.timeout.connect(slot)
+        timer.start(msec)
+
+
+def run_event_loop(max_iterations=10 ** 7):
+    """Fire active timers until none is left, returns the number of timeouts."""
+    fired = 0
+    while QTimer._active and fired < max_iterations:
+        for timer in list(QTimer._active):
+            if timer._single_shot:
+                timer.stop()
+            timer.timeout.emit()
+            fired += 1
+    return fired
+
+
+class QThread(QObject):
+    """Runs run() synchronously on start(), which is enough for benchmarking."""
+    started = pyqtSignal()
+    finished = pyqtSignal()
+
+    def start(self):
+        self.started.emit()
+        self.run()
+        self.finished.emit()
+
+    def run(self):
+        pass
+
+    def isRunning(self):
+        return False
+
+    def quit(self):
+        pass
+
+    def wait(self, *args):
+        return True
+
+
+class QByteArray(bytes):
+    def data(self):
+        return bytes(self)
+
+
+class QModelIndex:
+    def __init__(self, row=-1, column=-1, model=None):
+        self._row = row
+        self._column = column
+        self._model = model
+
+    def isValid(self):
+        return self._model is not None and self._row >= 0 and self._column >= 0
+
+    def row(self):
+        return self._row
+
+    def column(self):
+        return self._column
+
+
+class QItemSelection:
+    def __init__(self):
+        self.ranges = []
+
+    def select(self, top_left, bottom_right):
+        self.ranges.append((top_left, bottom_right))
+
+
+class QItemSelectionModel:
+    ClearAndSelect = 3
+    Select = 2
+
+
+class _Uic(types.ModuleType):
+    def loadUi(self, path, base=None):
+        RECORDER.record("uic.loadUi")
+        widgets = sys.modules["PyQt5.QtWidgets"]
+        root_element = ElementTree.parse(path).getroot().find("widget")
+        return _build_widget(root_element, None, widgets)
+
+
+def _build_widget(element, parent, widgets):
+    cls = getattr(widgets, element.get("class"), QWidget)
+    widget = cls(parent=parent)
+    widget.setObjectName(element.get("name", ""))
+    for prop in element.findall("property"):
+        name = prop.get("name")
+        value = prop[0] if len(prop) else None
+        if value is None:
+            continue
+        if value.tag == "bool":
+            flag = value.text == "true"
+            {"checked": getattr(widget, "setChecked", None), "visible": widget.setVisible,
+             "enabled": widget.setEnabled}.get(name, lambda flag: None)(flag)
+        elif value.tag == "string" and name == "text":
+            widget.setText(value.text or "")
+        elif value.tag == "number" and name == "value" and hasattr(widget, "setValue"):
+            widget.setValue(int(value.text))
+        elif value.tag == "number" and name in ("minimum", "maximum") and hasattr(widget, "setMinimum"):
+            getattr(widget, "set" + name.capitalize())(int(value.text))
+    for child in element.iter("widget"):
+        if child is not element and _parent_widget(element, child):
+            _build_widget(child, widget, widgets)
+    return widget
+
+
+def _parent_widget(parent, child):
+    """True if 'child' is a direct widget descendant of 'parent' (through layouts/items only)."""
+    stack = list(parent)
+    while stack:
+        node = stack.pop()
+        if node is child:
+            return True
+        if node.tag != "widget":
+            stack.extend(list(node))
+    return False
+
+
+def install():
+    """Register the fake PyQt5 modules (and hide PyQt6) in sys.modules."""
+    pyqt5 = types.ModuleType("PyQt5")
+    qt_widgets = types.ModuleType("PyQt5.QtWidgets")
+    qt_core = types.ModuleType("PyQt5.QtCore")
+    uic = _Uic("PyQt5.uic")
+    module_globals = globals()
+    for name in ("QWidget", "QFrame", "QLabel", "QPushButton", "QCheckBox", "QSpinBox", "QDoubleSpinBox",
+                 "QComboBox", "QProgressBar", "QTextEdit", "QTableView", "QVBoxLayout", "QHBoxLayout",
+                 "QApplication", "QMessageBox", "QFileDialog"):
+        setattr(qt_widgets, name, module_globals[name])
+    for name in ("Qt", "QTimer", "QObject", "QThread", "pyqtSignal", "QByteArray", "QModelIndex",
+                 "QItemSelection", "QItemSelectionModel"):
+        setattr(qt_core, name, module_globals[name])
+    pyqt5.QtWidgets = qt_widgets
+    pyqt5.QtCore = qt_core
+    pyqt5.uic = uic
+    sys.modules.update({"PyQt5": pyqt5, "PyQt5.QtWidgets": qt_widgets, "PyQt5.QtCore": qt_core,
+                        "PyQt5.uic": uic, "PyQt6": None})
+    return pyqt5
@@ -0,0 +1,48 @@
+"""Counting of fake host API calls."""
+import functools
+from collections import Counter
+
+
+class CallRecorder:
+    """Count calls per "Class.method" name."""
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def record(self, name):
+        self.counts[name] += 1
+
+    def reset(self):
+        self.counts.clear()
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def snapshot(self):
+        return dict(sorted(self.counts.items()))
+
+
+RECORDER = CallRecorder()
+
+
+def _wrap(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        RECORDER.record(name)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def record_methods(cls):
+    """Class decorator recording every call of the public methods defined on 'cls'."""
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("_") or isinstance(value, (type, property)):
+            continue
+        if isinstance(value, staticmethod):
+            setattr(cls, attr, staticmethod(_wrap(f"{cls.__name__}.{attr}", value.__func__)))
+        elif isinstance(value, classmethod):
+            setattr(cls, attr, classmethod(_wrap(f"{cls.__name__}.{attr}", value.__func__)))
+        elif callable(value):
+            setattr(cls, attr, _wrap(f"{cls.__name__}.{attr}", value))
+    return cls
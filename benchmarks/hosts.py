@@ -0,0 +1,43 @@
+"""Load the Blender and Krita importer modules on top of the fake host modules."""
+import importlib.util
+import os
+import sys
+
+from .fakes import fake_bpy, fake_krita, fake_qt
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BLENDER_MODULE = os.path.join(REPO_ROOT, "Papagayo-NGGreasepencilImporterForBlender", "papagayo_import.py")
+BLENDER_BATCH_MODULE = os.path.join(REPO_ROOT, "Papagayo-NGGreasepencilImporterForBlender", "papagayo_batch.py")
+KRITA_MODULE = os.path.join(REPO_ROOT, "Papagayo-NGKritaImporter", "papagayo_importer", "krita_papagayo_import.py")
+
+
+def _load_module(name, path):
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_blender():
+    """Return (papagayo_import module, fake bpy)."""
+    bpy = sys.modules.get("bpy") or fake_bpy.install()
+    module = sys.modules.get("papagayo_import") or _load_module("papagayo_import", BLENDER_MODULE)
+    return module, bpy
+
+
+def load_blender_batch():
+    """Return the papagayo_batch module, on the fake bpy like load_blender()."""
+    load_blender()
+    return sys.modules.get("papagayo_batch") or _load_module("papagayo_batch", BLENDER_BATCH_MODULE)
+
+
+def load_krita():
+    """Return (krita_papagayo_import module, fake krita)."""
+    if "PyQt5.QtWidgets" not in sys.modules:
+        fake_qt.install()
+    krita = sys.modules.get("krita") or fake_krita.install()
+    module = sys.modules.get("krita_papagayo_import") or _load_module("krita_papagayo_import", KRITA_MODULE)
+    return module, krita
@@ -0,0 +1,331 @@
+"""Timed benchmark scenarios for the shared core and both importers.
+
+Usage::
+
+    python -m benchmarks.run [--voices 2] [--duration 60] [--fps 24] [--phonemes 9]
+                             [--repeat 3] [--only SCENARIO ...] [--output results.json]
+                             [--compare previous.json]
+
+A synthetic project is generated, every scenario is run 'repeat' times with a
+fresh host state and the fastest run is kept. Host scenarios run against the
+fake bpy/krita modules from benchmarks.fakes, their API call counts are part of
+the results. Results are written as JSON so runs of different versions can be
+compared with --compare.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import papagayo_core
+from papagayo_core import extract_used_phonemes_from_voice, load_project, stream_project, voice_keyframes
+
+from . import hosts
+from .fakes import RECORDER, fake_bpy, fake_krita, fake_qt
+from .synthetic import write_project
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(cls):
+        SCENARIOS[name] = cls
+        return cls
+    return register
+
+
+class Scenario:
+    """setup() prepares a fresh state outside of the timing, run() is measured."""
+
+    def __init__(self, path, options):
+        self.path = path
+        self.options = options
+
+    def setup(self):
+        pass
+
+    def run(self):
+        raise NotImplementedError
+
+
+@scenario("parse_json")
+class ParseJson(Scenario):
+    def run(self):
+        load_project(self.path)
+
+
+@scenario("parse_stream")
+class ParseStream(Scenario):
+    def run(self):
+        stream_project(self.path)
+
+
+@scenario("phoneme_extraction")
+class PhonemeExtraction(Scenario):
+    def setup(self):
+        self.project = load_project(self.path)
+
+    def run(self):
+        for voice in self.project.voices:
+            extract_used_phonemes_from_voice(voice)
+
+
+@scenario("rest_frames")
+class RestFrames(Scenario):
+    def setup(self):
+        self.project = load_project(self.path)
+
+    def run(self):
+        for voice in self.project.voices:
+            voice_keyframes(voice, rest_frames=True)
+
+
+class KritaScenario(Scenario):
+    def new_importer(self):
+        module, krita = hosts.load_krita()
+        document = krita.Krita.instance().new_document(self.options.canvas, self.options.canvas)
+        importer = module.PapagayoImporter()
+        importer.use_cache_checkbox.setChecked(False)
+        importer.insert_rest_frames.setChecked(True)
+        importer.load_sound_checkbox.setChecked(False)
+        # The fake QThread runs the ProjectLoader synchronously
+        importer.start_loading(self.path)
+        if importer.project is None:
+            raise RuntimeError(f"Could not load {self.path}")
+        return importer, document
+
+
+@scenario("krita_prepare_layers")
+class KritaPrepareLayers(KritaScenario):
+    def setup(self):
+        self.importer, self.document = self.new_importer()
+
+    def run(self):
+        self.importer.prepare_krita_layers()
+
+
+@scenario("krita_prepare_layers_unbatched")
+class KritaPrepareLayersUnbatched(KritaScenario):
+    """Layer preparation with a projection refresh after every layer, for comparison."""
+
+    def setup(self):
+        self.importer, self.document = self.new_importer()
+        self.importer.batch_layers_checkbox.setChecked(False)
+
+    def run(self):
+        self.importer.prepare_krita_layers()
+
+
+@scenario("krita_fill_timeline")
+class KritaFillTimeline(KritaScenario):
+    def setup(self):
+        self.importer, self.document = self.new_importer()
+        self.importer.prepare_krita_layers()
+        size = self.options.drawing
+        for voice in self.importer.project.voices:
+            for node in self.document.nodeByName(voice.name).childNodes():
+                fake_krita.draw(node, size, size)
+
+    def run(self):
+        self.importer.fill_timeline()
+        # The fill runs in timer driven slices
+        fake_qt.run_event_loop()
+
+
+@scenario("krita_refill_timeline")
+class KritaRefillTimeline(KritaFillTimeline):
+    """Filling again with a re-timed project, only the changed keys are touched."""
+
+    def setup(self):
+        super().setup()
+        self.importer.fill_timeline()
+        fake_qt.run_event_loop()
+        # A small re-timing: the keys of one second in the middle of every voice move by a frame
+        fps = self.importer.project.fps
+        for voice in self.importer.project.voices:
+            middle = len(voice.frames) // 2
+            start = voice.frames[middle]
+            for index in range(middle, len(voice.frames)):
+                if voice.frames[index] >= start + fps:
+                    break
+                voice.frames[index] += 1
+
+
+class BlenderScenario(Scenario):
+    grease_pencil_v3 = False
+
+    def new_scene(self):
+        module, bpy = hosts.load_blender()
+        fake_bpy.reset(bpy, self.grease_pencil_v3, rest_frames=True, rest_min_gap=1, rest_after=0, load_sound=False, use_cache=False,
+                       share_drawings=True, min_hold=1, step=1, incremental=True, import_mode='GREASE_PENCIL',
+                       viseme_property="viseme", viseme_bone="")
+        module.project_cache.invalidate()
+        module.get_project(self.path)
+        return module, bpy
+
+
+@scenario("blender_create_objects")
+class BlenderCreateObjects(BlenderScenario):
+    def setup(self):
+        self.module, self.bpy = self.new_scene()
+
+    def run(self):
+        self.module.create_grease_objects(self.path)
+
+
+@scenario("blender_fill_timeline")
+class BlenderFillTimeline(BlenderScenario):
+    def setup(self):
+        self.module, self.bpy = self.new_scene()
+        self.module.create_grease_objects(self.path)
+        for grease_pencil in self.bpy.data.grease_pencils:
+            for layer in grease_pencil.layers:
+                fake_bpy.draw_strokes(layer, self.options.strokes, self.options.points)
+
+    def run(self):
+        self.module.fill_timeline(self.path)
+
+
+@scenario("blender_fill_timeline_v3")
+class BlenderFillTimelineV3(BlenderFillTimeline):
+    """The timeline fill on Grease Pencil v3 data, repeated drawings are instanced."""
+    grease_pencil_v3 = True
+
+
+@scenario("blender_fill_timeline_modal")
+class BlenderFillTimelineModal(BlenderFillTimeline):
+    """The timeline fill through the modal operator, timer slices and progress reports included."""
+
+    def setup(self):
+        super().setup()
+        self.bpy.types.Scene.pg_path = self.path
+        self.operator = self.module.BTN_OP_apply_to_timeline()
+        self.operator.report = lambda kind, message: None
+
+    def run(self):
+        fake_bpy.run_modal(self.bpy, self.operator)
+
+
+@scenario("blender_live_playback")
+class BlenderLivePlayback(BlenderFillTimeline):
+    def run(self):
+        self.module.enable_playback(self.path)
+
+
+@scenario("blender_time_offset")
+class BlenderTimeOffset(BlenderFillTimeline):
+    def run(self):
+        self.module.apply_time_offset(self.path)
+
+
+@scenario("blender_write_fcurves")
+class BlenderWriteFCurves(BlenderScenario):
+    def setup(self):
+        self.module, self.bpy = self.new_scene()
+        self.bpy.context.scene.my_tool.import_mode = 'SHAPE_KEYS'
+        fake_bpy.add_mesh_object(self.bpy, "Face")
+
+    def run(self):
+        self.module.apply_fcurves(self.path)
+
+
+def run_scenario(cls, path, options):
+    runs = []
+    calls = {}
+    for _ in range(options.repeat):
+        bench = cls(path, options)
+        with contextlib.redirect_stdout(io.StringIO()):
+            bench.setup()
+            RECORDER.reset()
+            start = time.perf_counter()
+            bench.run()
+            runs.append(time.perf_counter() - start)
+        calls = RECORDER.snapshot()
+    return {"seconds": min(runs), "runs": runs, "host_calls": sum(calls.values()), "calls": calls}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=hosts.REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    print(f"{'scenario':26} {'previous':>10} {'current':>10} {'ratio':>7} {'calls':>16}")
+    for name, result in results["scenarios"].items():
+        old = previous.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        ratio = result["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        print(f"{name:26} {old['seconds'] * 1000:>8.1f}ms {result['seconds'] * 1000:>8.1f}ms {ratio:>6.2f}x "
+              f"{old['host_calls']:>7}->{result['host_calls']:<7}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the Papagayo-NG importer benchmarks.")
+    parser.add_argument("--voices", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=60, help="seconds of dialogue per voice")
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--phonemes", type=int, default=9, help="size of the phoneme set")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--canvas", type=int, default=512, help="Krita document size in pixels")
+    parser.add_argument("--drawing", type=int, default=256, help="size of the Krita phoneme drawings in pixels")
+    parser.add_argument("--strokes", type=int, default=8, help="strokes per Blender phoneme drawing")
+    parser.add_argument("--points", type=int, default=64, help="points per Blender stroke")
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="run only these scenarios")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    return parser
+
+
+def main(argv=None):
+    options = build_parser().parse_args(argv)
+    names = options.only or list(SCENARIOS)
+    params = {key: getattr(options, key) for key in
+              ("voices", "duration", "fps", "phonemes", "seed", "repeat", "canvas", "drawing", "strokes", "points")}
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "papagayo_core": papagayo_core.__version__,
+            "revision": git_revision(),
+            "params": params,
+        },
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "synthetic.pg2")
+        write_project(path, voices=options.voices, duration=options.duration, fps=options.fps,
+                      phonemes=options.phonemes, seed=options.seed)
+        results["meta"]["file_size"] = os.path.getsize(path)
+        results["meta"]["phonemes"] = load_project(path).num_phonemes
+        for name in names:
+            result = run_scenario(SCENARIOS[name], path, options)
+            results["scenarios"][name] = result
+            print(f"{name:26} {result['seconds'] * 1000:>10.1f}ms {result['host_calls']:>9} host calls",
+                  file=sys.stderr)
+
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+    if options.compare:
+        with open(options.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+    elif not options.output:
+        json.dump(results, sys.stdout, indent=1)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Generator for synthetic Papagayo-NG projects of arbitrary size.
+
+Usage::
+
+    python -m benchmarks.synthetic out.pg2 --voices 3 --duration 1800 --fps 24 --phonemes 10
+"""
+import argparse
+import json
+import random
+import sys
+
+# Preston Blair set used by Papagayo-NG, larger sets get numbered extra shapes
+BASE_PHONEMES = ["AI", "E", "O", "U", "MBP", "FV", "L", "WQ", "etc"]
+# Longest word plus the gap after it, words only start while they still end inside the sound
+MAX_WORD_FRAMES = 6 * 4 + 3
+
+
+def phoneme_set(size):
+    """Return 'size' phoneme names (without "rest")."""
+    names = BASE_PHONEMES[:size]
+    names += [f"X{i}" for i in range(size - len(names))]
+    return names
+
+
+def generate_project(voices=2, duration=60, fps=24, phonemes=9, seed=0):
+    """Return a .pg2 document dict covering 'duration' seconds per voice.
+
+    Phrases are separated by pauses and words by small gaps, so rest frame
+    handling has something to do.
+    """
+    rng = random.Random(seed)
+    names = phoneme_set(phonemes)
+    num_frames = int(duration * fps)
+    voice_list = []
+    for voice_index in range(voices):
+        frame = rng.randint(0, fps)
+        phrases = []
+        while frame < num_frames - max(fps, MAX_WORD_FRAMES):
+            phrase_start = frame
+            words = []
+            for _ in range(rng.randint(2, 8)):
+                if words and frame >= num_frames - MAX_WORD_FRAMES:
+                    break
+                word_start = frame
+                phoneme_list = []
+                for _ in range(rng.randint(1, 6)):
+                    phoneme_list.append({"text": rng.choice(names), "frame": frame})
+                    frame += rng.randint(1, 4)
+                words.append({"text": "word", "start_frame": word_start, "end_frame": frame - 1,
+                              "phonemes": phoneme_list})
+                frame += rng.choice((0, 0, 1, 3))
+            phrases.append({"text": "phrase", "start_frame": phrase_start, "end_frame": frame - 1,
+                            "words": words})
+            frame += rng.randint(fps // 4, fps * 2)
+        used = sorted({p["text"] for phrase in phrases for word in phrase["words"] for p in word["phonemes"]})
+        voice_list.append({"name": f"Voice{voice_index + 1}", "text": "", "num_children": len(phrases),
+                           "used_phonemes": used + ["rest"], "phrases": phrases})
+    return {"version": 2, "sound_path": "", "fps": fps, "sound_duration": num_frames,
+            "num_voices": voices, "voices": voice_list}
+
+
+def write_project(path, **kwargs):
+    """Generate a project and write it to 'path', returning the document."""
+    data = generate_project(**kwargs)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic Papagayo-NG .pg2 file.")
+    parser.add_argument("path")
+    parser.add_argument("--voices", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=60, help="seconds per voice")
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--phonemes", type=int, default=9, help="size of the phoneme set")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    write_project(args.path, voices=args.voices, duration=args.duration, fps=args.fps,
+                  phonemes=args.phonemes, seed=args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
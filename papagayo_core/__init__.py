@@ -0,0 +1,21 @@
+"""Host independent core shared by the Papagayo-NG Blender and Krita importers.
+
+The package is pure Python and has no dependency on bpy or krita, it only
+optionally uses NumPy when it is installed.
+"""
+from .model import PhonemeTable, PhonemeEvent, Word, Phrase, Voice, Project
+from .loader import (ProjectBuilder, validate_papagayo_data, extract_used_phonemes_from_voice,
+                     phoneme_pairs, parse_project, check_project_path, load_project)
+from .cache import ProjectCache, BufferCache
+from .streaming import ProjectStream, iter_project_events, stream_project
+from .index import TimelineIndex, build_index
+from .gaps import REST_PHONEME, silence_intervals, rest_keys, merge_rest_keys
+from .export import voice_keyframes, frame_table, project_summary, export_project
+from .sidecar import hash_file, sidecar_path, write_sidecar, open_sidecar, load_project_cached
+from .profiling import Profiler
+from .timing import reduce_keyframes
+from .diff import (KeyframeDiff, diff_keyframes, redrawn_phonemes, encode_keyframe_record, decode_keyframe_record,
+                   decode_drawing_signatures)
+from .curves import phoneme_channels, viseme_index_coordinates, phoneme_value_coordinates
+
+__version__ = "0.1.0"
@@ -0,0 +1,111 @@
+"""In-process cache of parsed projects."""
+import os
+from collections import OrderedDict
+
+from .loader import load_project
+
+
+class ProjectCache:
+    """Keep parsed projects keyed on their absolute path, mtime and size.
+
+    A cached project is returned as long as the file on disk has not changed,
+    so callers can ask for the project as often as they like (e.g. on every UI
+    redraw) and only pay for a stat call.
+    """
+
+    def __init__(self, loader=load_project, max_entries=8):
+        self.loader = loader
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def _key(file_path):
+        return os.path.abspath(os.fspath(file_path))
+
+    def get(self, file_path):
+        """Return the project for 'file_path', parsing it only if it changed."""
+        key = self._key(file_path)
+        stat = os.stat(key)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == signature:
+            self._entries.move_to_end(key)
+            return entry[1]
+        project = self.loader(file_path)
+        self._entries[key] = (signature, project)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return project
+
+    def peek(self, file_path):
+        """Return the cached project for 'file_path' without checking the file, or None."""
+        entry = self._entries.get(self._key(file_path))
+        return entry[1] if entry is not None else None
+
+    def invalidate(self, file_path=None):
+        """Forget 'file_path', or every cached project when no path is given."""
+        if file_path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(self._key(file_path), None)
+
+    def __contains__(self, file_path):
+        return self._key(file_path) in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class BufferCache:
+    """Least recently used cache of byte buffers bounded by their total size.
+
+    Values are stored with the size they account for; entries larger than the
+    whole budget are never stored. 'hits' and 'misses' count get() results.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Return the cached value for 'key' or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, size):
+        """Store 'value' and evict the least recently used entries beyond max_bytes."""
+        self.discard(key)
+        if size > self.max_bytes:
+            return False
+        self._entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+        return True
+
+    def discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
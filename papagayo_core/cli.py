@@ -0,0 +1,189 @@
+"""Command line conversion of Papagayo-NG projects, without Blender or Krita.
+
+Usage::
+
+    python -m papagayo_core [-o OUTPUT] [--jobs N] [--recursive] FILE_OR_DIR [...]
+
+Every input file gets its own folder in OUTPUT (named after the file, e.g.
+``shot01_pg2``) with per voice keyframe lists and per frame phoneme tables
+(CSV and/or JSON) plus a normalized project.json. With ``--kra SOURCE`` a
+Krita document with the combined lipsync layers is written as well, from a
+folder of ``<phoneme>.png`` drawings or a .kra with phoneme layers.
+Files are processed in parallel in a process pool.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .export import export_project, safe_file_name
+from .kra import verify_kra, write_lipsync_kra
+from .loader import SUPPORTED_EXTENSIONS, load_project
+from .sidecar import load_project_cached
+from .streaming import stream_project
+
+
+def collect_files(paths, recursive=False, exclude=None):
+    """Expand files and directories into a sorted list of Papagayo files."""
+    exclude = os.path.abspath(exclude) if exclude else None
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"File does not exist: {path}")
+        for root, dirs, files in os.walk(path):
+            if exclude:
+                dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != exclude]
+            for name in files:
+                if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                    found.append(os.path.join(root, name))
+            if not recursive:
+                break
+    return sorted(set(found))
+
+
+def output_dirs(files, output_root):
+    """Return one distinct output folder per input file, named after the file."""
+    dirs = []
+    used = set()
+    for file_path in files:
+        name = os.path.basename(file_path).replace(".", "_")
+        candidate = name
+        counter = 1
+        while candidate in used:
+            counter += 1
+            candidate = f"{name}_{counter}"
+        used.add(candidate)
+        dirs.append(os.path.join(output_root, candidate))
+    return dirs
+
+
+def parse_canvas(value):
+    """Parse a WIDTHxHEIGHT canvas size."""
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got '{value}'")
+    return width, height
+
+
+def write_kra(project, file_path, output_dir, kra_source, rest_frames, canvas, share_frames=True, min_gap=1,
+              rest_after=0):
+    """Write and re-open the lipsync .kra of one project, returning its path and the per voice report."""
+    stem = safe_file_name(os.path.splitext(os.path.basename(file_path))[0])
+    kra_path = os.path.join(output_dir, f"{stem}.kra")
+    report = write_lipsync_kra(project, kra_path, kra_source, rest_frames, canvas, share_frames,
+                               min_gap=min_gap, rest_after=rest_after)
+    written = verify_kra(kra_path)
+    for voice_name, voice_report in report.items():
+        if len(written.get(f"{voice_name}_combined", ())) != voice_report["keyframes"]:
+            raise ValueError(f"{kra_path}: keyframes of voice '{voice_name}' did not survive re-opening")
+        if voice_report["missing"]:
+            print(f"[WARNING] {file_path}: no drawing for {', '.join(voice_report['missing'])} "
+                  f"in voice '{voice_name}'", file=sys.stderr)
+    return kra_path, report
+
+
+def process_file(file_path, output_dir, formats, kinds, rest_frames, loader, kra_source=None, canvas=None,
+                 share_frames=True, min_gap=1, rest_after=0):
+    """Convert one file, returning a small report dict (runs in a worker process)."""
+    start = time.perf_counter()
+    report = {"file": file_path, "ok": False}
+    try:
+        if loader == "cache":
+            project = load_project_cached(file_path)
+        elif loader == "stream":
+            project = stream_project(file_path)
+        else:
+            project = load_project(file_path)
+        outputs = export_project(project, output_dir, formats, kinds, rest_frames, min_gap, rest_after)
+        if kra_source:
+            kra_path, kra_report = write_kra(project, file_path, output_dir, kra_source, rest_frames, canvas,
+                                             share_frames, min_gap, rest_after)
+            outputs.append(kra_path)
+            report["kra"] = {
+                "size": os.path.getsize(kra_path),
+                "keyframes": sum(voice["keyframes"] for voice in kra_report.values()),
+                "frames": sum(voice["frames"] for voice in kra_report.values()),
+                "bytes_saved": sum(voice["bytes_saved"] for voice in kra_report.values()),
+            }
+        report.update(ok=True, voices=len(project.voices), phonemes=project.num_phonemes,
+                      outputs=outputs)
+    except Exception as e:
+        report["error"] = f"{type(e).__name__}: {e}"
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m papagayo_core",
+                                     description="Convert Papagayo-NG .pg2/.json files into normalized timing tables.")
+    parser.add_argument("inputs", nargs="+", help="Papagayo-NG files or directories containing them")
+    parser.add_argument("-o", "--output", default="papagayo_export", help="output directory (default: %(default)s)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="search directories recursively")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument("--format", dest="formats", nargs="+", choices=("csv", "json"), default=["csv", "json"],
+                        help="table formats to write")
+    parser.add_argument("--kind", dest="kinds", nargs="+", choices=("keyframes", "frames"),
+                        default=["keyframes", "frames"], help="keyframe lists and/or per frame tables")
+    parser.add_argument("--rest-frames", action="store_true", help="insert rest keys in the silences between words")
+    parser.add_argument("--rest-min-gap", dest="min_gap", type=int, default=1,
+                        help="shortest silence in frames that gets a rest key (default: %(default)s)")
+    parser.add_argument("--rest-after", type=int, default=0,
+                        help="frames the last phoneme is held after the end of a word before the rest key, a rest also "
+                             "follows the last word up to the end frame of the project (default: %(default)s)")
+    parser.add_argument("--loader", choices=("stream", "json", "cache"), default="stream",
+                        help="incremental reader, json.load, or the binary sidecar cache (default: %(default)s)")
+    parser.add_argument("--kra", dest="kra_source", metavar="SOURCE",
+                        help="also write a Krita document, SOURCE is a folder of <phoneme>.png files "
+                             "or a .kra whose voice groups contain the phoneme layers")
+    parser.add_argument("--canvas", type=parse_canvas, metavar="WIDTHxHEIGHT",
+                        help="canvas size of new Krita documents (default: the largest phoneme PNG)")
+    parser.add_argument("--no-share-frames", dest="share_frames", action="store_false",
+                        help="store a copy of the drawing for every keyframe instead of cloning one frame per drawing")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        files = collect_files(args.inputs, args.recursive, exclude=args.output)
+    except FileNotFoundError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 2
+    if not files:
+        print("[ERROR] No .pg2 or .json files found", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    tasks = list(zip(files, output_dirs(files, args.output)))
+    if args.kra_source and not os.path.exists(args.kra_source):
+        print(f"[ERROR] Phoneme source does not exist: {args.kra_source}", file=sys.stderr)
+        return 2
+    options = (args.formats, args.kinds, args.rest_frames, args.loader, args.kra_source, args.canvas,
+               args.share_frames, args.min_gap, args.rest_after)
+    if args.jobs <= 1 or len(files) == 1:
+        reports = [process_file(file_path, output_dir, *options) for file_path, output_dir in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [pool.submit(process_file, file_path, output_dir, *options) for file_path, output_dir in tasks]
+            reports = [future.result() for future in futures]
+
+    failed = 0
+    for report in reports:
+        if report["ok"]:
+            print(f"[INFO] {report['file']}: {report['voices']} voices, {report['phonemes']} phonemes "
+                  f"in {report['seconds']:.2f}s")
+            kra = report.get("kra")
+            if kra:
+                print(f"[INFO]   .kra: {kra['size'] / (1024 * 1024):.1f} MB, {kra['frames']} frames stored for "
+                      f"{kra['keyframes']} keyframes, {kra['bytes_saved'] / (1024 * 1024):.1f} MB not duplicated")
+        else:
+            failed += 1
+            print(f"[ERROR] {report['file']}: {report['error']}", file=sys.stderr)
+    print(f"[INFO] Converted {len(files) - failed}/{len(files)} files in {time.perf_counter() - start:.2f}s")
+    return 1 if failed else 0
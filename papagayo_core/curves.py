@@ -0,0 +1,60 @@
+"""Flat keyframe coordinates for bulk F-curve insertion.
+
+Blender inserts a whole curve with keyframe_points.add(count) and one
+foreach_set("co", coordinates) call, where 'coordinates' is the flat
+sequence frame0, value0, frame1, value1, ... The functions here turn a frame
+ordered (frame, phoneme) key list into such sequences, as ``array("f")`` so
+they are passed on as a buffer without building Python tuples.
+"""
+from array import array
+
+
+def phoneme_channels(keys, phonemes=()):
+    """Return 'phonemes' followed by the phonemes of 'keys' that are not in it, in order of appearance."""
+    channels = list(dict.fromkeys(phonemes))
+    known = set(channels)
+    for _, phoneme in keys:
+        if phoneme not in known:
+            known.add(phoneme)
+            channels.append(phoneme)
+    return channels
+
+
+def viseme_index_coordinates(keys, channels):
+    """Return the coordinates of one curve holding the index of the active phoneme in 'channels'."""
+    index = {name: position for position, name in enumerate(channels)}
+    coordinates = array("f")
+    for frame, phoneme in keys:
+        coordinates.append(frame)
+        coordinates.append(index[phoneme])
+    return coordinates
+
+
+def phoneme_value_coordinates(keys, channels):
+    """Return {phoneme: coordinates} of one curve per phoneme, 1.0 while it is shown and 0.0 otherwise.
+
+    Only the frames where a phoneme starts or ends are keyed on its curve, every
+    curve gets a key at the first frame so it starts from a defined value.
+    """
+    points = {name: {} for name in channels}
+    if keys:
+        first_frame = keys[0][0]
+        for name in channels:
+            points[name][first_frame] = 0.0
+    active = None
+    for frame, phoneme in keys:
+        if phoneme == active:
+            continue
+        if active is not None:
+            points[active][frame] = 0.0
+        points[phoneme][frame] = 1.0
+        active = phoneme
+    coordinates = {}
+    for name, values in points.items():
+        flat = array("f")
+        # Keys come in frame order, so do the points of every curve
+        for frame, value in values.items():
+            flat.append(frame)
+            flat.append(value)
+        coordinates[name] = flat
+    return coordinates
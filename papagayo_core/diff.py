@@ -0,0 +1,127 @@
+"""Compare newly parsed keyframes with the keyframes a host applied before.
+
+The hosts store what they keyed with encode_keyframe_record() (a Krita
+document annotation, a Blender custom property), together with a signature
+of every phoneme drawing they keyed. When the project is applied again only
+the keys in the KeyframeDiff have to be touched, keys of a phoneme whose
+drawing signature changed count as changed.
+"""
+import json
+
+RECORD_VERSION = 2
+# Version 1 records have no drawing signatures, all their drawings count as redrawn
+READABLE_VERSIONS = (1, 2)
+
+
+class KeyframeDiff:
+    """Added, removed and changed keys between two (frame, phoneme) lists.
+
+    'changed' holds (frame, old phoneme, new phoneme), the other lists hold
+    (frame, phoneme). All lists are in frame order.
+    """
+    __slots__ = ("added", "removed", "changed", "unchanged")
+
+    def __init__(self, added=None, removed=None, changed=None, unchanged=None):
+        self.added = added or []
+        self.removed = removed or []
+        self.changed = changed or []
+        self.unchanged = unchanged or []
+
+    def __repr__(self):
+        return (f"KeyframeDiff(added={len(self.added)}, removed={len(self.removed)}, "
+                f"changed={len(self.changed)}, unchanged={len(self.unchanged)})")
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    @property
+    def touched(self):
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+    def operations(self):
+        """Return (frame, old phoneme, new phoneme) in frame order for every key to touch.
+        'old' is None for added keys and 'new' is None for removed keys.
+        """
+        operations = [(frame, None, phoneme) for frame, phoneme in self.added]
+        operations.extend((frame, phoneme, None) for frame, phoneme in self.removed)
+        operations.extend(self.changed)
+        operations.sort(key=lambda operation: operation[0])
+        return operations
+
+
+def diff_keyframes(old_keys, new_keys, redrawn=()):
+    """Return the KeyframeDiff turning 'old_keys' into 'new_keys'.
+    Of keys sharing a frame the last one counts, as in TimelineIndex. Keys of
+    the phonemes in 'redrawn' are changed even where the phoneme stayed the same.
+    """
+    old = dict(old_keys)
+    new = dict(new_keys)
+    diff = KeyframeDiff()
+    for frame in sorted(old.keys() | new.keys()):
+        before = old.get(frame)
+        after = new.get(frame)
+        if before is None:
+            diff.added.append((frame, after))
+        elif after is None:
+            diff.removed.append((frame, before))
+        elif before != after or after in redrawn:
+            diff.changed.append((frame, before, after))
+        else:
+            diff.unchanged.append((frame, after))
+    return diff
+
+
+def redrawn_phonemes(old_signatures, new_signatures):
+    """Return the phonemes of 'new_signatures' whose drawing signature is not the recorded one.
+    Phonemes without a recorded signature count as redrawn.
+    """
+    return {phoneme for phoneme, signature in new_signatures.items() if old_signatures.get(phoneme) != signature}
+
+
+def encode_keyframe_record(voice_keys, drawings=None):
+    """Serialize {voice name: [(frame, phoneme)]} and {voice name: {phoneme: drawing signature}} as a JSON string."""
+    return json.dumps({
+        "version": RECORD_VERSION,
+        "voices": {name: [[frame, phoneme] for frame, phoneme in keys] for name, keys in voice_keys.items()},
+        "drawings": drawings or {},
+    }, separators=(",", ":"))
+
+
+def _read_record(data):
+    if not data:
+        return None
+    if isinstance(data, bytes):
+        data = data.decode("utf-8", errors="replace")
+    try:
+        record = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or record.get("version") not in READABLE_VERSIONS:
+        return None
+    return record
+
+
+def decode_keyframe_record(data):
+    """Return {voice name: [(frame, phoneme)]} from encode_keyframe_record() output.
+    Missing, damaged or newer records decode to {}, which makes the hosts rebuild everything.
+    """
+    record = _read_record(data)
+    if record is None:
+        return {}
+    try:
+        return {name: [(int(frame), str(phoneme)) for frame, phoneme in keys]
+                for name, keys in record.get("voices", {}).items()}
+    except (ValueError, TypeError, AttributeError):
+        return {}
+
+
+def decode_drawing_signatures(data):
+    """Return {voice name: {phoneme: drawing signature}} from encode_keyframe_record() output, {} if there are none."""
+    record = _read_record(data)
+    if record is None:
+        return {}
+    try:
+        return {name: {str(phoneme): str(signature) for phoneme, signature in signatures.items()}
+                for name, signatures in record.get("drawings", {}).items()}
+    except (ValueError, TypeError, AttributeError):
+        return {}
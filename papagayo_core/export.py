@@ -0,0 +1,101 @@
+"""Normalized timing tables and their CSV/JSON serialization."""
+import csv
+import json
+import os
+import re
+
+from .gaps import REST_PHONEME, merge_rest_keys, rest_keys
+from .index import TimelineIndex
+
+
+def voice_keyframes(voice, rest_frames=False, min_gap=1, rest_after=0, end_frame=None):
+    """Return the keyframes of a voice as a frame ordered list of (frame, phoneme).
+
+    With 'rest_frames' a rest key is merged in for every silence between the
+    words of at least 'min_gap' frames, 'rest_after' frames after it starts,
+    and after the last word when that is not past 'end_frame' (see
+    papagayo_core.gaps). Both importers and the command line use this.
+    """
+    keyframes = [(event.frame, event.text) for event in TimelineIndex(voice)]
+    if not rest_frames:
+        return keyframes
+    return merge_rest_keys(keyframes, rest_keys(voice, min_gap, rest_after, end_frame))
+
+
+def frame_table(keyframes, num_frames):
+    """Return the phoneme shown on every frame in range(num_frames), "" before the first key."""
+    table = [""] * max(num_frames, 0)
+    current = ""
+    keys = iter(keyframes)
+    key = next(keys, None)
+    for frame in range(len(table)):
+        while key is not None and key[0] <= frame:
+            current = key[1]
+            key = next(keys, None)
+        table[frame] = current
+    return table
+
+
+def safe_file_name(name):
+    """Return 'name' usable as a file name on every platform."""
+    return re.sub(r'[<>:"/\\|?*\x00-\x1f]', "_", name).strip(" .") or "voice"
+
+
+def project_summary(project, rest_frames=False, min_gap=1, rest_after=0):
+    """Return a JSON serializable dict with the normalized timing of every voice."""
+    return {
+        "source": project.path,
+        "fps": project.fps,
+        "duration": project.duration,
+        "sound_path": project.resolve_sound_path(),
+        "voices": [{
+            "name": voice.name,
+            "used_phonemes": list(voice.used_phonemes),
+            "keyframes": [list(key) for key in voice_keyframes(voice, rest_frames, min_gap, rest_after,
+                                                               project.last_frame)],
+        } for voice in project.voices],
+    }
+
+
+def write_voice_csv(path, voice, keyframes, num_frames, kind):
+    """Write either the 'keyframes' or the per 'frames' table of a voice as CSV."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["frame", "phoneme"])
+        if kind == "keyframes":
+            writer.writerows(keyframes)
+        else:
+            writer.writerows(enumerate(frame_table(keyframes, num_frames)))
+
+
+def write_voice_json(path, voice, keyframes, num_frames, kind):
+    """Write either the 'keyframes' or the per 'frames' table of a voice as JSON."""
+    if kind == "keyframes":
+        data = {"voice": voice.name, "keyframes": [list(key) for key in keyframes]}
+    else:
+        data = {"voice": voice.name, "frames": frame_table(keyframes, num_frames)}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+WRITERS = {"csv": write_voice_csv, "json": write_voice_json}
+
+
+def export_project(project, output_dir, formats=("csv", "json"), kinds=("keyframes", "frames"),
+                   rest_frames=False, min_gap=1, rest_after=0):
+    """Write the timing tables of every voice into 'output_dir' and return the written paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    num_frames = project.duration + 1
+    for voice in project.voices:
+        keyframes = voice_keyframes(voice, rest_frames, min_gap, rest_after, project.last_frame)
+        for kind in kinds:
+            for fmt in formats:
+                path = os.path.join(output_dir, f"{safe_file_name(voice.name)}.{kind}.{fmt}")
+                WRITERS[fmt](path, voice, keyframes, num_frames, kind)
+                written.append(path)
+    path = os.path.join(output_dir, "project.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(project_summary(project, rest_frames, min_gap, rest_after), f)
+    written.append(path)
+    return written
@@ -0,0 +1,105 @@
+"""Silence detection and rest keys.
+
+A voice is silent on the frames no word (or word-less phrase) spans, word
+end frames included as in TimelineIndex. silence_intervals() finds them in
+one pass over the spans sorted by start frame (vectorized with NumPy when it
+is installed), rest_keys() turns them into rest keys and merge_rest_keys()
+merges those into the phoneme keys, which is what voice_keyframes() returns
+to the hosts.
+"""
+from array import array
+from heapq import merge
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+REST_PHONEME = "rest"
+
+
+def speech_spans(voice):
+    """Return (starts, ends) of the words of 'voice' plus its phrases without words, as array('i')."""
+    starts = array("i", voice.word_starts)
+    ends = array("i", voice.word_ends)
+    offsets = voice.phrase_word_offsets
+    for phrase in range(len(voice.phrase_starts)):
+        if offsets[phrase] == offsets[phrase + 1]:
+            starts.append(voice.phrase_starts[phrase])
+            ends.append(voice.phrase_ends[phrase])
+    return starts, ends
+
+
+def _gaps_numpy(starts, ends):
+    starts = numpy.frombuffer(starts, dtype=numpy.intc)
+    ends = numpy.frombuffer(ends, dtype=numpy.intc)
+    order = numpy.argsort(starts, kind="stable")
+    starts = starts[order]
+    # Latest end frame so far, a long word can span several shorter ones
+    reach = numpy.maximum.accumulate(ends[order])
+    gap_starts = reach[:-1] + 1
+    gap_stops = starts[1:]
+    found = gap_stops > gap_starts
+    return int(starts[0]), list(zip(gap_starts[found].tolist(), gap_stops[found].tolist())), int(reach[-1])
+
+
+def _gaps_python(starts, ends):
+    spans = sorted(zip(starts, ends), key=lambda span: span[0])
+    gaps = []
+    reach = spans[0][1]
+    for start, end in spans[1:]:
+        if start > reach + 1:
+            gaps.append((reach + 1, start))
+        reach = max(reach, end)
+    return spans[0][0], gaps, reach
+
+
+def silence_intervals(voice, min_gap=1):
+    """Return the (start, stop) frame ranges in which 'voice' is silent, 'stop' exclusive.
+
+    The silence before the first word starts at frame 0, the one after the
+    last word has 'stop' None. Ranges shorter than 'min_gap' frames are left out.
+    """
+    starts, ends = speech_spans(voice)
+    if not starts:
+        return []
+    if numpy is not None:
+        first, gaps, last = _gaps_numpy(starts, ends)
+    else:
+        first, gaps, last = _gaps_python(starts, ends)
+    min_gap = max(int(min_gap), 1)
+    intervals = [(0, first)] if first >= min_gap else []
+    intervals.extend(gap for gap in gaps if gap[1] - gap[0] >= min_gap)
+    intervals.append((last + 1, None))
+    return intervals
+
+
+def rest_keys(voice, min_gap=1, rest_after=0, end_frame=None):
+    """Return the frame ordered (frame, REST_PHONEME) keys for the silences of 'voice'.
+
+    The rest key of a silence is placed 'rest_after' frames after it starts,
+    i.e. after the end frame of the word before it, so the last mouth shape is
+    held that long. Silences shorter than 'min_gap' frames, or too short to
+    reach the rest, keep the last shape. The silence after the last word gets
+    a rest too, unless it would come after 'end_frame'.
+    """
+    rest_after = max(int(rest_after), 0)
+    keys = []
+    for start, stop in silence_intervals(voice, min_gap):
+        frame = start + rest_after
+        if stop is None:
+            if end_frame is None or frame <= end_frame:
+                keys.append((frame, REST_PHONEME))
+        elif frame < stop:
+            keys.append((frame, REST_PHONEME))
+    return keys
+
+
+def merge_rest_keys(phoneme_keys, rest):
+    """Merge frame ordered rest keys into frame ordered phoneme keys.
+    On a shared frame the phoneme key comes last, so it is the one shown.
+    """
+    return [(frame, phoneme) for frame, _, phoneme in merge(
+        ((frame, 0, phoneme) for frame, phoneme in rest),
+        ((frame, 1, phoneme) for frame, phoneme in phoneme_keys),
+        key=lambda key: (key[0], key[1]))]
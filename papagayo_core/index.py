@@ -0,0 +1,118 @@
+"""Sorted frame index over the phoneme events of a voice.
+
+Answers "which phoneme, word and phrase is active at frame N" in O(log n)
+with ``bisect`` (or ``numpy.searchsorted`` for batch queries when NumPy is
+installed) instead of walking every phrase.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+from .model import Phrase, Word
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _is_sorted(values):
+    return all(values[i] <= values[i + 1] for i in range(len(values) - 1))
+
+
+class TimelineIndex:
+    """Frame ordered view on the phoneme events of a Voice.
+
+    A phoneme is active from its frame until the frame of the next phoneme.
+    Events sharing a frame keep their file order, the last one wins.
+    """
+    __slots__ = ("voice", "frames", "order", "_word_order", "_word_starts", "_phrases_sorted")
+
+    def __init__(self, voice):
+        self.voice = voice
+        if _is_sorted(voice.frames):
+            # Already in frame order, the voice columns are used as they are
+            self.frames = voice.frames
+            self.order = None
+        else:
+            self.order = array("i", sorted(range(len(voice.frames)), key=voice.frames.__getitem__))
+            self.frames = array("i", (voice.frames[i] for i in self.order))
+        if _is_sorted(voice.word_starts):
+            self._word_order = None
+            self._word_starts = voice.word_starts
+        else:
+            self._word_order = array("i", sorted(range(len(voice.word_starts)), key=voice.word_starts.__getitem__))
+            self._word_starts = array("i", (voice.word_starts[i] for i in self._word_order))
+        self._phrases_sorted = _is_sorted(voice.phrase_starts)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        """Yield all phoneme events in frame order."""
+        for position in range(len(self.frames)):
+            yield self.event(position)
+
+    def event(self, position):
+        """Return the event at 'position' in frame order."""
+        if self.order is not None:
+            position = self.order[position]
+        return self.voice.event(position)
+
+    def position_at(self, frame):
+        """Return the frame order position of the phoneme active at 'frame', or -1."""
+        return bisect_right(self.frames, frame) - 1
+
+    def positions_at(self, frames):
+        """Return the positions of the phonemes active at each of 'frames'."""
+        if numpy is not None:
+            return numpy.searchsorted(numpy.asarray(self.frames), numpy.asarray(frames), side="right") - 1
+        return [bisect_right(self.frames, frame) - 1 for frame in frames]
+
+    def at(self, frame):
+        """Return the PhonemeEvent active at 'frame', or None before the first phoneme."""
+        position = self.position_at(frame)
+        if position < 0:
+            return None
+        return self.event(position)
+
+    def phoneme_at(self, frame):
+        """Return the name of the phoneme active at 'frame', or None."""
+        event = self.at(frame)
+        return event.text if event is not None else None
+
+    def word_at(self, frame):
+        """Return the Word spanning 'frame', or None between words."""
+        voice = self.voice
+        position = bisect_right(self._word_starts, frame) - 1
+        if position < 0:
+            return None
+        index = position if self._word_order is None else self._word_order[position]
+        if voice.word_ends[index] < frame:
+            return None
+        return Word(voice, index)
+
+    def phrase_at(self, frame):
+        """Return the Phrase spanning 'frame', or None between phrases."""
+        voice = self.voice
+        if self._phrases_sorted:
+            candidates = (bisect_right(voice.phrase_starts, frame) - 1,)
+        else:
+            candidates = range(len(voice.phrase_starts))
+        for index in candidates:
+            if index >= 0 and voice.phrase_starts[index] <= frame <= voice.phrase_ends[index]:
+                return Phrase(voice, index)
+        return None
+
+    def range_positions(self, start, end):
+        """Return the (first, stop) positions of the phonemes with start <= frame < end."""
+        return bisect_left(self.frames, start), bisect_left(self.frames, end)
+
+    def phonemes_between(self, start, end):
+        """Return the phoneme events with start <= frame < end in frame order."""
+        first, stop = self.range_positions(start, end)
+        return [self.event(position) for position in range(first, stop)]
+
+
+def build_index(project):
+    """Return a TimelineIndex for every voice of 'project', keyed by voice name."""
+    return {voice.name: TimelineIndex(voice) for voice in project.voices}
@@ -0,0 +1,656 @@
+"""Read and write Krita .kra documents without Krita.
+
+A .kra file is a zip archive with a ``mimetype`` entry, ``maindoc.xml``
+describing the layer tree and, per paint layer, tiled pixel data in
+``<image>/layers/<filename>``. Animated layers list their keyframes in
+``<filename>.keyframes.xml`` and store one tile file per frame. Keyframes
+referencing the same frame file are loaded by Krita as clones of one frame.
+
+Only 8-bit RGBA layers are handled. Tiles are written uncompressed (flag
+byte 0), tiles read from Krita documents may also be LZF compressed.
+"""
+import os
+import struct
+import uuid
+import xml.etree.ElementTree as ElementTree
+import zipfile
+import zlib
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from .export import voice_keyframes
+from .timing import reduce_keyframes
+
+KRA_MIMETYPE = b"application/x-krita"
+KRITA_NS = "http://www.calligra.org/DTD/krita"
+DOCTYPE = "<!DOCTYPE DOC PUBLIC '-//KDE//DTD krita 2.0//EN' 'http://www.calligra.org/DTD/krita-2.0.dtd'>"
+TILE_SIZE = 64
+PIXEL_SIZE = 4
+TILE_BYTES = TILE_SIZE * TILE_SIZE * PIXEL_SIZE
+RAW_TILE_FLAG = 0
+LZF_TILE_FLAG = 1
+EMPTY_ALPHA = bytes(TILE_SIZE * TILE_SIZE)
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class KraError(ValueError):
+    """Raised for archives and images this module can't read."""
+
+
+class Frame:
+    """Pixels of one layer frame: non-empty 64x64 BGRA tiles keyed on their (x, y) plus the frame offset."""
+    __slots__ = ("tiles", "x", "y")
+
+    def __init__(self, tiles=None, x=0, y=0):
+        self.tiles = tiles if tiles is not None else {}
+        self.x = x
+        self.y = y
+
+    @property
+    def nbytes(self):
+        return len(self.tiles) * TILE_BYTES
+
+
+# Tile data
+
+
+def lzf_decompress(data, output_size):
+    """Decompress liblzf data, the format Krita uses for compressed tiles."""
+    output = bytearray()
+    position = 0
+    end = len(data)
+    while position < end:
+        control = data[position]
+        position += 1
+        if control < 32:
+            length = control + 1
+            output += data[position:position + length]
+            position += length
+            continue
+        length = control >> 5
+        reference = len(output) - ((control & 0x1f) << 8) - 1
+        if length == 7:
+            length += data[position]
+            position += 1
+        reference -= data[position]
+        position += 1
+        length += 2
+        if reference < 0:
+            raise KraError("Invalid back reference in LZF data")
+        if reference + length <= len(output):
+            output += output[reference:reference + length]
+        else:
+            # Overlapping copy repeats the bytes written so far
+            for index in range(reference, reference + length):
+                output.append(output[index])
+    if len(output) != output_size:
+        raise KraError(f"LZF data decompressed to {len(output)} bytes, expected {output_size}")
+    return output
+
+
+def delinearize(data, pixel_size):
+    """Interleave the per channel planes of a decompressed tile back into pixels."""
+    pixels = len(data) // pixel_size
+    output = bytearray(len(data))
+    for channel in range(pixel_size):
+        output[channel::pixel_size] = data[channel * pixels:(channel + 1) * pixels]
+    return bytes(output)
+
+
+def read_tile_data(data):
+    """Parse a Krita tile file (VERSION 2) into (pixel size, {(x, y): tile bytes})."""
+    position = 0
+    header = {}
+    while len(header) < 5:
+        end = data.index(b"\n", position)
+        key, _, value = data[position:end].decode("ascii").partition(" ")
+        header[key] = value
+        position = end + 1
+    if header.get("VERSION") != "2":
+        raise KraError(f"Unsupported tile data version: {header.get('VERSION')}")
+    if int(header["TILEWIDTH"]) != TILE_SIZE or int(header["TILEHEIGHT"]) != TILE_SIZE:
+        raise KraError("Unsupported tile size")
+    pixel_size = int(header["PIXELSIZE"])
+    tile_bytes = TILE_SIZE * TILE_SIZE * pixel_size
+    tiles = {}
+    for _ in range(int(header["DATA"])):
+        end = data.index(b"\n", position)
+        x, y, _, size = data[position:end].decode("ascii").split(",")
+        position = end + 1
+        size = int(size)
+        chunk = data[position:position + size]
+        position += size
+        if chunk[0] == LZF_TILE_FLAG:
+            tile = delinearize(lzf_decompress(chunk[1:], tile_bytes), pixel_size)
+        elif chunk[0] == RAW_TILE_FLAG:
+            tile = bytes(chunk[1:1 + tile_bytes])
+        else:
+            raise KraError(f"Unknown tile compression flag {chunk[0]}")
+        tiles[(int(x), int(y))] = tile
+    return pixel_size, tiles
+
+
+def write_tile_data(tiles, pixel_size=PIXEL_SIZE):
+    """Serialize {(x, y): tile bytes} as an uncompressed Krita tile file."""
+    size = TILE_SIZE * TILE_SIZE * pixel_size + 1
+    parts = [f"VERSION 2\nTILEWIDTH {TILE_SIZE}\nTILEHEIGHT {TILE_SIZE}\nPIXELSIZE {pixel_size}\n"
+             f"DATA {len(tiles)}\n".encode("ascii")]
+    flag = bytes([RAW_TILE_FLAG])
+    for (x, y), tile in sorted(tiles.items(), key=lambda item: (item[0][1], item[0][0])):
+        parts.append(f"{x},{y},LZF,{size}\n".encode("ascii"))
+        parts.append(flag)
+        parts.append(tile)
+    return b"".join(parts)
+
+
+def frame_from_rgba(width, height, rgba, x=0, y=0):
+    """Cut straight RGBA pixels into Krita's BGRA tiles, fully transparent tiles are left out."""
+    bgra = bytearray(rgba)
+    bgra[0::4] = rgba[2::4]
+    bgra[2::4] = rgba[0::4]
+    row_bytes = width * PIXEL_SIZE
+    tile_row_bytes = TILE_SIZE * PIXEL_SIZE
+    tiles = {}
+    for tile_y in range(0, height, TILE_SIZE):
+        rows = min(TILE_SIZE, height - tile_y)
+        for tile_x in range(0, width, TILE_SIZE):
+            start = tile_x * PIXEL_SIZE
+            length = min(TILE_SIZE, width - tile_x) * PIXEL_SIZE
+            padding = bytes(tile_row_bytes - length)
+            lines = []
+            for row in range(tile_y, tile_y + rows):
+                offset = row * row_bytes + start
+                lines.append(bgra[offset:offset + length])
+                if padding:
+                    lines.append(padding)
+            tile = b"".join(lines) + bytes((TILE_SIZE - rows) * tile_row_bytes)
+            if tile[3::4] != EMPTY_ALPHA:
+                tiles[(tile_x, tile_y)] = tile
+    return Frame(tiles, x, y)
+
+
+# PNG
+
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def _unfilter(raw, stride, height, unit):
+    output = bytearray(stride * height)
+    previous = bytearray(stride)
+    position = 0
+    for row in range(height):
+        filter_type = raw[position]
+        line = bytearray(raw[position + 1:position + 1 + stride])
+        position += stride + 1
+        if filter_type == 1:
+            for i in range(unit, stride):
+                line[i] = (line[i] + line[i - unit]) & 0xff
+        elif filter_type == 2:
+            line = bytearray((a + b) & 0xff for a, b in zip(line, previous))
+        elif filter_type == 3:
+            for i in range(stride):
+                left = line[i - unit] if i >= unit else 0
+                line[i] = (line[i] + ((left + previous[i]) >> 1)) & 0xff
+        elif filter_type == 4:
+            for i in range(stride):
+                left = line[i - unit] if i >= unit else 0
+                up_left = previous[i - unit] if i >= unit else 0
+                line[i] = (line[i] + _paeth(left, previous[i], up_left)) & 0xff
+        elif filter_type != 0:
+            raise KraError(f"Invalid PNG filter type {filter_type}")
+        output[row * stride:(row + 1) * stride] = line
+        previous = line
+    return output
+
+
+def read_png(path):
+    """Return (width, height, RGBA bytes) of a PNG file.
+
+    Pillow is used when it is installed, otherwise non-interlaced 8/16 bit
+    gray, RGB, palette and alpha PNGs are decoded in pure Python.
+    """
+    if Image is not None:
+        with Image.open(path) as image:
+            image = image.convert("RGBA")
+            return image.width, image.height, image.tobytes()
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(PNG_SIGNATURE):
+        raise KraError(f"Not a PNG file: {path}")
+    position = len(PNG_SIGNATURE)
+    idat = []
+    palette = transparency = None
+    while position < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[position:position + 8])
+        chunk = data[position + 8:position + 8 + length]
+        position += length + 12
+        if chunk_type == b"IHDR":
+            width, height, depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", chunk)
+        elif chunk_type == b"PLTE":
+            palette = chunk
+        elif chunk_type == b"tRNS":
+            transparency = chunk
+        elif chunk_type == b"IDAT":
+            idat.append(chunk)
+        elif chunk_type == b"IEND":
+            break
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}.get(color_type)
+    if channels is None or interlace or depth not in (8, 16) or (color_type == 3 and depth != 8):
+        raise KraError(f"Unsupported PNG format in {path}")
+    unit = channels * depth // 8
+    pixels = _unfilter(zlib.decompress(b"".join(idat)), width * unit, height, unit)
+    if depth == 16:
+        pixels = pixels[0::2]
+    count = width * height
+    rgba = bytearray(count * 4)
+    if color_type == 6:
+        rgba[:] = pixels
+    elif color_type == 2:
+        for channel in range(3):
+            rgba[channel::4] = pixels[channel::3]
+        rgba[3::4] = b"\xff" * count
+    elif color_type in (0, 4):
+        for channel in range(3):
+            rgba[channel::4] = pixels[0::channels]
+        rgba[3::4] = pixels[1::2] if color_type == 4 else b"\xff" * count
+    else:
+        alpha = (transparency or b"") + b"\xff" * 256
+        colors = [palette[i * 3:i * 3 + 3] + alpha[i:i + 1] for i in range(len(palette) // 3)]
+        rgba[:] = b"".join(colors[index] for index in pixels)
+    return width, height, bytes(rgba)
+
+
+def load_phoneme_pngs(directory):
+    """Return ({phoneme: Frame}, (width, height)) for the '<phoneme>.png' files in 'directory'."""
+    frames = {}
+    width = height = 0
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        if extension.lower() != ".png":
+            continue
+        png_width, png_height, rgba = read_png(os.path.join(directory, name))
+        frames[stem] = frame_from_rgba(png_width, png_height, rgba)
+        width, height = max(width, png_width), max(height, png_height)
+    if not frames:
+        raise KraError(f"No phoneme PNG files found in {directory}")
+    return frames, (width, height)
+
+
+# Documents
+
+
+def _local(tag):
+    return tag.rpartition("}")[2]
+
+
+def _point(element, name):
+    child = next((c for c in element if _local(c.tag) == name), None)
+    if child is None:
+        return 0, 0
+    return int(float(child.get("x", 0))), int(float(child.get("y", 0)))
+
+
+class KraDocument:
+    """A .kra archive opened for reading and for adding layers.
+
+    New layers are added to the parsed maindoc.xml and their files are kept in
+    memory until save(), every entry of the source archive is copied as is.
+    """
+
+    def __init__(self, root, entries=None, source=None):
+        self.root = root
+        self.image = next(c for c in root if _local(c.tag) == "IMAGE")
+        self.source = source
+        self._archive = None
+        self.entries = entries if entries is not None else {}
+        self.removed = set()
+        self._namespace = root.tag[1:].partition("}")[0] if root.tag.startswith("{") else ""
+        self._filenames = {element.get("filename") for element in root.iter() if element.get("filename")}
+
+    @classmethod
+    def new(cls, width, height, name="Papagayo"):
+        ElementTree.register_namespace("", KRITA_NS)
+        root = ElementTree.Element(f"{{{KRITA_NS}}}DOC", {
+            "syntaxVersion": "2.0", "kritaVersion": "5.0.0", "editor": "Krita"})
+        image = ElementTree.SubElement(root, f"{{{KRITA_NS}}}IMAGE", {
+            "name": name, "mime": "application/x-kra", "width": str(width), "height": str(height),
+            "colorspacename": "RGBA", "profile": "sRGB-elle-V2-srgbtrc.icc",
+            "x-res": "300", "y-res": "300", "description": ""})
+        ElementTree.SubElement(image, f"{{{KRITA_NS}}}layers")
+        return cls(root)
+
+    @classmethod
+    def open(cls, path):
+        with zipfile.ZipFile(path) as archive:
+            if archive.read("mimetype").strip() != KRA_MIMETYPE:
+                raise KraError(f"Not a Krita document: {path}")
+            ElementTree.register_namespace("", KRITA_NS)
+            root = ElementTree.fromstring(archive.read("maindoc.xml"))
+        return cls(root, source=path)
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _tag(self, name):
+        return f"{{{self._namespace}}}{name}" if self._namespace else name
+
+    @property
+    def name(self):
+        return self.image.get("name")
+
+    @property
+    def width(self):
+        return int(self.image.get("width"))
+
+    @property
+    def height(self):
+        return int(self.image.get("height"))
+
+    def layer_path(self, file_name):
+        return f"{self.name}/layers/{file_name}"
+
+    def read(self, file_name):
+        """Return the bytes of a file in the layers folder, or None."""
+        path = self.layer_path(file_name)
+        if path in self.entries:
+            return self.entries[path]
+        if self.source is None or self._is_removed(path):
+            return None
+        if self._archive is None:
+            self._archive = zipfile.ZipFile(self.source)
+        try:
+            return self._archive.read(path)
+        except KeyError:
+            return None
+
+    def layers(self, parent=None):
+        """Return the layer elements directly below 'parent' (the image by default), top first."""
+        container = next((c for c in (self.image if parent is None else parent) if _local(c.tag) == "layers"), None)
+        return [] if container is None else [c for c in container if _local(c.tag) == "layer"]
+
+    def find_layer(self, name, nodetype=None, parent=None):
+        for layer in self.layers(parent):
+            if layer.get("name") == name and (nodetype is None or layer.get("nodetype") == nodetype):
+                return layer
+        return None
+
+    def keyframes(self, layer):
+        """Return [(time, frame file, (x, y) offset)] of an animated layer, [] otherwise."""
+        file_name = layer.get("keyframes")
+        data = self.read(file_name) if file_name else None
+        if not data:
+            return []
+        keys = []
+        for channel in ElementTree.fromstring(data):
+            if channel.get("name") != "content":
+                continue
+            for key in channel:
+                keys.append((int(key.get("time")), key.get("frame"), _point(key, "offset")))
+        return sorted(keys)
+
+    def read_frame(self, layer, time=0):
+        """Return the Frame of a paint layer shown at 'time'."""
+        if layer.get("colorspacename", "RGBA") != "RGBA":
+            raise KraError(f"Layer '{layer.get('name')}' is not 8-bit RGBA")
+        x, y = int(layer.get("x", 0)), int(layer.get("y", 0))
+        keys = self.keyframes(layer)
+        shown = [key for key in keys if key[0] <= time] or keys[:1]
+        data = None
+        if shown:
+            _, frame_file, (offset_x, offset_y) = shown[-1]
+            x, y = x + offset_x, y + offset_y
+            data = self.read(frame_file)
+        if data is None:
+            # Layers with a single frame keep it in the layer file
+            data = self.read(layer.get("filename"))
+        if data is None:
+            return Frame(x=x, y=y)
+        pixel_size, tiles = read_tile_data(data)
+        if pixel_size != PIXEL_SIZE:
+            raise KraError(f"Layer '{layer.get('name')}' is not 8-bit RGBA")
+        return Frame(tiles, x, y)
+
+    def phoneme_frames(self, parent=None):
+        """Return {layer name: Frame at time 0} of the paint layers below 'parent'."""
+        return {layer.get("name"): self.read_frame(layer) for layer in self.layers(parent)
+                if layer.get("nodetype") == "paintlayer"}
+
+    def _new_filename(self):
+        counter = len(self._filenames) + 1
+        while f"layer{counter}" in self._filenames:
+            counter += 1
+        file_name = f"layer{counter}"
+        self._filenames.add(file_name)
+        return file_name
+
+    def _layer_element(self, name, nodetype, parent, file_name, visible=True, extra=None):
+        container = next((c for c in (self.image if parent is None else parent) if _local(c.tag) == "layers"), None)
+        if container is None:
+            container = ElementTree.SubElement(self.image if parent is None else parent, self._tag("layers"))
+        attributes = {
+            "name": name, "nodetype": nodetype, "filename": file_name, "visible": "1" if visible else "0",
+            "opacity": "255", "x": "0", "y": "0", "compositeop": "normal", "locked": "0", "collapsed": "0",
+            "intimeline": "1", "colorlabel": "0", "uuid": "{%s}" % uuid.uuid4(),
+        }
+        attributes.update(extra or {})
+        element = ElementTree.Element(self._tag("layer"), attributes)
+        # Krita lists the topmost layer first
+        container.insert(0, element)
+        return element
+
+    def add_group(self, name, parent=None):
+        return self._layer_element(name, "grouplayer", parent, self._new_filename(), extra={"passthrough": "0"})
+
+    def _put_frame(self, file_name, frame):
+        self.entries[self.layer_path(file_name)] = write_tile_data(frame.tiles)
+        self.entries[self.layer_path(file_name + ".defaultpixel")] = bytes(PIXEL_SIZE)
+
+    def add_paint_layer(self, name, parent=None, frame=None, visible=True):
+        """Add a static paint layer showing 'frame'."""
+        frame = frame or Frame()
+        file_name = self._new_filename()
+        element = self._layer_element(name, "paintlayer", parent, file_name, visible, {
+            "colorspacename": "RGBA", "channelflags": "", "channellockflags": "", "onionskin": "0",
+            "x": str(frame.x), "y": str(frame.y)})
+        self._put_frame(file_name, frame)
+        return element
+
+    def add_animated_layer(self, name, keys, parent=None, visible=True, share_frames=True):
+        """Add a paint layer with one keyframe per (time, Frame) in 'keys'.
+        With 'share_frames' keys showing the same Frame object reference one frame file.
+        """
+        file_name = self._new_filename()
+        element = self._layer_element(name, "paintlayer", parent, file_name, visible, {
+            "colorspacename": "RGBA", "channelflags": "", "channellockflags": "", "onionskin": "0",
+            "keyframes": f"{file_name}.keyframes.xml"})
+        channel = ["<!DOCTYPE keyframes>", "<keyframes>", ' <channel name="content">']
+        frame_files = {}
+        for index, (time, frame) in enumerate(keys):
+            frame_file = frame_files.get(id(frame)) if share_frames else None
+            if frame_file is None:
+                frame_file = f"{file_name}.f{len(frame_files) if share_frames else index}"
+                frame_files[id(frame)] = frame_file
+                self._put_frame(frame_file, frame)
+            channel.append(f'  <keyframe time="{time}" color-label="0" frame="{frame_file}">')
+            channel.append(f'   <offset type="point" x="{frame.x}" y="{frame.y}"/>')
+            channel.append("  </keyframe>")
+        channel += [" </channel>", "</keyframes>", ""]
+        self.entries[self.layer_path(f"{file_name}.keyframes.xml")] = "\n".join(channel).encode("utf-8")
+        # Krita reads layers with a single frame from the layer file itself
+        self._put_frame(file_name, keys[0][1] if keys else Frame())
+        return element
+
+    def remove_layer(self, element, parent=None):
+        """Remove a layer element and leave its files out of the saved archive."""
+        container = next(c for c in (self.image if parent is None else parent) if _local(c.tag) == "layers")
+        container.remove(element)
+        for child in element.iter():
+            file_name = child.get("filename")
+            if file_name:
+                self.removed.add(file_name)
+
+    def set_animation(self, fps, start, end):
+        animation = next((c for c in self.image if _local(c.tag) == "animation"), None)
+        if animation is None:
+            animation = ElementTree.SubElement(self.image, self._tag("animation"))
+        for child in list(animation):
+            if _local(child.tag) in ("framerate", "range", "currentTime"):
+                animation.remove(child)
+        ElementTree.SubElement(animation, self._tag("framerate"), {"type": "value", "value": str(int(fps))})
+        ElementTree.SubElement(animation, self._tag("range"), {"type": "timerange", "from": str(start), "to": str(end)})
+        ElementTree.SubElement(animation, self._tag("currentTime"), {"type": "value", "value": str(start)})
+
+    def _is_removed(self, path):
+        prefix = f"{self.name}/layers/"
+        if not path.startswith(prefix):
+            return False
+        file_name = path[len(prefix):]
+        return any(file_name == removed or file_name.startswith(removed + ".") for removed in self.removed)
+
+    def save(self, path):
+        """Write the archive to 'path' (through a temporary file)."""
+        maindoc = ('<?xml version="1.0" encoding="UTF-8"?>\n' + DOCTYPE + "\n" +
+                   ElementTree.tostring(self.root, encoding="unicode")).encode("utf-8")
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+                # The mimetype has to be the first, uncompressed entry
+                archive.writestr(zipfile.ZipInfo("mimetype"), KRA_MIMETYPE, compress_type=zipfile.ZIP_STORED)
+                archive.writestr("maindoc.xml", maindoc)
+                if self.source is not None:
+                    with zipfile.ZipFile(self.source) as source:
+                        for info in source.infolist():
+                            if (info.filename in ("mimetype", "maindoc.xml") or info.filename in self.entries
+                                    or self._is_removed(info.filename)):
+                                continue
+                            archive.writestr(info, source.read(info))
+                for entry_path, data in self.entries.items():
+                    archive.writestr(entry_path, data)
+            self.close()
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return path
+
+
+# Lipsync
+
+
+def combined_keys(keyframes, frames):
+    """Return the [(time, Frame)] keys of a combined layer and the phonemes without a drawing."""
+    keys = []
+    missing = set()
+    for time, phoneme in keyframes:
+        frame = frames.get(phoneme)
+        if frame is None:
+            missing.add(phoneme)
+            continue
+        if keys and keys[-1][0] == time:
+            keys[-1] = (time, frame)
+        else:
+            keys.append((time, frame))
+    if not keys or keys[0][0] > 0:
+        # Like the docker, start the combined layer with a blank key at frame 0
+        keys.insert(0, (0, Frame()))
+    return keys, missing
+
+
+def write_lipsync_kra(project, output_path, source, rest_frames=True, canvas_size=None, share_frames=True,
+                      min_hold=1, step=1, min_gap=1, rest_after=0):
+    """Write a .kra with a '<voice>_combined' layer keyed from the phoneme drawings.
+
+    'source' is either a folder with '<phoneme>.png' files, used for every
+    voice, or a .kra document whose voice groups contain the phoneme layers.
+    With a folder a new document is created, with a .kra everything of the
+    source is kept and existing combined layers are replaced. With
+    'share_frames' every drawing is stored once and cloned by its keyframes.
+    Rest keys follow 'min_gap' and 'rest_after' (see voice_keyframes()), the
+    keys go through reduce_keyframes() with 'min_hold' and 'step'.
+    Returns {voice name: {"keyframes": count, "frames": stored frames,
+    "bytes_saved": tile bytes not duplicated, "removed": keys dropped by the
+    timing reduction, "missing": [phonemes]}}.
+    """
+    if os.path.isdir(source):
+        frames, size = load_phoneme_pngs(source)
+        width, height = canvas_size or size
+        document = KraDocument.new(width, height, name=os.path.splitext(os.path.basename(output_path))[0])
+    else:
+        frames = None
+        document = KraDocument.open(source)
+
+    report = {}
+    for voice in project.voices:
+        group = document.find_layer(voice.name, "grouplayer")
+        if frames is not None:
+            voice_frames = frames
+            if group is None:
+                group = document.add_group(voice.name)
+                for phoneme in sorted(frames, reverse=True):
+                    document.add_paint_layer(phoneme, group, frames[phoneme], visible=False)
+        else:
+            # Single voice documents may keep the phoneme layers at the top level
+            voice_frames = document.phoneme_frames(group)
+        combined_name = f"{voice.name}_combined"
+        existing = document.find_layer(combined_name, parent=group)
+        if existing is not None:
+            document.remove_layer(existing, group)
+        keyframes, removed = reduce_keyframes(voice_keyframes(voice, rest_frames, min_gap, rest_after,
+                                                              project.last_frame),
+                                              min_hold, step)
+        keys, missing = combined_keys(keyframes, voice_frames)
+        document.add_animated_layer(combined_name, keys, group, share_frames=share_frames)
+        unique = {id(frame): frame for _, frame in keys} if share_frames else {}
+        stored = len(unique) if share_frames else len(keys)
+        saved = sum(frame.nbytes for _, frame in keys) - sum(frame.nbytes for frame in unique.values())
+        report[voice.name] = {"keyframes": len(keys), "frames": stored, "bytes_saved": saved if share_frames else 0,
+                              "removed": removed, "missing": sorted(missing)}
+
+    document.set_animation(project.fps, 0, int(project.duration or 100))
+    document.save(output_path)
+    document.close()
+    return report
+
+
+def verify_kra(path):
+    """Re-open a .kra and decode every keyframe, returns {layer name: [keyframe times]} of animated layers."""
+    with KraDocument.open(path) as document:
+        return _verify(document)
+
+
+def _verify(document):
+    result = {}
+    stack = [None]
+    while stack:
+        parent = stack.pop()
+        for layer in document.layers(parent):
+            if layer.get("nodetype") == "grouplayer":
+                stack.append(layer)
+                continue
+            keys = document.keyframes(layer)
+            for _, frame_file, _ in keys:
+                data = document.read(frame_file)
+                if data is None:
+                    raise KraError(f"Missing frame data {frame_file} of layer '{layer.get('name')}'")
+                read_tile_data(data)
+            if keys:
+                result[layer.get("name")] = [key[0] for key in keys]
+    return result
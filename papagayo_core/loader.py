@@ -0,0 +1,137 @@
+"""Parsing of Papagayo-NG files into the compact project model."""
+import json
+from pathlib import Path
+
+from .model import Project, Voice
+
+SUPPORTED_EXTENSIONS = (".pg2", ".json")
+HEADER_FIELDS = ("version", "fps", "sound_path", "sound_duration", "end_frame")
+REQUIRED_FIELDS = ("version", "fps")
+
+
+def validate_papagayo_data(data):
+    """Validate the structure of raw Papagayo data, raising ValueError if it is invalid."""
+    for field in REQUIRED_FIELDS:
+        if field not in data:
+            raise ValueError(f"Missing required field: {field}")
+
+    # Check for voices (pg2 format) or direct voice data (json format)
+    if "voices" in data:
+        if not isinstance(data["voices"], list) or len(data["voices"]) == 0:
+            raise ValueError("No voices found in file")
+        for voice in data["voices"]:
+            if "name" not in voice or "phrases" not in voice:
+                raise ValueError("Invalid voice structure")
+    elif "name" not in data or "phrases" not in data:
+        raise ValueError("Invalid file format: no voices or voice data found")
+    return True
+
+
+def extract_used_phonemes_from_voice(voice):
+    """Return the sorted list of unique phoneme names used by a Voice."""
+    names = voice.table.names
+    return sorted(names[pid] for pid in voice.used_phoneme_ids())
+
+
+def phoneme_pairs(used_phonemes):
+    """Yield the used phonemes grouped in pairs for display, e.g. 'AI  |  E'."""
+    for i in range(0, len(used_phonemes), 2):
+        if i + 1 < len(used_phonemes):
+            yield f"{used_phonemes[i]}  |  {used_phonemes[i + 1]}"
+        else:
+            yield used_phonemes[i]
+
+
+class ProjectBuilder:
+    """Incrementally assemble a Project from header values, voices and phrases.
+
+    Used both for already decoded documents (parse_project) and by readers that
+    hand over one phrase at a time.
+    """
+
+    def __init__(self, path=None):
+        self.project = Project(path)
+        self._has_voices = False
+
+    def set_header(self, key, value):
+        """Store a top level value of the document."""
+        if key in HEADER_FIELDS:
+            setattr(self.project, key, value)
+
+    def begin_voice(self):
+        """Start a new voice and return it."""
+        voice = Voice(self.project.phonemes)
+        self.project.voices.append(voice)
+        self._has_voices = True
+        return voice
+
+    def add_phrase(self, voice, phrase):
+        """Append a decoded phrase dict (with its words and phonemes) to 'voice'."""
+        voice.add_phrase(phrase.get("text", ""), phrase.get("start_frame", 0), phrase.get("end_frame", 0))
+        for word in phrase.get("words", []):
+            voice.add_word(word.get("text", ""), word.get("start_frame", 0), word.get("end_frame", 0))
+            for phoneme in word.get("phonemes", []):
+                text = phoneme.get("text", "")
+                if text:
+                    voice.add_phoneme(text, phoneme.get("frame", 0))
+
+    def end_voice(self, voice, name=None, text="", used_phonemes=None, has_phrases=True):
+        """Finish 'voice' once all of its phrases have been added."""
+        if name is None or not has_phrases:
+            raise ValueError("Invalid voice structure")
+        voice.name = name
+        voice.text = text or ""
+        if used_phonemes is None:
+            voice.used_phonemes = extract_used_phonemes_from_voice(voice)
+            voice.used_phonemes_generated = True
+        else:
+            voice.used_phonemes = list(used_phonemes)
+        return voice
+
+    def finish(self, legacy=False, present_fields=None):
+        """Validate the collected data and return the Project."""
+        if present_fields is not None:
+            for field in REQUIRED_FIELDS:
+                if field not in present_fields:
+                    raise ValueError(f"Missing required field: {field}")
+        if not self._has_voices:
+            if legacy:
+                raise ValueError("Invalid file format: no voices or voice data found")
+            raise ValueError("No voices found in file")
+        self.project.legacy = legacy
+        return self.project
+
+
+def parse_project(data, path=None):
+    """Build a Project from an already decoded Papagayo document."""
+    validate_papagayo_data(data)
+    builder = ProjectBuilder(path)
+    for key in HEADER_FIELDS:
+        if key in data:
+            builder.set_header(key, data[key])
+    legacy = "voices" not in data
+    voice_list = [data] if legacy else data["voices"]
+    for voice_data in voice_list:
+        voice = builder.begin_voice()
+        for phrase in voice_data.get("phrases", []):
+            builder.add_phrase(voice, phrase)
+        builder.end_voice(voice, voice_data["name"], voice_data.get("text", ""),
+                          voice_data.get("used_phonemes"))
+    return builder.finish(legacy)
+
+
+def check_project_path(file_path):
+    """Raise if 'file_path' does not point to a supported Papagayo file."""
+    file_path_obj = Path(file_path)
+    if not file_path_obj.exists():
+        raise FileNotFoundError(f"File does not exist: {file_path}")
+    if file_path_obj.suffix.lower() not in SUPPORTED_EXTENSIONS:
+        raise ValueError("Unsupported file format. Please select a .pg2 or .json file.")
+
+
+def load_project(file_path):
+    """Load a .pg2 or .json file into a Project."""
+    check_project_path(file_path)
+    with open(file_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return parse_project(data, str(file_path))
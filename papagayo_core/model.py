@@ -0,0 +1,288 @@
+"""Compact in-memory model of a parsed Papagayo-NG project.
+
+Timing data is stored column-wise in ``array('i')`` buffers per voice instead
+of the nested ``voices -> phrases -> words -> phonemes`` dict tree produced by
+``json.load``.  Phoneme names are interned once per project and referenced by
+integer id, phrase and word texts are kept in plain lists.
+"""
+import os
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class PhonemeTable:
+    """Interned phoneme names shared by all voices of a project."""
+    __slots__ = ("names", "_ids")
+
+    def __init__(self, names=()):
+        self.names = []
+        self._ids = {}
+        for name in names:
+            self.intern(name)
+
+    def intern(self, name):
+        """Return the id of 'name', adding it to the table if needed."""
+        pid = self._ids.get(name)
+        if pid is None:
+            pid = len(self.names)
+            self._ids[name] = pid
+            self.names.append(name)
+        return pid
+
+    def id(self, name):
+        """Return the id of 'name' or -1 if it is unknown."""
+        return self._ids.get(name, -1)
+
+    def name(self, pid):
+        return self.names[pid]
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+
+class PhonemeEvent:
+    """A single phoneme occurrence on the timeline."""
+    __slots__ = ("frame", "text", "word", "phrase")
+
+    def __init__(self, frame, text, word, phrase):
+        self.frame = frame
+        self.text = text
+        self.word = word
+        self.phrase = phrase
+
+    def __repr__(self):
+        return "PhonemeEvent(frame={}, text={!r})".format(self.frame, self.text)
+
+
+class Word:
+    """Lightweight view on one word of a voice."""
+    __slots__ = ("voice", "index")
+
+    def __init__(self, voice, index):
+        self.voice = voice
+        self.index = index
+
+    @property
+    def text(self):
+        return self.voice.word_texts[self.index]
+
+    @property
+    def start_frame(self):
+        return self.voice.word_starts[self.index]
+
+    @property
+    def end_frame(self):
+        return self.voice.word_ends[self.index]
+
+    @property
+    def phrase(self):
+        return self.voice.word_phrase[self.index]
+
+    def events(self):
+        """Yield the phoneme events of this word in file order."""
+        voice = self.voice
+        offsets = voice.word_event_offsets
+        for i in range(offsets[self.index], offsets[self.index + 1]):
+            yield voice.event(i)
+
+
+class Phrase:
+    """Lightweight view on one phrase of a voice."""
+    __slots__ = ("voice", "index")
+
+    def __init__(self, voice, index):
+        self.voice = voice
+        self.index = index
+
+    @property
+    def text(self):
+        return self.voice.phrase_texts[self.index]
+
+    @property
+    def start_frame(self):
+        return self.voice.phrase_starts[self.index]
+
+    @property
+    def end_frame(self):
+        return self.voice.phrase_ends[self.index]
+
+    def words(self):
+        """Yield the words of this phrase in file order."""
+        offsets = self.voice.phrase_word_offsets
+        for i in range(offsets[self.index], offsets[self.index + 1]):
+            yield Word(self.voice, i)
+
+    def events(self):
+        """Yield the phoneme events of this phrase in file order."""
+        for word in self.words():
+            for event in word.events():
+                yield event
+
+
+class Voice:
+    """Column-oriented timing data of a single voice.
+
+    Phoneme events are stored in the parallel columns ``frames``,
+    ``phoneme_ids``, ``word_index`` and ``phrase_index``.  Words and phrases are
+    stored the same way, with ``*_offsets`` columns pointing to the first child
+    of each entry (plus a trailing end offset).
+    """
+    __slots__ = ("name", "text", "table", "used_phonemes", "used_phonemes_generated",
+                 "frames", "phoneme_ids", "word_index", "phrase_index",
+                 "word_texts", "word_starts", "word_ends", "word_phrase", "word_event_offsets",
+                 "phrase_texts", "phrase_starts", "phrase_ends", "phrase_word_offsets")
+
+    def __init__(self, table, name=None, text=""):
+        self.name = name
+        self.text = text
+        self.table = table
+        self.used_phonemes = []
+        self.used_phonemes_generated = False
+        self.frames = array("i")
+        self.phoneme_ids = array("i")
+        self.word_index = array("i")
+        self.phrase_index = array("i")
+        self.word_texts = []
+        self.word_starts = array("i")
+        self.word_ends = array("i")
+        self.word_phrase = array("i")
+        self.word_event_offsets = array("i", [0])
+        self.phrase_texts = []
+        self.phrase_starts = array("i")
+        self.phrase_ends = array("i")
+        self.phrase_word_offsets = array("i", [0])
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __repr__(self):
+        return "Voice(name={!r}, phrases={}, phonemes={})".format(
+            self.name, len(self.phrase_texts), len(self.frames))
+
+    def add_phrase(self, text, start_frame, end_frame):
+        """Append a phrase and return its index."""
+        self.phrase_texts.append(text)
+        self.phrase_starts.append(start_frame)
+        self.phrase_ends.append(end_frame)
+        self.phrase_word_offsets.append(len(self.word_texts))
+        return len(self.phrase_texts) - 1
+
+    def add_word(self, text, start_frame, end_frame):
+        """Append a word to the last phrase and return its index."""
+        phrase = len(self.phrase_texts) - 1
+        self.word_texts.append(text)
+        self.word_starts.append(start_frame)
+        self.word_ends.append(end_frame)
+        self.word_phrase.append(phrase)
+        self.word_event_offsets.append(len(self.frames))
+        self.phrase_word_offsets[-1] = len(self.word_texts)
+        return len(self.word_texts) - 1
+
+    def add_phoneme(self, text, frame):
+        """Append a phoneme event to the last word."""
+        word = len(self.word_texts) - 1
+        self.frames.append(frame)
+        self.phoneme_ids.append(self.table.intern(text))
+        self.word_index.append(word)
+        self.phrase_index.append(self.word_phrase[word])
+        self.word_event_offsets[-1] = len(self.frames)
+
+    def event(self, i):
+        """Return the phoneme event at column position 'i'."""
+        return PhonemeEvent(self.frames[i], self.table.names[self.phoneme_ids[i]],
+                            self.word_index[i], self.phrase_index[i])
+
+    def events(self):
+        """Yield all phoneme events in file order."""
+        for i in range(len(self.frames)):
+            yield self.event(i)
+
+    def phrase(self, i):
+        """Return the phrase at index 'i'."""
+        return Phrase(self, i)
+
+    def phrases(self):
+        """Yield all phrases in file order."""
+        for i in range(len(self.phrase_texts)):
+            yield Phrase(self, i)
+
+    def words(self):
+        """Yield all words in file order."""
+        for i in range(len(self.word_texts)):
+            yield Word(self, i)
+
+    def used_phoneme_ids(self):
+        """Return the sorted set of phoneme ids occurring in this voice."""
+        return sorted(set(self.phoneme_ids))
+
+    def as_numpy(self):
+        """Return the phoneme columns as NumPy arrays (shares the buffers)."""
+        if numpy is None:
+            raise RuntimeError("NumPy is not available")
+        return {name: numpy.frombuffer(getattr(self, name), dtype=numpy.intc)
+                for name in ("frames", "phoneme_ids", "word_index", "phrase_index")}
+
+
+class Project:
+    """A parsed Papagayo-NG project (.pg2, or legacy single voice .json)."""
+    __slots__ = ("path", "version", "fps", "sound_path", "sound_duration",
+                 "end_frame", "legacy", "phonemes", "voices", "storage")
+
+    def __init__(self, path=None):
+        self.path = path
+        self.version = None
+        self.fps = 24
+        self.sound_path = ""
+        self.sound_duration = None
+        self.end_frame = None
+        self.legacy = False
+        self.phonemes = PhonemeTable()
+        self.voices = []
+        # Buffer backing the columns (e.g. a sidecar mapping), kept alive with the project
+        self.storage = None
+
+    def __repr__(self):
+        return "Project(path={!r}, fps={}, voices={})".format(self.path, self.fps, len(self.voices))
+
+    @property
+    def duration(self):
+        """Number of frames covered by the project."""
+        if self.sound_duration is not None:
+            return self.sound_duration
+        if self.end_frame is not None:
+            return self.end_frame
+        return 0
+
+    @property
+    def last_frame(self):
+        """Last frame of the project, None when neither the sound duration nor an end frame is known."""
+        return self.duration or None
+
+    @property
+    def num_phonemes(self):
+        return sum(len(voice) for voice in self.voices)
+
+    def voice(self, name):
+        """Return the voice called 'name' or None."""
+        for voice in self.voices:
+            if voice.name == name:
+                return voice
+        return None
+
+    def resolve_sound_path(self):
+        """Return the absolute sound path, resolved relative to the project file."""
+        if not self.sound_path:
+            return ""
+        if os.path.isabs(self.sound_path) or not self.path:
+            return self.sound_path
+        return os.path.join(os.path.dirname(self.path), self.sound_path)
@@ -0,0 +1,103 @@
+"""Lightweight timers and counters for profiling host API calls."""
+import json
+import math
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest rank percentile of an already sorted, non-empty sequence."""
+    rank = max(0, min(len(sorted_samples) - 1, math.ceil(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[rank]
+
+
+class Profiler:
+    """Collect raw duration samples per call type plus plain counters.
+
+    Use 'with profiler.timer("pixelData"):' around a host call and
+    'profiler.count("keyframes")' for events that are not timed. Nothing is
+    recorded while 'enabled' is False, the timers then cost one attribute check.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.samples = defaultdict(list)
+        self.counters = Counter()
+        self.started = None
+        self.elapsed = 0.0
+
+    def reset(self):
+        self.samples.clear()
+        self.counters.clear()
+        self.started = time.perf_counter() if self.enabled else None
+        self.elapsed = 0.0
+
+    def stop(self):
+        """Fix the wall clock time of the run started by reset()."""
+        if self.started is not None:
+            self.elapsed = time.perf_counter() - self.started
+            self.started = None
+        return self.elapsed
+
+    @contextmanager
+    def timer(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] += amount
+
+    def summary(self):
+        """Return one dict per call type, slowest total first."""
+        rows = []
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            rows.append({
+                "name": name,
+                "count": len(ordered),
+                "total": sum(ordered),
+                "p50": percentile(ordered, 0.50),
+                "p95": percentile(ordered, 0.95),
+                "max": ordered[-1],
+            })
+        rows.sort(key=lambda row: row["total"], reverse=True)
+        return rows
+
+    def format_summary(self, rate_counter="keyframes"):
+        """Return the summary as log lines, with '<rate_counter> per second' over the run."""
+        elapsed = self.elapsed or (time.perf_counter() - self.started if self.started is not None else 0.0)
+        lines = [f"Profile: {elapsed * 1000:.1f} ms total"]
+        for row in self.summary():
+            lines.append(f"  {row['name']}: {row['count']} calls, {row['total'] * 1000:.1f} ms total, "
+                         f"p50 {row['p50'] * 1000:.3f} ms, p95 {row['p95'] * 1000:.3f} ms")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"  {name}: {value}")
+        if rate_counter in self.counters and elapsed > 0:
+            lines.append(f"  {rate_counter} per second: {self.counters[rate_counter] / elapsed:.1f}")
+        return lines
+
+    def to_dict(self):
+        return {
+            "elapsed": self.elapsed,
+            "counters": dict(self.counters),
+            "summary": self.summary(),
+            "samples": {name: list(samples) for name, samples in self.samples.items()},
+        }
+
+    def save(self, path, **meta):
+        """Write the raw samples, counters and summary to 'path' as JSON."""
+        data = self.to_dict()
+        data["meta"] = meta
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        return path
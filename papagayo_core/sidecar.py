@@ -0,0 +1,288 @@
+"""Binary sidecar cache of parsed projects, opened with mmap.
+
+Layout (the header is little endian, sections use the byte order recorded in it)::
+
+    header      HEADER struct: magic, format version, byte order, int size,
+                SHA-1 and size of the source file, offset/length of the meta block
+    sections    8 byte aligned int32 columns and string tables
+    meta        UTF-8 JSON describing the project header values, the voices and
+                the offset/length of every section
+
+A string table is ``count`` + ``count + 1`` uint32 offsets followed by the
+UTF-8 blob.  Columns of a loaded project are zero-copy memoryviews on the
+mapping, so opening a sidecar costs a hash of the source plus a small JSON
+decode regardless of the length of the recording.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .model import PhonemeTable, Project, Voice
+from .streaming import stream_project
+
+MAGIC = b"PGLC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHBB20sQQQ")
+SIDECAR_SUFFIX = ".pgcache"
+CACHE_DIR_ENV = "PAPAGAYO_CACHE_DIR"
+
+VOICE_COLUMNS = ("frames", "phoneme_ids", "word_index", "phrase_index",
+                 "word_starts", "word_ends", "word_phrase", "word_event_offsets",
+                 "phrase_starts", "phrase_ends", "phrase_word_offsets")
+HEADER_VALUES = ("version", "fps", "sound_path", "sound_duration", "end_frame", "legacy")
+
+
+def hash_file(file_path, block_size=1 << 20):
+    """Return the SHA-1 digest of a file."""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def sidecar_path(source_path, cache_dir=None):
+    """Return where the sidecar of 'source_path' lives.
+
+    Without a cache directory (argument or PAPAGAYO_CACHE_DIR) it is written
+    next to the source, otherwise it is named after a hash of the source path.
+    """
+    source_path = os.path.abspath(os.fspath(source_path))
+    cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV)
+    if not cache_dir:
+        return source_path + SIDECAR_SUFFIX
+    name = hashlib.sha1(source_path.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, os.path.basename(source_path) + "." + name[:16] + SIDECAR_SUFFIX)
+
+
+class _SectionWriter:
+    def __init__(self, f):
+        self.f = f
+
+    def _align(self):
+        padding = -self.f.tell() % 8
+        if padding:
+            self.f.write(b"\0" * padding)
+
+    def column(self, values):
+        self._align()
+        offset = self.f.tell()
+        data = values if isinstance(values, array) and values.typecode == "i" else array("i", values)
+        self.f.write(data.tobytes())
+        return [offset, len(data)]
+
+    def strings(self, strings):
+        self._align()
+        offset = self.f.tell()
+        encoded = [text.encode("utf-8") for text in strings]
+        offsets = array("I", [0])
+        for blob in encoded:
+            offsets.append(offsets[-1] + len(blob))
+        self.f.write(struct.pack("<I", len(encoded)))
+        self.f.write(offsets.tobytes())
+        self.f.write(b"".join(encoded))
+        return [offset, len(encoded)]
+
+
+def write_sidecar(project, source_path=None, cache_dir=None, source_hash=None, path=None):
+    """Write the sidecar of 'project' and return its path."""
+    source_path = source_path or project.path
+    if source_hash is None:
+        source_hash = hash_file(source_path)
+    path = path or sidecar_path(source_path, cache_dir)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        _write_sidecar_file(temp_path, project, source_path, source_hash)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+
+def _write_sidecar_file(temp_path, project, source_path, source_hash):
+    with open(temp_path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+        writer = _SectionWriter(f)
+        meta = {
+            "header": {key: getattr(project, key) for key in HEADER_VALUES},
+            "phonemes": writer.strings(project.phonemes.names),
+            "voices": [],
+        }
+        for voice in project.voices:
+            meta["voices"].append({
+                "name": voice.name,
+                "text": voice.text,
+                "used_phonemes": voice.used_phonemes,
+                "used_phonemes_generated": voice.used_phonemes_generated,
+                "columns": {name: writer.column(getattr(voice, name)) for name in VOICE_COLUMNS},
+                "word_texts": writer.strings(voice.word_texts),
+                "phrase_texts": writer.strings(voice.phrase_texts),
+            })
+        meta_blob = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+        meta_offset = f.tell()
+        f.write(meta_blob)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, sys.byteorder == "little", array("i").itemsize,
+                            source_hash, os.path.getsize(source_path), meta_offset, len(meta_blob)))
+
+
+class _StringTable:
+    """Read only sequence of strings decoded lazily from a sidecar mapping."""
+    __slots__ = ("_offsets", "_blob")
+
+    def __init__(self, view, offset):
+        count = struct.unpack_from("<I", view, offset)[0]
+        start = offset + 4
+        self._offsets = view[start:start + 4 * (count + 1)].cast("I")
+        blob_start = start + 4 * (count + 1)
+        self._blob = view[blob_start:blob_start + self._offsets[count]]
+        # Validated once here, so a damaged table fails while opening and not on first use
+        if len(self._offsets) != count + 1 or len(self._blob) != self._offsets[count] \
+                or any(a > b for a, b in zip(self._offsets, self._offsets[1:])):
+            raise ValueError("string table is truncated")
+        bytes(self._blob).decode("utf-8")
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("string table index out of range")
+        return bytes(self._blob[self._offsets[index]:self._offsets[index + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def read_sidecar_header(path):
+    """Return the unpacked header of a sidecar file, or None if it is not one."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    header = HEADER.unpack(data)
+    if header[0] != MAGIC:
+        return None
+    return header
+
+
+def open_sidecar(path, source_hash=None, source_path=None):
+    """Map a sidecar and return its Project, or None if it is missing, stale or unusable."""
+    header = read_sidecar_header(path)
+    if header is None:
+        return None
+    _, version, little, int_size, recorded_hash, _, meta_offset, meta_length = header
+    if version != FORMAT_VERSION or bool(little) != (sys.byteorder == "little") \
+            or int_size != array("i").itemsize:
+        return None
+    if source_hash is not None and recorded_hash != source_hash:
+        return None
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return _map_project(mapping, meta_offset, meta_length, source_path)
+    except _DECODE_ERRORS:
+        # Truncated or damaged while the source stayed the same, parse the source again
+        pass
+    # Closed outside the except block, the traceback keeps the views into the mapping alive.
+    # An open mapping would also keep the file from being rewritten on Windows.
+    try:
+        mapping.close()
+    except BufferError:
+        # Still exported by a view referenced elsewhere, it is closed when that is collected
+        pass
+    return None
+
+
+# What a damaged meta block, string table or column raises while it is mapped
+_DECODE_ERRORS = (ValueError, TypeError, KeyError, IndexError, AttributeError, struct.error)
+
+
+def _map_project(mapping, meta_offset, meta_length, source_path):
+    view = memoryview(mapping)
+    try:
+        return _map_voices(view, mapping, meta_offset, meta_length, source_path)
+    except _DECODE_ERRORS:
+        view.release()
+        raise
+
+
+def _map_voices(view, mapping, meta_offset, meta_length, source_path):
+    if meta_offset + meta_length > len(view):
+        raise ValueError("meta block past the end of the sidecar")
+    meta = json.loads(bytes(view[meta_offset:meta_offset + meta_length]).decode("utf-8"))
+
+    project = Project(source_path)
+    for key in HEADER_VALUES:
+        setattr(project, key, meta["header"][key])
+    project.phonemes = PhonemeTable(_StringTable(view, meta["phonemes"][0]))
+    project.storage = mapping
+    for voice_meta in meta["voices"]:
+        voice = Voice(project.phonemes, voice_meta["name"], voice_meta["text"])
+        voice.used_phonemes = list(voice_meta["used_phonemes"])
+        voice.used_phonemes_generated = voice_meta["used_phonemes_generated"]
+        columns = voice_meta["columns"]
+        for name in VOICE_COLUMNS:
+            offset, length = columns[name]
+            column = view[offset:offset + 4 * length].cast("i")
+            if len(column) != length:
+                raise ValueError(f"column {name} is truncated")
+            setattr(voice, name, column)
+        voice.word_texts = _StringTable(view, voice_meta["word_texts"][0])
+        voice.phrase_texts = _StringTable(view, voice_meta["phrase_texts"][0])
+        _check_voice(voice, len(project.phonemes))
+        project.voices.append(voice)
+    return project
+
+
+def _check_voice(voice, num_phonemes):
+    """Raise ValueError when the columns of a mapped voice don't fit together."""
+    events = len(voice.frames)
+    words = len(voice.word_starts)
+    phrases = len(voice.phrase_starts)
+    if not (len(voice.phoneme_ids) == len(voice.word_index) == len(voice.phrase_index) == events
+            and len(voice.word_ends) == len(voice.word_phrase) == len(voice.word_texts) == words
+            and len(voice.word_event_offsets) == words + 1 and voice.word_event_offsets[-1] == events
+            and len(voice.phrase_ends) == len(voice.phrase_texts) == phrases
+            and len(voice.phrase_word_offsets) == phrases + 1 and voice.phrase_word_offsets[-1] == words):
+        raise ValueError("voice columns don't match")
+    if events and not 0 <= min(voice.phoneme_ids) <= max(voice.phoneme_ids) < num_phonemes:
+        raise ValueError("phoneme id out of range")
+
+
+def load_project_cached(file_path, cache_dir=None, loader=stream_project, write=True):
+    """Load 'file_path' from its sidecar if it matches the source, else parse it and write the sidecar.
+
+    Failing to write the sidecar (read only folder, mapped file on Windows...)
+    is not an error, the freshly parsed project is returned either way.
+    """
+    file_path = str(file_path)
+    source_hash = hash_file(file_path)
+    path = sidecar_path(file_path, cache_dir)
+    project = open_sidecar(path, source_hash, file_path)
+    if project is not None:
+        return project
+    project = loader(file_path)
+    if write:
+        try:
+            write_sidecar(project, file_path, cache_dir, source_hash, path)
+        except OSError:
+            pass
+    return project
@@ -0,0 +1,249 @@
+"""Incremental reader for large Papagayo-NG files.
+
+Instead of decoding the whole document with ``json.load`` the reader walks the
+outer structure (top level keys, the voices array and the keys of each voice)
+itself and decodes every phrase separately with ``json.JSONDecoder.raw_decode``
+as soon as its text has been read.  At no point does more than one phrase (plus
+one read chunk) have to be held as decoded JSON.
+
+``iter_project_events`` yields low level events::
+
+    ("header", key, value)        top level value that is not a voice/phrase list
+    ("voices",)                   the voices array of a .pg2 file starts
+    ("voice_begin", index)        a voice object starts
+    ("phrase", index, phrase)     decoded phrase dict of voice 'index'
+    ("voice_end", index, fields)  a voice ends, fields holds its other values
+
+``ProjectStream`` feeds those events into a ProjectBuilder and yields the
+phrases of the compact model while it goes, ``stream_project`` simply drains it.
+"""
+import codecs
+import json
+import os
+
+from .loader import ProjectBuilder, check_project_path
+
+CHUNK_SIZE = 1 << 16
+_WHITESPACE = " \t\n\r"
+# Characters that can continue a number, "25" followed by ".0" in the next chunk is 25.0
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class _JsonStream:
+    """Character level access to a JSON document read in chunks."""
+
+    def __init__(self, fp, chunk_size=CHUNK_SIZE, progress=None, total_size=0):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.total_size = total_size
+        self.bytes_read = 0
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+
+    def _read_more(self):
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        self.bytes_read += len(chunk)
+        if not chunk:
+            self.eof = True
+            self.buffer = self.buffer[self.pos:] + self._decoder.decode(b"", final=True)
+            self.pos = 0
+            return False
+        # Drop everything that has already been consumed
+        self.buffer = self.buffer[self.pos:] + self._decoder.decode(chunk)
+        self.pos = 0
+        if self.progress is not None:
+            self.progress(self.bytes_read, self.total_size)
+        return True
+
+    def error(self, message):
+        return ValueError(f"Invalid JSON file: {message} (at byte {self.bytes_read})")
+
+    def skip_whitespace(self):
+        while True:
+            buffer = self.buffer
+            pos = self.pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buffer) or not self._read_more():
+                return
+
+    def peek(self):
+        """Return the next non whitespace character without consuming it."""
+        self.skip_whitespace()
+        if self.pos >= len(self.buffer):
+            raise self.error("unexpected end of data")
+        return self.buffer[self.pos]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise self.error(f"expected '{char}' but found '{self.buffer[self.pos]}'")
+        self.pos += 1
+
+    def decode_value(self):
+        """Decode the next complete JSON value, reading more data as needed."""
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._read_more():
+                    continue
+                raise
+            # A number ending at the buffer end, or before a partial fraction or
+            # exponent, might continue in the next chunk
+            number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            if (end >= len(self.buffer) or number and self.buffer[end] in _NUMBER_CHARS) and self._read_more():
+                continue
+            self.pos = end
+            return value
+
+    def iter_object(self):
+        """Yield the keys of an object, the caller has to consume each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.decode_value()
+            if not isinstance(key, str):
+                raise self.error("object key is not a string")
+            self.expect(":")
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise self.error(f"expected ',' or '}}' but found '{char}'")
+
+    def iter_array(self):
+        """Yield once per array item, the caller has to consume each item."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise self.error(f"expected ',' or ']' but found '{char}'")
+
+
+def _iter_phrases(stream, voice_index):
+    if stream.peek() != "[":
+        # Not a list, hand it over so validation can complain about it
+        stream.decode_value()
+        return
+    for _ in stream.iter_array():
+        phrase = stream.decode_value()
+        if not isinstance(phrase, dict):
+            raise stream.error("phrase is not an object")
+        yield ("phrase", voice_index, phrase)
+
+
+def _iter_voice(stream, voice_index):
+    yield ("voice_begin", voice_index)
+    fields = {}
+    for key in stream.iter_object():
+        if key == "phrases":
+            fields["phrases"] = True
+            yield from _iter_phrases(stream, voice_index)
+        else:
+            fields[key] = stream.decode_value()
+    yield ("voice_end", voice_index, fields)
+
+
+def iter_project_events(fp, chunk_size=CHUNK_SIZE, progress=None, total_size=0):
+    """Yield parse events from a binary file object, see the module docstring."""
+    stream = _JsonStream(fp, chunk_size, progress, total_size)
+    legacy_fields = {}
+    legacy = False
+    for key in stream.iter_object():
+        if key == "voices":
+            yield ("voices",)
+            if stream.peek() != "[":
+                stream.decode_value()
+                raise ValueError("No voices found in file")
+            for voice_index in stream.iter_array():
+                if stream.peek() != "{":
+                    raise ValueError("Invalid voice structure")
+                yield from _iter_voice(stream, voice_index)
+        elif key == "phrases":
+            # Legacy json format, the document itself is the only voice
+            legacy = True
+            legacy_fields["phrases"] = True
+            yield ("voice_begin", 0)
+            yield from _iter_phrases(stream, 0)
+        else:
+            value = stream.decode_value()
+            legacy_fields[key] = value
+            yield ("header", key, value)
+    if legacy:
+        yield ("voice_end", 0, legacy_fields)
+    stream.skip_whitespace()
+    if stream.pos < len(stream.buffer):
+        raise stream.error("extra data after the document")
+
+
+class ProjectStream:
+    """Build a Project while the file is read, yielding (voice, Phrase) as they are decoded.
+
+    Validation and used phoneme collection happen on the fly, the finished
+    Project is available as ``.project`` once the iterator is exhausted.
+    ``progress`` is called with (bytes_read, total_bytes) after every chunk.
+    """
+
+    def __init__(self, file_path, progress=None, chunk_size=CHUNK_SIZE):
+        check_project_path(file_path)
+        self.file_path = str(file_path)
+        self.progress = progress
+        self.chunk_size = chunk_size
+        self.project = None
+
+    def __iter__(self):
+        builder = ProjectBuilder(self.file_path)
+        present_fields = set()
+        voices = {}
+        legacy = True
+        total_size = os.path.getsize(self.file_path)
+        with open(self.file_path, "rb") as fp:
+            for event in iter_project_events(fp, self.chunk_size, self.progress, total_size):
+                kind = event[0]
+                if kind == "phrase":
+                    voice = voices[event[1]]
+                    builder.add_phrase(voice, event[2])
+                    yield voice, voice.phrase(len(voice.phrase_texts) - 1)
+                elif kind == "header":
+                    present_fields.add(event[1])
+                    builder.set_header(event[1], event[2])
+                elif kind == "voice_begin":
+                    voices[event[1]] = builder.begin_voice()
+                elif kind == "voices":
+                    legacy = False
+                else:
+                    fields = event[2]
+                    if legacy and "name" not in fields:
+                        raise ValueError("Invalid file format: no voices or voice data found")
+                    builder.end_voice(voices.pop(event[1]), fields.get("name"), fields.get("text", ""),
+                                      fields.get("used_phonemes"), "phrases" in fields)
+        self.project = builder.finish(legacy, present_fields)
+
+
+def stream_project(file_path, progress=None, chunk_size=CHUNK_SIZE):
+    """Load a .pg2 or .json file into a Project without decoding the whole document at once."""
+    stream = ProjectStream(file_path, progress, chunk_size)
+    for _ in stream:
+        pass
+    return stream.project
@@ -0,0 +1,46 @@
+"""Timing reduction between the parsed keyframes and the hosts.
+
+Papagayo-NG writes one key per phoneme, even when the next phoneme shows the
+same drawing or is gone again after a single frame. reduce_keyframes() turns
+such a list into the keys a host really has to create.
+"""
+
+
+def snap_frame(frame, step):
+    """Return the multiple of 'step' nearest to 'frame', halves round up."""
+    if step <= 1:
+        return frame
+    return (frame + step // 2) // step * step
+
+
+def reduce_keyframes(keyframes, min_hold=1, step=1):
+    """Reduce a frame ordered list of (frame, phoneme) keys.
+
+    - With 'step' > 1 keys are snapped to the nearest multiple of 'step'
+      ("animate on twos" is step=2).
+    - Every key is held for at least 'min_hold' frames, a key following
+      sooner is moved to the end of that hold. When several keys end up on
+      the same frame only the last one is kept, as in TimelineIndex.
+    - A key showing the same phoneme as the key before it is dropped, the
+      drawing is simply held.
+
+    Returns (keys, removed) with 'removed' the number of dropped keys.
+    """
+    min_hold = max(int(min_hold), 1)
+    reduced = []
+    count = 0
+    for frame, phoneme in keyframes:
+        count += 1
+        frame = snap_frame(frame, step)
+        if reduced:
+            last_frame = reduced[-1][0]
+            if frame <= last_frame:
+                # Replaces the key that would be shown for no time at all
+                frame = last_frame
+                reduced.pop()
+            elif frame < last_frame + min_hold:
+                frame = last_frame + min_hold
+            if reduced and reduced[-1][1] == phoneme:
+                continue
+        reduced.append((frame, phoneme))
+    return reduced, count - len(reduced)
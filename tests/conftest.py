@@ -0,0 +1,54 @@
+import pytest
+
+from benchmarks import hosts
+from benchmarks.fakes import fake_bpy
+
+from .samples import document, write_document
+
+# The importer properties, as the Blender UI defaults them
+BLENDER_SETTINGS = dict(rest_frames=False, rest_min_gap=1, rest_after=0, load_sound=False, use_cache=False,
+                        share_drawings=True, min_hold=1, step=1, incremental=True, import_mode='GREASE_PENCIL',
+                        viseme_property="viseme", viseme_bone="")
+
+
+def document_with_rest():
+    """samples.document() with the used phonemes listed like Papagayo-NG writes them, "rest" included."""
+    data = document()
+    for voice in data["voices"]:
+        used = {phoneme["text"] for phrase in voice["phrases"] for word in phrase["words"]
+                for phoneme in word["phonemes"]}
+        voice["used_phonemes"] = sorted(used) + ["rest"]
+    return data
+
+
+class BlenderHost:
+    """The Blender importer module on a fresh fake bpy scene."""
+
+    def __init__(self, directory):
+        self.module, self.bpy = hosts.load_blender()
+        self.directory = directory
+
+    def new_scene(self, data=None, grease_pencil_v3=False, **settings):
+        """Reset the scene, write 'data' (default: document_with_rest()) and return its path."""
+        fake_bpy.reset(self.bpy, grease_pencil_v3, **dict(BLENDER_SETTINGS, **settings))
+        self.module.project_cache.invalidate()
+        self.module.playback_tracks.clear()
+        self.path = write_document(self.directory, data if data is not None else document_with_rest())
+        self.bpy.types.Scene.pg_path = self.path
+        return self.path
+
+    @property
+    def settings(self):
+        return self.bpy.context.scene.my_tool
+
+    def create_objects(self):
+        """Create the voice objects and give every phoneme layer a distinct drawing."""
+        self.module.create_grease_objects(self.path)
+        for grease_pencil in self.bpy.data.grease_pencils:
+            for number, layer in enumerate(grease_pencil.layers):
+                fake_bpy.draw_strokes(layer, strokes=number + 1, points=3)
+
+
+@pytest.fixture
+def blender(tmp_path):
+    return BlenderHost(tmp_path)
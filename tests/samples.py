@@ -0,0 +1,58 @@
+"""Small hand written Papagayo-NG documents for the tests."""
+import json
+import os
+
+
+def word(text, start_frame, end_frame, phonemes):
+    """Return a word dict, 'phonemes' is a list of (frame, phoneme)."""
+    return {"text": text, "start_frame": start_frame, "end_frame": end_frame,
+            "phonemes": [{"frame": frame, "text": phoneme} for frame, phoneme in phonemes]}
+
+
+def phrase(text, start_frame, end_frame, words):
+    return {"text": text, "start_frame": start_frame, "end_frame": end_frame, "words": words}
+
+
+def document(voices=None, fps=24, sound_duration=100, sound_path=""):
+    """Return a .pg2 document dict, 'voices' maps voice names to their phrase lists."""
+    if voices is None:
+        voices = {"Voice1": default_phrases()}
+    return {
+        "version": 2, "fps": fps, "sound_path": sound_path, "sound_duration": sound_duration,
+        "num_voices": len(voices),
+        "voices": [{"name": name, "text": "", "num_children": len(phrases), "phrases": phrases}
+                   for name, phrases in voices.items()],
+    }
+
+
+def default_phrases():
+    """Two phrases, the first with two words and a two frame pause between them."""
+    return [
+        phrase("hello there", 10, 30, [
+            word("hello", 10, 18, [(10, "etc"), (12, "E"), (14, "L"), (16, "O")]),
+            word("there", 21, 30, [(21, "etc"), (25, "E")]),
+        ]),
+        phrase("bye", 50, 60, [
+            word("bye", 50, 60, [(50, "MBP"), (53, "AI")]),
+        ]),
+    ]
+
+
+def write_document(directory, data, name="project.pg2"):
+    """Write 'data' as JSON into 'directory' and return the path."""
+    path = os.path.join(str(directory), name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return path
+
+
+def project_state(project):
+    """Return the parsed content of 'project' as plain values, to compare two loaders."""
+    voices = []
+    for voice in project.voices:
+        voices.append({slot: list(value) if hasattr(value, "__iter__") and not isinstance(value, str) else value
+                       for slot in type(voice).__slots__ if slot != "table"
+                       for value in (getattr(voice, slot),)})
+    return {"version": project.version, "fps": project.fps, "sound_path": project.sound_path,
+            "sound_duration": project.sound_duration, "end_frame": project.end_frame,
+            "legacy": project.legacy, "phonemes": list(project.phonemes), "voices": voices}
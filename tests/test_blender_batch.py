@@ -0,0 +1,107 @@
+import json
+import os
+
+import pytest
+
+from benchmarks import hosts
+from benchmarks.fakes.recorder import RECORDER
+
+from .samples import document, write_document
+
+
+@pytest.fixture
+def batch(blender, tmp_path):
+    """The batch module with a template .blend open and two shots on disk."""
+    blender.new_scene()
+    blender.bpy.data.filepath = str(tmp_path / "template.blend")
+    shots = tmp_path / "shots"
+    shots.mkdir()
+    write_document(shots, document(), "shot_a.pg2")
+    write_document(shots, document(fps=25), "shot_b.pg2")
+    return hosts.load_blender_batch()
+
+
+def parse(batch, *argv):
+    return batch.build_parser().parse_args(list(argv) + ["shot.pg2"])
+
+
+def test_blend_paths_are_distinct(batch, tmp_path):
+    files = ["a/shot.pg2", "b/shot.pg2", "c/shot.json", "shot_2.pg2", 'd/what?.pg2']
+    names = [os.path.basename(path) for path in batch.blend_paths(files, str(tmp_path))]
+    assert names == ["shot.blend", "shot_2.blend", "shot_3.blend", "shot_2_2.blend", "what_.blend"]
+    assert all(os.path.dirname(path) == str(tmp_path) for path in batch.blend_paths(files, str(tmp_path)))
+
+
+def test_apply_settings_copies_the_options(batch, blender):
+    my_tool = blender.settings
+    batch.apply_settings(my_tool, parse(batch, "--rest-frames", "--rest-min-gap", "3", "--rest-after", "2",
+                                        "--min-hold", "2", "--step", "2", "--no-share-drawings", "--sound",
+                                        "--use-cache"))
+    assert (my_tool.rest_frames, my_tool.rest_min_gap, my_tool.rest_after) == (True, 3, 2)
+    assert (my_tool.min_hold, my_tool.step) == (2, 2)
+    assert (my_tool.share_drawings, my_tool.load_sound, my_tool.use_cache, my_tool.incremental) == (
+        False, True, True, True)
+
+    batch.apply_settings(my_tool, parse(batch))
+    assert (my_tool.rest_frames, my_tool.min_hold, my_tool.share_drawings, my_tool.load_sound) == (
+        False, 1, True, False)
+
+
+def test_bake_shot_reports_the_result(batch, tmp_path):
+    template = batch.bpy.data.filepath
+    shot = str(tmp_path / "shots" / "shot_a.pg2")
+    blend_path = str(tmp_path / "shot_a.blend")
+    RECORDER.reset()
+    report = batch.bake_shot(template, shot, blend_path, parse(batch), reopen=False)
+    assert report["ok"] and report["output"] == blend_path
+    assert report["voices"] == 1 and report["keys"] > 0
+    assert set(report["seconds"]) >= {"open", "parse", "create", "fill", "save", "total"}
+    assert RECORDER.counts["ops.wm.open_mainfile"] == 0
+    assert RECORDER.counts["ops.wm.save_as_mainfile"] == 1
+
+    batch.bake_shot(template, shot, blend_path, parse(batch))
+    assert RECORDER.counts["ops.wm.open_mainfile"] == 1
+
+
+def test_bake_shot_reports_errors(batch, tmp_path):
+    broken = tmp_path / "broken.pg2"
+    broken.write_text("{not json", encoding="utf-8")
+    RECORDER.reset()
+    report = batch.bake_shot(batch.bpy.data.filepath, str(broken), str(tmp_path / "broken.blend"), parse(batch))
+    assert not report["ok"]
+    assert report["error"].split(":")[0].endswith("Error")
+    assert "output" not in report and "total" in report["seconds"]
+    assert RECORDER.counts["ops.wm.save_as_mainfile"] == 0
+
+
+def test_main_writes_the_report(batch, tmp_path, capsys):
+    output = tmp_path / "out"
+    assert batch.main([str(tmp_path / "shots"), "-o", str(output)]) == 0
+    with open(output / "lipsync_report.json", encoding="utf-8") as report_file:
+        report = json.load(report_file)
+    assert report["template"] == batch.bpy.data.filepath
+    assert [os.path.basename(shot["output"]) for shot in report["shots"]] == ["shot_a.blend", "shot_b.blend"]
+    assert all(shot["ok"] for shot in report["shots"])
+    assert "Baked 2/2 shots" in capsys.readouterr().out
+
+
+def test_main_fails_when_a_shot_fails(batch, tmp_path, capsys):
+    (tmp_path / "shots" / "broken.pg2").write_text("{not json", encoding="utf-8")
+    report_path = tmp_path / "report.json"
+    assert batch.main([str(tmp_path / "shots"), "-o", str(tmp_path / "out"), "--report", str(report_path)]) == 1
+    with open(report_path, encoding="utf-8") as report_file:
+        shots = json.load(report_file)["shots"]
+    assert [shot["ok"] for shot in shots] == [False, True, True]
+    assert "broken.pg2" in capsys.readouterr().err
+    assert not (tmp_path / "out" / "lipsync_report.json").exists()
+
+
+def test_main_needs_a_template_and_files(batch, tmp_path, capsys):
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    assert batch.main([str(empty), "-o", str(tmp_path / "out")]) == 2
+    assert batch.main([str(tmp_path / "missing.pg2")]) == 2
+    batch.bpy.data.filepath = ""
+    assert batch.main([str(tmp_path / "shots")]) == 2
+    assert "template" in capsys.readouterr().err
+    assert not (tmp_path / "out").exists()
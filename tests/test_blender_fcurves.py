@@ -0,0 +1,111 @@
+import pytest
+
+from benchmarks.fakes import fake_bpy
+from benchmarks.fakes.recorder import RECORDER
+from papagayo_core import (phoneme_channels, phoneme_value_coordinates, reduce_keyframes, viseme_index_coordinates,
+                           voice_keyframes)
+
+from .samples import default_phrases, document
+
+
+def timed_keys(blender, voice):
+    settings = blender.settings
+    keys, _ = reduce_keyframes(voice_keyframes(voice, settings.rest_frames, settings.rest_min_gap,
+                                               settings.rest_after), settings.min_hold, settings.step)
+    return keys
+
+
+def check_fcurve(blender, fcurve, coordinates, group):
+    """The curve holds 'coordinates' as constant keys of 'group'."""
+    points = fcurve.keyframe_points
+    assert points.co == pytest.approx(list(coordinates))
+    assert points.interpolation == [blender.module.CONSTANT_INTERPOLATION] * (len(coordinates) // 2)
+    assert fcurve.group == group
+
+
+def test_shape_keys_get_one_constant_curve_per_phoneme(blender):
+    blender.new_scene(import_mode='SHAPE_KEYS', rest_frames=True)
+    target = fake_bpy.add_mesh_object(blender.bpy, "Voice1")
+    RECORDER.reset()
+    stats = blender.module.apply_fcurves(blender.path)
+
+    voice = blender.module.get_project(blender.path).voices[0]
+    keys = timed_keys(blender, voice)
+    channels = phoneme_channels(keys, voice.used_phonemes)
+    shape_keys = target.data.shape_keys
+    assert list(shape_keys.key_blocks.keys()) == ["Basis"] + channels
+    action = shape_keys.animation_data.action
+    assert action.name == "Voice1_lipsync"
+    coordinates = phoneme_value_coordinates(keys, channels)
+    for phoneme in channels:
+        check_fcurve(blender, action.fcurves.find(f'key_blocks["{phoneme}"].value'), coordinates[phoneme], "Voice1")
+    assert stats == {"curves": len(channels), "keys": sum(len(flat) // 2 for flat in coordinates.values()),
+                     "removed": 0}
+    # Every curve is inserted in bulk, not key by key
+    assert RECORDER.counts["KeyframePoints.add"] == len(channels)
+    assert RECORDER.counts["KeyframePoints.foreach_set"] == 2 * len(channels)
+
+
+def test_writing_again_replaces_the_curves(blender):
+    blender.new_scene(import_mode='SHAPE_KEYS')
+    target = fake_bpy.add_mesh_object(blender.bpy, "Voice1")
+    first = blender.module.apply_fcurves(blender.path)
+    blender.settings.min_hold = 4
+    second = blender.module.apply_fcurves(blender.path)
+    action = target.data.shape_keys.animation_data.action
+    assert len(action.fcurves) == first["curves"] == second["curves"]
+    assert sum(len(fcurve.keyframe_points) for fcurve in action.fcurves) == second["keys"] < first["keys"]
+
+
+def test_viseme_property_on_the_object(blender):
+    blender.new_scene(import_mode='VISEME_PROPERTY')
+    target = fake_bpy.add_mesh_object(blender.bpy, "Voice1")
+    stats = blender.module.apply_fcurves(blender.path)
+
+    voice = blender.module.get_project(blender.path).voices[0]
+    keys = timed_keys(blender, voice)
+    channels = phoneme_channels(keys, voice.used_phonemes)
+    assert target["viseme"] == 0
+    assert target["viseme_phonemes"] == ",".join(channels)
+    action = target.animation_data.action
+    assert [fcurve.data_path for fcurve in action.fcurves] == ['["viseme"]']
+    check_fcurve(blender, action.fcurves.find('["viseme"]'), viseme_index_coordinates(keys, channels), "Voice1")
+    assert stats["curves"] == 1 and stats["keys"] == len(keys)
+
+
+def test_viseme_property_on_a_pose_bone_per_voice(blender):
+    blender.new_scene(document({"Voice1": default_phrases(), "Voice2": default_phrases()}),
+                      import_mode='VISEME_PROPERTY', viseme_bone="jaw")
+    targets = [fake_bpy.add_mesh_object(blender.bpy, name, bones=["jaw"]) for name in ("Voice1", "Voice2")]
+    stats = blender.module.apply_fcurves(blender.path)
+    assert stats["curves"] == 2
+    for target in targets:
+        bone = target.pose.bones["jaw"]
+        name = f"viseme_{target.name}"
+        assert bone[name] == 0 and name not in target
+        assert bone[f"{name}_phonemes"]
+        assert target.animation_data.action.fcurves.find(f'pose.bones["jaw"]["{name}"]') is not None
+
+
+def test_missing_pose_bone_is_an_error(blender):
+    blender.new_scene(import_mode='VISEME_PROPERTY', viseme_bone="jaw")
+    fake_bpy.add_mesh_object(blender.bpy, "Voice1", bones=["head"])
+    with pytest.raises(KeyError, match="jaw"):
+        blender.module.apply_fcurves(blender.path)
+
+
+def test_active_object_is_keyed_without_a_voice_object(blender):
+    blender.new_scene(import_mode='VISEME_PROPERTY')
+    target = fake_bpy.add_mesh_object(blender.bpy, "Face")
+    blender.module.apply_fcurves(blender.path)
+    assert target.animation_data.action.fcurves.find('["viseme"]') is not None
+
+    blender.new_scene(import_mode='VISEME_PROPERTY')
+    blender.bpy.context.active_object = None
+    with pytest.raises(ValueError, match="no active object"):
+        blender.module.apply_fcurves(blender.path)
+    operator = blender.module.BTN_OP_apply_fcurves()
+    reports = []
+    operator.report = lambda kind, message: reports.append((kind, message))
+    assert operator.execute(blender.bpy.context) == {'CANCELLED'}
+    assert reports[0][0] == {'ERROR'}
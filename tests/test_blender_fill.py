@@ -0,0 +1,127 @@
+import pytest
+
+from papagayo_core import reduce_keyframes, voice_keyframes
+
+from .samples import document
+
+
+def strokes(frame):
+    drawing = getattr(frame, "drawing", frame)
+    return [list(stroke.points) for stroke in drawing.strokes]
+
+
+def check_combined_layer(blender, voice):
+    """The combined layer holds exactly the timed keys, each with the drawing of its phoneme."""
+    settings = blender.settings
+    keys, _ = reduce_keyframes(voice_keyframes(voice, settings.rest_frames, settings.rest_min_gap,
+                                               settings.rest_after), settings.min_hold, settings.step)
+    layers = blender.bpy.data.grease_pencils[voice.name].layers
+    frames = {frame.frame_number: frame for frame in layers[voice.name + "combined"].frames}
+    assert sorted(frames) == [frame for frame, _ in keys]
+    for frame, phoneme in keys:
+        assert strokes(frames[frame]) == strokes(layers[phoneme].frames[0])
+    return keys, frames
+
+
+@pytest.mark.parametrize("share_drawings", [True, False])
+def test_grease_pencil_v2_copies_every_key(blender, share_drawings):
+    blender.new_scene(share_drawings=share_drawings, rest_frames=True)
+    blender.create_objects()
+    stats = blender.module.fill_timeline(blender.path)
+    assert stats["instanced"] == 0
+    for voice in blender.module.get_project(blender.path).voices:
+        keys, frames = check_combined_layer(blender, voice)
+        assert stats["keys"] == len(keys)
+
+
+def test_grease_pencil_v3_instances_repeated_drawings(blender):
+    blender.new_scene(grease_pencil_v3=True, rest_frames=True)
+    blender.create_objects()
+    stats = blender.module.fill_timeline(blender.path)
+    voice = blender.module.get_project(blender.path).voices[0]
+    keys, frames = check_combined_layer(blender, voice)
+    phonemes = {phoneme for _, phoneme in keys}
+    assert stats["instanced"] == len(keys) - len(phonemes)
+    layers = blender.bpy.data.grease_pencils[voice.name].layers
+    drawings = {frame.drawing.as_pointer() for frame in frames.values()}
+    assert len(drawings) == len(phonemes)
+    # The first copy owns its drawing, editing the phoneme layer doesn't change the combined layer
+    assert not drawings & {layers[phoneme].frames[0].drawing.as_pointer() for phoneme in phonemes}
+
+
+def test_grease_pencil_v3_without_sharing(blender):
+    blender.new_scene(grease_pencil_v3=True, share_drawings=False)
+    blender.create_objects()
+    stats = blender.module.fill_timeline(blender.path)
+    keys, frames = check_combined_layer(blender, blender.module.get_project(blender.path).voices[0])
+    assert stats["instanced"] == 0
+    assert len({frame.drawing.as_pointer() for frame in frames.values()}) == len(keys)
+
+
+@pytest.mark.parametrize("grease_pencil_v3", [False, True])
+def test_refill_after_retiming(blender, grease_pencil_v3):
+    blender.new_scene(grease_pencil_v3=grease_pencil_v3, rest_frames=True)
+    blender.create_objects()
+    blender.module.fill_timeline(blender.path)
+    blender.settings.step = 2
+    stats = blender.module.fill_timeline(blender.path)
+    assert stats["unchanged"]
+    check_combined_layer(blender, blender.module.get_project(blender.path).voices[0])
+
+
+def test_share_option_only_shown_for_grease_pencil_v3(blender):
+    blender.new_scene()
+    assert not blender.module.drawings_can_be_shared()
+    blender.new_scene(grease_pencil_v3=True)
+    assert blender.module.drawings_can_be_shared()
+
+
+def test_copy_drawing_copies_the_attributes(blender):
+    from benchmarks.fakes.fake_bpy import GreasePencilDrawing
+    blender.new_scene(grease_pencil_v3=True)
+    source = GreasePencilDrawing()
+    source.add_strokes([2, 1])
+    source.attributes["position"].data.foreach_set("vector", [float(value) for value in range(9)])
+    source.attributes["radius"].data.foreach_set("value", [0.5, 0.25, 1.0])
+    source.attributes[".selection"].data.foreach_set("value", [1, 1, 1])
+    source.attributes.new("material_index", 'INT', 'CURVE').data.foreach_set("value", [3, 4])
+    target = GreasePencilDrawing()
+    blender.module.copy_drawing(source, target)
+    assert strokes(target) == strokes(source)
+
+    def values(drawing, name, key, count):
+        data = [0] * count
+        drawing.attributes[name].data.foreach_get(key, data)
+        return data
+    assert values(target, "radius", "value", 3) == [0.5, 0.25, 1.0]
+    assert values(target, "material_index", "value", 2) == [3, 4]
+    # Internal attributes like the selection are not copied
+    assert values(target, ".selection", "value", 3) == [0, 0, 0]
+
+
+@pytest.mark.parametrize("grease_pencil_v3", [False, True])
+def test_refill_keys_a_redrawn_phoneme_again(blender, grease_pencil_v3):
+    from benchmarks.fakes import fake_bpy
+    blender.new_scene(grease_pencil_v3=grease_pencil_v3)
+    blender.create_objects()
+    blender.module.fill_timeline(blender.path)
+    layers = blender.bpy.data.grease_pencils["Voice1"].layers
+    fake_bpy.draw_strokes(layers["E"], strokes=5, points=7)
+    stats = blender.module.fill_timeline(blender.path)
+    keys, _ = check_combined_layer(blender, blender.module.get_project(blender.path).voices[0])
+    redrawn = sum(1 for _, phoneme in keys if phoneme == "E")
+    assert stats["keys"] == redrawn
+    assert stats["unchanged"] == len(keys) - redrawn
+    assert blender.module.fill_timeline(blender.path)["keys"] == 0
+
+
+def test_no_rest_key_after_the_sound(blender):
+    data = document(sound_duration=60)
+    data["voices"][0]["used_phonemes"] = ["AI", "E", "L", "MBP", "O", "etc", "rest"]
+    blender.new_scene(data, rest_frames=True)
+    blender.create_objects()
+    blender.module.fill_timeline(blender.path)
+    combined = blender.bpy.data.grease_pencils["Voice1"].layers["Voice1combined"]
+    frames = sorted(frame.frame_number for frame in combined.frames)
+    # The last word ends at 60, a rest at 61 would be after the sound
+    assert frames[-1] == 53 and 19 in frames
@@ -0,0 +1,95 @@
+import types
+
+import pytest
+
+from benchmarks.fakes import fake_bpy
+
+from .test_blender_fill import check_combined_layer, strokes
+
+
+def layer_content(blender):
+    layers = blender.bpy.data.grease_pencils["Voice1"].layers
+    return sorted(layers.keys()), {frame.frame_number: strokes(frame) for frame in layers["Voice1combined"].frames}
+
+
+@pytest.fixture
+def operator(blender, monkeypatch):
+    # One keyframe per timer event, so ESC and errors land in the middle of a voice
+    monkeypatch.setattr(blender.module, "MODAL_SLICE_SECONDS", 0)
+    operator = blender.module.BTN_OP_apply_to_timeline()
+    operator.reports = []
+    operator.report = lambda kind, message: operator.reports.append((kind, message))
+    return operator
+
+
+@pytest.mark.parametrize("grease_pencil_v3", [False, True])
+def test_cancel_restores_a_cleared_combined_layer(blender, operator, grease_pencil_v3):
+    blender.new_scene(grease_pencil_v3=grease_pencil_v3)
+    blender.create_objects()
+    blender.module.fill_timeline(blender.path)
+    # The combined layer no longer matches the drawings it was keyed from
+    layers = blender.bpy.data.grease_pencils["Voice1"].layers
+    fake_bpy.draw_strokes(layers["E"], strokes=5, points=7)
+    before = layer_content(blender)
+
+    blender.settings.incremental = False
+    assert fake_bpy.run_modal(blender.bpy, operator, cancel_after=3) == {'CANCELLED'}
+    assert layer_content(blender) == before
+    assert operator.reports[-1][0] == {'WARNING'}
+
+
+def test_cancel_removes_the_keys_added_by_an_incremental_fill(blender, operator):
+    blender.new_scene()
+    blender.create_objects()
+    blender.module.fill_timeline(blender.path)
+    before = layer_content(blender)
+
+    # Rest keys only add frames, there is nothing to snapshot
+    blender.settings.rest_frames = True
+    fake_bpy.run_modal(blender.bpy, operator, cancel_after=3)
+    assert layer_content(blender) == before
+
+
+def test_error_in_a_step_rolls_back_and_reports(blender, operator, monkeypatch):
+    blender.new_scene()
+    blender.create_objects()
+    blender.module.fill_timeline(blender.path)
+    before = layer_content(blender)
+    applied = blender.bpy.data.grease_pencils["Voice1"][blender.module.APPLIED_KEYS_PROPERTY]
+    blender.settings.incremental = False
+    key_drawing = blender.module.key_drawing
+    calls = []
+
+    def failing_key_drawing(*args):
+        calls.append(args)
+        if len(calls) == 3:
+            raise RuntimeError("out of memory")
+        key_drawing(*args)
+    monkeypatch.setattr(blender.module, "key_drawing", failing_key_drawing)
+
+    assert fake_bpy.run_modal(blender.bpy, operator) == {'CANCELLED'}
+    assert operator.reports == [({'ERROR'}, "RuntimeError: out of memory")]
+    assert layer_content(blender) == before
+    assert blender.bpy.data.grease_pencils["Voice1"][blender.module.APPLIED_KEYS_PROPERTY] == applied
+    assert blender.bpy.context.window_manager.timers == []
+
+
+def test_finish_removes_the_snapshot(blender, operator):
+    blender.new_scene()
+    blender.create_objects()
+    blender.module.fill_timeline(blender.path)
+    blender.settings.incremental = False
+    assert fake_bpy.run_modal(blender.bpy, operator) == {'FINISHED'}
+    assert not any(name.endswith("_snapshot") for name in layer_content(blender)[0])
+    check_combined_layer(blender, blender.module.get_project(blender.path).voices[0])
+
+
+def test_releasing_esc_does_not_cancel(blender, operator):
+    blender.new_scene()
+    blender.create_objects()
+    context = blender.bpy.context
+    operator.invoke(context, types.SimpleNamespace(type='NONE', value='NOTHING'))
+    assert operator.modal(context, types.SimpleNamespace(type='ESC', value='RELEASE')) == {'PASS_THROUGH'}
+    assert operator.modal(context, types.SimpleNamespace(type='ESC', value='PRESS')) == {'CANCELLED'}
+    context.window_manager.handlers.remove(operator)
+    assert "Voice1combined" not in blender.bpy.data.grease_pencils["Voice1"].layers
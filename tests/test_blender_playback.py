@@ -0,0 +1,68 @@
+import pytest
+
+from papagayo_core import reduce_keyframes, voice_keyframes
+
+from .samples import default_phrases, document
+
+
+def hidden(grease_pencil):
+    return {name: layer.hide for name, layer in grease_pencil.layers.items()}
+
+
+def shown_at(blender, grease_pencil, frame):
+    blender.bpy.context.scene.frame_current = frame
+    blender.module.playback_frame_change(blender.bpy.context.scene)
+    return {name for name, hide in hidden(grease_pencil).items() if not hide}
+
+
+@pytest.fixture
+def playback(blender):
+    blender.new_scene()
+    blender.create_objects()
+    grease_pencil = blender.bpy.data.grease_pencils["Voice1"]
+    grease_pencil.layers.new("Notes")
+    grease_pencil.layers["MBP"].hide = True
+    yield grease_pencil
+    blender.module.disable_playback()
+
+
+def test_playback_only_toggles_the_used_phoneme_layers(blender, playback):
+    voice = blender.module.get_project(blender.path).voices[0]
+    blender.module.enable_playback(blender.path)
+    keys, _ = reduce_keyframes(voice_keyframes(voice))
+    for frame, phoneme in keys:
+        assert shown_at(blender, playback, frame) == {"Notes", phoneme}
+
+
+def test_stopping_playback_restores_the_visibility(blender, playback):
+    before = hidden(playback)
+    blender.module.enable_playback(blender.path)
+    shown_at(blender, playback, 12)
+    blender.module.disable_playback()
+    assert hidden(playback) == before
+    assert blender.module.playback_frame_change not in blender.bpy.app.handlers.frame_change_pre
+
+
+def test_visibility_survives_resuming_and_restarting(blender, playback):
+    before = hidden(playback)
+    blender.module.enable_playback(blender.path)
+    # A resumed or restarted playback must not take the layers it hid for their original state
+    blender.module.restore_playback()
+    blender.module.enable_playback(blender.path)
+    assert shown_at(blender, playback, 16) == {"Notes", "O"}
+    blender.module.disable_playback()
+    assert hidden(playback) == before
+
+
+@pytest.mark.parametrize("operator", ["BTN_OP_enable_playback", "BTN_OP_bake_playback"])
+def test_playback_operators_report_missing_grease_pencil_data(blender, operator):
+    blender.new_scene(document({"Voice1": default_phrases(), "Voice2": default_phrases()}))
+    blender.create_objects()
+    blender.bpy.data.grease_pencils.remove(blender.bpy.data.grease_pencils["Voice2"])
+    instance = getattr(blender.module, operator)()
+    reports = []
+    instance.report = lambda kind, message: reports.append((kind, message))
+    assert instance.execute(blender.bpy.context) == {'CANCELLED'}
+    assert reports[0][0] == {'ERROR'} and "Voice2" in reports[0][1]
+    assert not blender.module.playback_tracks
+    assert blender.module.PLAYBACK_KEYS_PROPERTY not in blender.bpy.data.grease_pencils["Voice1"]
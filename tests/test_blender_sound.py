@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def sound(blender, tmp_path):
+    blender.new_scene()
+    path = tmp_path / "voice.wav"
+    path.write_bytes(b"RIFF1")
+    return str(path)
+
+
+def sound_strips(editor):
+    return [strip for strip in editor.sequences_all if strip.type == 'SOUND']
+
+
+def touch(path, data):
+    with open(path, "wb") as sound_file:
+        sound_file.write(data)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+
+def test_importing_again_reuses_the_strip(blender, sound):
+    scene = blender.bpy.context.scene
+    strip = blender.module.project_sound_strip(scene, sound)
+    assert blender.module.project_sound_strip(scene, sound) is strip
+    assert len(blender.bpy.data.sounds) == 1
+
+
+def test_changed_file_replaces_every_strip_of_it(blender, sound):
+    scene = blender.bpy.context.scene
+    module = blender.module
+    editor = scene.sequence_editor_create()
+    # Two adjacent stale strips, one inside a meta strip, and an unrelated strip
+    module.project_sound_strip(scene, sound)
+    editor.sequences.new_sound("copy", sound, 2, 0)
+    meta = editor.sequences.new_meta("meta", 3, 0)
+    meta.sequences.new_sound("nested", sound, 1, 0)
+    other = editor.sequences.new_sound("other", os.path.join(os.path.dirname(sound), "music.wav"), 4, 0)
+
+    touch(sound, b"RIFF22")
+    strip = module.project_sound_strip(scene, sound)
+    assert sound_strips(editor) == [other, strip]
+    assert list(meta.sequences) == []
+    assert strip.sound[module.SOUND_STAMP_PROPERTY] == module.file_stamp(sound)
+    assert sorted(sound.filepath for sound in blender.bpy.data.sounds) == sorted([other.sound.filepath, sound])
@@ -0,0 +1,50 @@
+import pytest
+
+
+def hidden(grease_pencil):
+    return {name: layer.hide for name, layer in grease_pencil.layers.items()}
+
+
+@pytest.fixture
+def grease_pencil(blender):
+    blender.new_scene()
+    blender.create_objects()
+    blender.module.fill_timeline(blender.path)
+    grease_pencil = blender.bpy.data.grease_pencils["Voice1"]
+    grease_pencil.layers.new("Notes")
+    grease_pencil.layers["MBP"].hide = True
+    return grease_pencil
+
+
+def test_chart_hides_only_the_phoneme_and_combined_layers(blender, grease_pencil):
+    blender.module.apply_time_offset(blender.path)
+    shown = {name for name, hide in hidden(grease_pencil).items() if not hide}
+    assert shown == {"Notes", "Voice1chart"}
+    # Keying the chart again doesn't take the hidden layers for their original state
+    blender.module.apply_time_offset(blender.path)
+    assert dict(grease_pencil[blender.module.CHART_HIDE_PROPERTY])["E"] == 0
+
+
+def test_removing_the_chart_restores_the_visibility(blender, grease_pencil):
+    before = hidden(grease_pencil)
+    module = blender.module
+    module.apply_time_offset(blender.path)
+    module.apply_time_offset(blender.path)
+    assert module.remove_time_offset(blender.path) == len(module.get_project(blender.path).voices)
+    assert hidden(grease_pencil) == before
+    assert module.CHART_HIDE_PROPERTY not in grease_pencil
+
+    stroke_object = module.grease_object(grease_pencil)
+    assert stroke_object.grease_pencil_modifiers.get(module.TIME_OFFSET_MODIFIER) is None
+    assert stroke_object.animation_data.action.fcurves.find(
+        f'grease_pencil_modifiers["{module.TIME_OFFSET_MODIFIER}"].offset') is None
+    assert module.remove_time_offset(blender.path) == 0
+
+
+def test_chart_after_live_playback_restores_the_original_visibility(blender, grease_pencil):
+    before = hidden(grease_pencil)
+    blender.module.enable_playback(blender.path)
+    blender.module.apply_time_offset(blender.path)
+    assert not blender.module.playback_tracks
+    blender.module.remove_time_offset(blender.path)
+    assert hidden(grease_pencil) == before
@@ -0,0 +1,100 @@
+import os
+
+from papagayo_core import BufferCache, ProjectCache, load_project
+
+from .samples import document, write_document
+
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, file_path):
+        self.calls += 1
+        return load_project(file_path)
+
+
+def test_unchanged_file_is_parsed_once(tmp_path):
+    path = write_document(tmp_path, document())
+    loader = CountingLoader()
+    cache = ProjectCache(loader=loader)
+    assert cache.get(path) is cache.get(os.path.relpath(path))
+    assert loader.calls == 1
+    assert path in cache
+
+
+def test_changed_file_is_parsed_again(tmp_path):
+    path = write_document(tmp_path, document())
+    loader = CountingLoader()
+    cache = ProjectCache(loader=loader)
+    first = cache.get(path)
+    write_document(tmp_path, document(fps=30))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second = cache.get(path)
+    assert loader.calls == 2
+    assert (first.fps, second.fps) == (24, 30)
+
+
+def test_invalidate_and_eviction(tmp_path):
+    paths = [write_document(tmp_path, document(), f"shot{number}.pg2") for number in range(3)]
+    cache = ProjectCache(loader=CountingLoader(), max_entries=2)
+    for path in paths:
+        cache.get(path)
+    assert len(cache) == 2
+    assert paths[0] not in cache
+    cache.invalidate(paths[1])
+    assert cache.peek(paths[1]) is None
+    assert cache.peek(paths[2]) is not None
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_buffer_cache_hits_and_misses():
+    cache = BufferCache(100)
+    assert cache.get("E") is None
+    assert cache.put("E", b"pixels", 10)
+    assert cache.get("E") == b"pixels"
+    assert cache.get("E") == b"pixels"
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert "E" in cache and len(cache) == 1
+
+
+def test_buffer_cache_evicts_the_least_recently_used():
+    cache = BufferCache(30)
+    for key in ("A", "B", "C"):
+        cache.put(key, key, 10)
+    cache.get("A")
+    cache.put("D", "D", 10)
+    assert "B" not in cache
+    assert [key for key in ("A", "C", "D") if key in cache] == ["A", "C", "D"]
+    # A large entry pushes out as many of the oldest entries as needed
+    cache.put("E", "E", 25)
+    assert [key for key in ("A", "C", "D", "E") if key in cache] == ["E"]
+    assert cache.size == 25
+
+
+def test_buffer_cache_stays_within_its_byte_budget():
+    cache = BufferCache(30)
+    assert not cache.put("huge", "huge", 31)
+    assert "huge" not in cache and cache.size == 0
+    cache.put("A", "A", 20)
+    # Storing a key again replaces its size instead of adding to it
+    cache.put("A", "A2", 5)
+    assert cache.size == 5 and cache.get("A") == "A2"
+    cache.put("B", "B", 25)
+    assert cache.size == 30
+    cache.discard("B")
+    assert cache.size == 5
+    cache.clear()
+    assert (len(cache), cache.size, cache.hits, cache.misses) == (0, 0, 0, 0)
+
+
+def test_buffer_cache_budget_can_shrink():
+    cache = BufferCache(30)
+    cache.put("A", "A", 10)
+    cache.put("B", "B", 10)
+    cache.max_bytes = 15
+    cache.put("C", "C", 5)
+    assert [key for key in ("A", "B", "C") if key in cache] == ["B", "C"]
+    assert cache.size <= cache.max_bytes
@@ -0,0 +1,37 @@
+from array import array
+
+from papagayo_core import phoneme_channels, phoneme_value_coordinates, viseme_index_coordinates
+
+KEYS = [(0, "rest"), (10, "E"), (14, "O"), (20, "E"), (30, "rest")]
+
+
+def test_channels_keep_the_given_phonemes_first():
+    assert phoneme_channels(KEYS) == ["rest", "E", "O"]
+    assert phoneme_channels(KEYS, ["AI", "E", "AI"]) == ["AI", "E", "rest", "O"]
+    assert phoneme_channels([], ["E"]) == ["E"]
+
+
+def test_viseme_index_coordinates_are_flat_frame_index_pairs():
+    coordinates = viseme_index_coordinates(KEYS, ["E", "O", "rest"])
+    assert isinstance(coordinates, array) and coordinates.typecode == "f"
+    assert list(coordinates) == [0, 2, 10, 0, 14, 1, 20, 0, 30, 2]
+
+
+def test_phoneme_value_coordinates_key_the_starts_and_ends():
+    coordinates = phoneme_value_coordinates(KEYS, ["rest", "E", "O", "AI"])
+    assert list(coordinates["rest"]) == [0, 1, 10, 0, 30, 1]
+    assert list(coordinates["E"]) == [0, 0, 10, 1, 14, 0, 20, 1, 30, 0]
+    assert list(coordinates["O"]) == [0, 0, 14, 1, 20, 0]
+    # Unused phonemes still start from a defined value
+    assert list(coordinates["AI"]) == [0, 0]
+
+
+def test_repeated_phonemes_are_not_keyed_again():
+    coordinates = phoneme_value_coordinates([(5, "E"), (8, "E"), (12, "O")], ["E", "O"])
+    assert list(coordinates["E"]) == [5, 1, 12, 0]
+    assert list(coordinates["O"]) == [5, 0, 12, 1]
+
+
+def test_no_keys_give_empty_curves():
+    assert {name: list(flat) for name, flat in phoneme_value_coordinates([], ["E"]).items()} == {"E": []}
+    assert list(viseme_index_coordinates([], ["E"])) == []
@@ -0,0 +1,64 @@
+import json
+
+from papagayo_core import (decode_drawing_signatures, decode_keyframe_record, diff_keyframes,
+                           encode_keyframe_record, redrawn_phonemes)
+
+OLD = [(0, "rest"), (4, "E"), (8, "O"), (12, "E")]
+
+
+def apply(keys, operations):
+    """Apply (frame, old, new) operations to keys the way the hosts do."""
+    shown = dict(keys)
+    for frame, old, new in operations:
+        if old is not None:
+            assert shown.pop(frame) == old
+        if new is not None:
+            shown[frame] = new
+    return sorted(shown.items())
+
+
+def test_diff_and_apply_round_trip():
+    new = [(0, "rest"), (5, "E"), (8, "AI"), (12, "E"), (20, "rest")]
+    diff = diff_keyframes(OLD, new)
+    assert diff.added == [(5, "E"), (20, "rest")]
+    assert diff.removed == [(4, "E")]
+    assert diff.changed == [(8, "O", "AI")]
+    assert diff.unchanged == [(0, "rest"), (12, "E")]
+    assert diff.touched == 4 and diff
+    assert [operation[0] for operation in diff.operations()] == [4, 5, 8, 20]
+    assert apply(OLD, diff.operations()) == new
+    assert not diff_keyframes(new, new)
+
+
+def test_redrawn_phonemes_are_keyed_again():
+    diff = diff_keyframes(OLD, OLD, redrawn={"E"})
+    assert diff.changed == [(4, "E", "E"), (12, "E", "E")]
+    assert diff.unchanged == [(0, "rest"), (8, "O")]
+    assert apply(OLD, diff.operations()) == OLD
+
+
+def test_redrawn_phonemes():
+    assert redrawn_phonemes({"E": "a", "O": "b"}, {"E": "a", "O": "c", "AI": "d"}) == {"O", "AI"}
+    assert redrawn_phonemes({}, {}) == set()
+
+
+def test_record_round_trip():
+    data = encode_keyframe_record({"Voice1": OLD, "Voice2": []}, {"Voice1": {"E": "abc", "O": "def"}})
+    assert decode_keyframe_record(data) == {"Voice1": OLD, "Voice2": []}
+    assert decode_keyframe_record(data.encode("utf-8")) == decode_keyframe_record(data)
+    assert decode_drawing_signatures(data) == {"Voice1": {"E": "abc", "O": "def"}}
+    assert decode_drawing_signatures(encode_keyframe_record({"Voice1": OLD})) == {}
+
+
+def test_version_1_records_have_keys_but_no_drawings():
+    data = json.dumps({"version": 1, "voices": {"Voice1": [[4, "E"]]}})
+    assert decode_keyframe_record(data) == {"Voice1": [(4, "E")]}
+    assert decode_drawing_signatures(data) == {}
+
+
+def test_damaged_or_newer_records_decode_to_nothing():
+    for data in (None, "", "{", "[]", json.dumps({"version": 99, "voices": {"A": [[1, "E"]]}}),
+                 json.dumps({"version": 2, "voices": {"A": [["x", "E"]]}, "drawings": {"A": []}}),
+                 json.dumps({"version": 2, "voices": [], "drawings": "x"})):
+        assert decode_keyframe_record(data) == {}
+        assert decode_drawing_signatures(data) == {}
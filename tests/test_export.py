@@ -0,0 +1,63 @@
+import csv
+import json
+import os
+
+from papagayo_core import export_project, frame_table, parse_project, voice_keyframes
+from papagayo_core.cli import collect_files, main, output_dirs
+from papagayo_core.export import safe_file_name
+
+from .samples import document, write_document
+
+
+def test_frame_table():
+    assert frame_table([(2, "E"), (4, "O"), (4, "MBP")], 7) == ["", "", "E", "E", "MBP", "MBP", "MBP"]
+    assert frame_table([], 2) == ["", ""]
+    assert frame_table([(0, "E")], -1) == []
+
+
+def test_safe_file_name():
+    assert safe_file_name('a/b:c*?"') == "a_b_c___"
+    assert safe_file_name(" . ") == "voice"
+
+
+def test_export_project(tmp_path):
+    project = parse_project(document({"Voice/1": document()["voices"][0]["phrases"]}), "shot.pg2")
+    written = export_project(project, tmp_path / "out", formats=("csv", "json"), kinds=("keyframes", "frames"))
+    assert sorted(os.path.basename(path) for path in written) == [
+        "Voice_1.frames.csv", "Voice_1.frames.json", "Voice_1.keyframes.csv", "Voice_1.keyframes.json",
+        "project.json"]
+    with open(tmp_path / "out" / "Voice_1.keyframes.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    keyframes = voice_keyframes(project.voices[0])
+    assert rows[1:] == [[str(frame), phoneme] for frame, phoneme in keyframes]
+    with open(tmp_path / "out" / "Voice_1.frames.json", encoding="utf-8") as f:
+        frames = json.load(f)["frames"]
+    assert len(frames) == project.duration + 1
+    assert frames[11] == "etc" and frames[99] == "AI"
+    with open(tmp_path / "out" / "project.json", encoding="utf-8") as f:
+        summary = json.load(f)
+    assert summary["voices"][0]["keyframes"] == [list(key) for key in keyframes]
+
+
+def test_collect_files_and_output_dirs(tmp_path):
+    write_document(tmp_path, document(), "b.pg2")
+    write_document(tmp_path, document(), "a.json")
+    (tmp_path / "notes.txt").write_text("", encoding="utf-8")
+    (tmp_path / "sub").mkdir()
+    write_document(tmp_path / "sub", document(), "a.json")
+    files = collect_files([str(tmp_path)])
+    assert [os.path.basename(path) for path in files] == ["a.json", "b.pg2"]
+    files = collect_files([str(tmp_path)], recursive=True)
+    assert len(files) == 3
+    assert [os.path.basename(path) for path in output_dirs(sorted(files), "out")] == ["a_json", "b_pg2", "a_json_2"]
+
+
+def test_main_converts_and_reports_failures(tmp_path, capsys):
+    write_document(tmp_path, document(), "good.pg2")
+    (tmp_path / "bad.pg2").write_text("{", encoding="utf-8")
+    output = tmp_path / "out"
+    assert main([str(tmp_path), "-o", str(output), "-j", "1", "--rest-frames"]) == 1
+    assert "bad.pg2" in capsys.readouterr().err
+    with open(output / "good_pg2" / "Voice1.keyframes.json", encoding="utf-8") as f:
+        assert ["rest"] in [key[1:] for key in json.load(f)["keyframes"]]
+    assert main([str(tmp_path / "missing"), "-o", str(output)]) == 2
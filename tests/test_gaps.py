@@ -0,0 +1,103 @@
+import pytest
+
+from papagayo_core import REST_PHONEME, merge_rest_keys, parse_project, rest_keys, silence_intervals, voice_keyframes
+from papagayo_core import gaps
+from papagayo_core.export import project_summary
+
+from .samples import document, phrase, word
+
+
+@pytest.fixture(params=["numpy", "python"])
+def implementation(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(gaps, "numpy", None)
+    elif gaps.numpy is None:
+        pytest.skip("NumPy is not installed")
+    return request.param
+
+
+def make_voice(*spans):
+    """A voice with one word per (start, end) span, in one phrase each."""
+    phrases = [phrase(f"p{n}", start, end, [word(f"w{n}", start, end, [(start, "E")])])
+               for n, (start, end) in enumerate(spans)]
+    return parse_project(document({"Voice1": phrases})).voices[0]
+
+
+def default_voice():
+    return parse_project(document()).voices[0]
+
+
+def test_silences_between_words(implementation):
+    assert silence_intervals(default_voice()) == [(0, 10), (19, 21), (31, 50), (61, None)]
+    assert silence_intervals(default_voice(), min_gap=3) == [(0, 10), (31, 50), (61, None)]
+
+
+@pytest.mark.parametrize("spans, expected", [
+    # The frame after a word end starts the silence, a word starting there leaves none
+    ([(0, 5), (6, 9)], [(10, None)]),
+    ([(0, 5), (7, 9)], [(6, 7), (10, None)]),
+    # Word end frames are spoken
+    ([(3, 3)], [(0, 3), (4, None)]),
+    # A long word spans the shorter ones starting inside it
+    ([(0, 20), (2, 4), (10, 12), (25, 30)], [(21, 25), (31, None)]),
+    # File order doesn't matter
+    ([(25, 30), (0, 20), (10, 12)], [(21, 25), (31, None)]),
+])
+def test_gap_boundaries(implementation, spans, expected):
+    assert silence_intervals(make_voice(*spans)) == expected
+
+
+def test_phrase_without_words_is_speech(implementation):
+    phrases = [phrase("a", 0, 5, [word("a", 0, 5, [(0, "E")])]), phrase("hum", 8, 12, [])]
+    voice = parse_project(document({"Voice1": phrases})).voices[0]
+    assert silence_intervals(voice) == [(6, 8), (13, None)]
+
+
+def test_voice_without_words_has_no_silences(implementation):
+    voice = parse_project(document({"Voice1": []})).voices[0]
+    assert silence_intervals(voice) == []
+    assert rest_keys(voice) == []
+
+
+def test_rest_keys_follow_the_word_ends(implementation):
+    voice = default_voice()
+    assert rest_keys(voice) == [(0, REST_PHONEME), (19, REST_PHONEME), (31, REST_PHONEME), (61, REST_PHONEME)]
+    # Silences too short to reach the rest keep the last shape
+    assert rest_keys(voice, rest_after=2) == [(2, REST_PHONEME), (33, REST_PHONEME), (63, REST_PHONEME)]
+    assert rest_keys(voice, min_gap=3, rest_after=1) == [(1, REST_PHONEME), (32, REST_PHONEME), (62, REST_PHONEME)]
+
+
+def test_trailing_rest_stops_at_the_end_frame(implementation):
+    voice = default_voice()
+    assert rest_keys(voice, end_frame=61)[-1] == (61, REST_PHONEME)
+    assert rest_keys(voice, end_frame=60)[-1] == (31, REST_PHONEME)
+    assert rest_keys(voice, rest_after=5, end_frame=66)[-1] == (66, REST_PHONEME)
+    assert rest_keys(voice, rest_after=5, end_frame=65)[-1] == (36, REST_PHONEME)
+
+
+def test_merge_keeps_the_phoneme_on_a_shared_frame():
+    merged = merge_rest_keys([(0, "E"), (5, "AI")], [(0, REST_PHONEME), (3, REST_PHONEME), (5, REST_PHONEME)])
+    assert merged == [(0, REST_PHONEME), (0, "E"), (3, REST_PHONEME), (5, REST_PHONEME), (5, "AI")]
+
+
+def test_voice_keyframes_with_rests(implementation):
+    voice = default_voice()
+    keys = voice_keyframes(voice, rest_frames=True, end_frame=60)
+    assert [key for key in keys if key[1] == REST_PHONEME] == [(0, REST_PHONEME), (19, REST_PHONEME),
+                                                                (31, REST_PHONEME)]
+    assert [key for key in keys if key[1] != REST_PHONEME] == voice_keyframes(voice)
+
+
+def test_export_ends_the_rests_at_the_sound_duration(implementation):
+    # Papagayo-NG only writes the sound duration, the last word ends at 60
+    keys = project_summary(parse_project(document(sound_duration=60)), rest_frames=True)["voices"][0]["keyframes"]
+    assert keys[-1] == [53, "AI"]
+    keys = project_summary(parse_project(document(sound_duration=100)), rest_frames=True)["voices"][0]["keyframes"]
+    assert keys[-1] == [61, REST_PHONEME]
+
+
+def test_rest_after_the_last_word_without_a_known_length(implementation):
+    project = parse_project(document(sound_duration=None))
+    assert project.last_frame is None
+    keys = project_summary(project, rest_frames=True)["voices"][0]["keyframes"]
+    assert keys[-1] == [61, REST_PHONEME]
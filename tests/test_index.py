@@ -0,0 +1,61 @@
+import pytest
+
+from papagayo_core import TimelineIndex, build_index, parse_project
+from papagayo_core import index as index_module
+
+from .samples import default_phrases, document, phrase, word
+
+
+@pytest.fixture
+def voice():
+    return parse_project(document()).voices[0]
+
+
+def test_phoneme_word_and_phrase_lookups(voice):
+    index = TimelineIndex(voice)
+    assert index.phoneme_at(9) is None
+    assert [index.phoneme_at(frame) for frame in (10, 11, 12, 16, 20, 21, 49, 53, 500)] == \
+        ["etc", "etc", "E", "O", "O", "etc", "E", "AI", "AI"]
+    assert index.word_at(18).text == "hello"
+    assert index.word_at(19) is None
+    assert index.word_at(30).text == "there"
+    assert index.phrase_at(30).text == "hello there"
+    assert index.phrase_at(31) is None
+    assert [event.text for event in index.phonemes_between(14, 50)] == ["L", "O", "etc", "E"]
+
+
+def test_unsorted_file_order():
+    phrases = default_phrases()
+    phrases.reverse()
+    phrases[1]["words"].reverse()
+    voice = parse_project(document({"A": phrases})).voices[0]
+    index = TimelineIndex(voice)
+    assert index.order is not None
+    assert list(index.frames) == sorted(voice.frames)
+    assert [event.text for event in index][:3] == ["etc", "E", "L"]
+    assert index.word_at(25).text == "there"
+    assert index.phrase_at(55).text == "bye"
+
+
+def test_shared_frame_keeps_the_last_event():
+    phrases = [phrase("x", 0, 5, [word("x", 0, 5, [(0, "E"), (0, "O"), (3, "MBP")])])]
+    index = TimelineIndex(parse_project(document({"A": phrases})).voices[0])
+    assert index.phoneme_at(0) == "O"
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_positions_at(voice, monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(index_module, "numpy", None)
+    index = TimelineIndex(voice)
+    frames = list(range(0, 70, 3))
+    assert list(index.positions_at(frames)) == [index.position_at(frame) for frame in frames]
+
+
+def test_build_index(voice):
+    project = parse_project(document({"A": default_phrases(), "B": []}))
+    indexes = build_index(project)
+    assert set(indexes) == {"A", "B"}
+    assert indexes["B"].at(10) is None
@@ -0,0 +1,106 @@
+import struct
+import zipfile
+import zlib
+
+import pytest
+
+from papagayo_core import parse_project, voice_keyframes
+from papagayo_core.kra import (KRA_MIMETYPE, TILE_SIZE, KraDocument, KraError, frame_from_rgba, lzf_decompress,
+                               read_png, read_tile_data, verify_kra, write_lipsync_kra, write_tile_data)
+
+from .samples import document
+
+
+def write_png(path, width, height, rgba):
+    """Write straight RGBA pixels as an 8 bit, filter 0 PNG."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    stride = width * 4
+    raw = b"".join(b"\0" + rgba[row * stride:(row + 1) * stride] for row in range(height))
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+                + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+def square(width, height, color):
+    """RGBA pixels with an opaque 'color' square in the top left corner."""
+    pixels = bytearray(width * height * 4)
+    for row in range(height // 2):
+        for column in range(width // 2):
+            pixels[(row * width + column) * 4:(row * width + column + 1) * 4] = bytes(color) + b"\xff"
+    return bytes(pixels)
+
+
+@pytest.fixture
+def phoneme_dir(tmp_path):
+    directory = tmp_path / "phonemes"
+    directory.mkdir()
+    for number, phoneme in enumerate(["AI", "E", "L", "MBP", "O", "etc", "rest"]):
+        write_png(directory / f"{phoneme}.png", 80, 70, square(80, 70, (number * 30, 255 - number * 30, 7)))
+    return directory
+
+
+def test_png_and_tiles_round_trip(tmp_path):
+    rgba = square(70, 65, (10, 20, 30))
+    write_png(tmp_path / "a.png", 70, 65, rgba)
+    assert read_png(tmp_path / "a.png") == (70, 65, rgba)
+    frame = frame_from_rgba(70, 65, rgba)
+    # Only the top left tile has opaque pixels
+    assert list(frame.tiles) == [(0, 0)]
+    assert frame.tiles[(0, 0)][:4] == bytes([30, 20, 10, 255])
+    assert read_tile_data(write_tile_data(frame.tiles)) == (4, frame.tiles)
+
+
+def test_lzf_decompress():
+    # A literal run "abc" then a back reference of length 3 + 2 at distance 3
+    assert lzf_decompress(bytes([2]) + b"abc" + bytes([0b01100000, 2]), 8) == b"abcabcab"
+
+
+def test_write_and_read_back(tmp_path, phoneme_dir):
+    project = parse_project(document(), "shot.pg2")
+    output = tmp_path / "shot.kra"
+    report = write_lipsync_kra(project, str(output), str(phoneme_dir), rest_frames=True)
+    voice_report = report["Voice1"]
+    assert voice_report["missing"] == []
+    assert voice_report["frames"] < voice_report["keyframes"]
+
+    with zipfile.ZipFile(output) as archive:
+        assert archive.read("mimetype") == KRA_MIMETYPE
+    written = verify_kra(str(output))
+    keyframes = voice_keyframes(project.voices[0], rest_frames=True)
+    times = sorted({frame for frame, _ in keyframes} | {0})
+    assert written["Voice1_combined"] == times
+
+    with KraDocument.open(str(output)) as kra:
+        assert (kra.width, kra.height) == (80, 70)
+        group = kra.find_layer("Voice1", "grouplayer")
+        combined = kra.find_layer("Voice1_combined", parent=group)
+        phonemes = kra.phoneme_frames(group)
+        for frame, phoneme in keyframes:
+            assert kra.read_frame(combined, frame).tiles == phonemes[phoneme].tiles
+
+
+def test_rewrite_from_kra_source(tmp_path, phoneme_dir):
+    project = parse_project(document(), "shot.pg2")
+    first = tmp_path / "first.kra"
+    write_lipsync_kra(project, str(first), str(phoneme_dir), rest_frames=False)
+    with KraDocument.open(str(first)) as kra:
+        group = kra.find_layer("Voice1", "grouplayer")
+        # Before the first phoneme the combined layer starts with a blank key
+        assert kra.read_frame(kra.find_layer("Voice1_combined", parent=group), 0).tiles == {}
+    second = tmp_path / "second.kra"
+    report = write_lipsync_kra(project, str(second), str(first), rest_frames=True, share_frames=False, step=2)
+    assert report["Voice1"]["frames"] == report["Voice1"]["keyframes"]
+    written = verify_kra(str(second))
+    assert all(time % 2 == 0 for time in written["Voice1_combined"])
+    with KraDocument.open(str(second)) as kra:
+        group = kra.find_layer("Voice1", "grouplayer")
+        names = [layer.get("name") for layer in kra.layers(group)]
+    assert names.count("Voice1_combined") == 1
+
+
+def test_not_a_png(tmp_path):
+    path = tmp_path / "fake.png"
+    path.write_bytes(b"GIF89a")
+    with pytest.raises(KraError):
+        read_png(path)
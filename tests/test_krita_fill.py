@@ -0,0 +1,182 @@
+import sys
+
+import pytest
+
+from benchmarks import hosts
+from benchmarks.fakes import fake_krita, fake_qt
+from papagayo_core import decode_keyframe_record, reduce_keyframes, voice_keyframes
+
+from .samples import document, write_document
+
+
+@pytest.fixture
+def importer(tmp_path, monkeypatch):
+    module, krita = hosts.load_krita()
+    krita.Krita.instance().new_document(16, 16)
+    importer = module.PapagayoImporter()
+    importer.use_cache_checkbox.setChecked(False)
+    importer.insert_rest_frames.setChecked(False)
+    importer.load_sound_checkbox.setChecked(False)
+    monkeypatch.setattr(importer, "show_info", lambda message: None)
+    errors = []
+    monkeypatch.setattr(importer, "show_error", errors.append)
+    importer.errors = errors
+    importer.start_loading(write_document(tmp_path, document()))
+    importer.prepare_krita_layers()
+    for number, node in enumerate(importer.document.nodeByName("Voice1").childNodes(), 1):
+        fake_krita.draw(node, 4, 4, value=number)
+    return importer
+
+
+def fill(importer):
+    importer.fill_timeline()
+    fake_qt.run_event_loop()
+    assert importer.errors == []
+
+
+def check_combined_layer(importer):
+    keys, _ = reduce_keyframes(voice_keyframes(importer.project.voices[0]))
+    group = importer.document.nodeByName("Voice1")
+    layers = {node.name(): node for node in group.childNodes()}
+    combined = layers["Voice1_combined"]
+    for frame, phoneme in keys:
+        assert combined._keyframes[frame][1] == layers[phoneme]._keyframes[0][1]
+    return keys
+
+
+@pytest.mark.parametrize("clone_frames", [True, False])
+def test_refill_keys_a_redrawn_phoneme_again(importer, clone_frames):
+    importer.clone_frames_checkbox.setChecked(clone_frames)
+    importer.incremental_checkbox.setChecked(True)
+    importer.profile_checkbox.setChecked(True)
+    fill(importer)
+    check_combined_layer(importer)
+    fill(importer)
+    assert importer.profiler.counters["keyframes"] == 0
+
+    layers = {node.name(): node for node in importer.document.nodeByName("Voice1").childNodes()}
+    fake_krita.draw(layers["E"], 6, 5, value=200)
+    fill(importer)
+    keys = check_combined_layer(importer)
+    assert importer.profiler.counters["keyframes"] == sum(1 for _, phoneme in keys if phoneme == "E")
+
+
+def test_profiled_fill_records_and_logs_host_calls(importer, monkeypatch):
+    lines = []
+    monkeypatch.setattr(importer, "log", lambda message, level="info": lines.append(message))
+    importer.profile_checkbox.setChecked(True)
+    fill(importer)
+    keys = check_combined_layer(importer)
+    profiler = importer.profiler
+    assert profiler.counters["keyframes"] == len(keys)
+    assert len(profiler.samples["pixelData"]) == len({phoneme for _, phoneme in keys})
+    assert profiler.elapsed > 0
+    summary = lines[lines.index("Fill timeline profile:") + 1:]
+    assert summary[0].startswith("Profile: ")
+    assert any(line.startswith("  pixelData: ") for line in summary)
+    assert f"  keyframes: {len(keys)}" in summary
+
+
+def check_cancelled_fill(importer):
+    """Check the UI is given back and the recorded keys are the ones the combined layer shows."""
+    assert importer.fill_job is None
+    assert not importer.fill_timer.isActive()
+    assert not importer.is_processing
+    assert importer.fill_timeline_button.isEnabled()
+    assert not importer.cancel_fill_button.isVisible()
+    assert not importer.progress_bar.isVisible()
+    assert importer.errors == []
+    assert importer.status_label.text().startswith("Timeline fill cancelled")
+
+    recorded = decode_keyframe_record(importer.read_applied_record())["Voice1"]
+    layers = {node.name(): node for node in importer.document.nodeByName("Voice1").childNodes()}
+    combined = layers["Voice1_combined"]
+    for frame, phoneme in recorded:
+        assert combined._keyframes[frame][1] == layers[phoneme]._keyframes[0][1]
+    assert set(combined._keyframes) <= {0} | {frame for frame, _ in recorded}
+    return recorded
+
+
+@pytest.fixture
+def sliced(importer, monkeypatch):
+    """Importer that applies one key per timer slice."""
+    monkeypatch.setattr(sys.modules[type(importer).__module__], "FILL_SLICE_MS", 0)
+    importer.incremental_checkbox.setChecked(True)
+    return importer
+
+
+def test_cancel_between_slices_stops_the_timer(sliced):
+    sliced.fill_timeline()
+    assert sliced.cancel_fill_button.isVisible()
+    assert not sliced.fill_timeline_button.isEnabled()
+    for _ in range(4):
+        sliced.fill_timer.timeout.emit()
+    assert sliced.fill_timer.isActive()
+    applied = dict(sliced.fill_job.applied)
+
+    sliced.cancel_fill_button.click()
+    assert fake_qt.run_event_loop() == 0
+    recorded = check_cancelled_fill(sliced)
+    assert dict(recorded) == applied
+    assert 0 < len(recorded) < len(voice_keyframes(sliced.project.voices[0]))
+
+    fill(sliced)
+    check_combined_layer(sliced)
+
+
+def test_cancel_within_a_slice_finishes_the_slice(sliced, monkeypatch):
+    apply = sliced.apply_phoneme_to_timeline
+    keyed = []
+
+    def apply_and_cancel(*args):
+        result = apply(*args)
+        keyed.append(args)
+        if len(keyed) == 3:
+            sliced.cancel_fill()
+        return result
+
+    monkeypatch.setattr(sliced, "apply_phoneme_to_timeline", apply_and_cancel)
+    sliced.fill_timeline()
+    fake_qt.run_event_loop()
+    recorded = check_cancelled_fill(sliced)
+    assert len(recorded) == 3
+
+    monkeypatch.setattr(sliced, "apply_phoneme_to_timeline", apply)
+    fill(sliced)
+    check_combined_layer(sliced)
+
+
+def test_failed_keys_are_not_recorded(importer, monkeypatch):
+    importer.incremental_checkbox.setChecked(True)
+    key = importer.key_combined_frame
+
+    def key_without_e(combine_layer, phoneme, layer, frame):
+        if phoneme == "E":
+            raise RuntimeError("copy failed")
+        return key(combine_layer, phoneme, layer, frame)
+
+    monkeypatch.setattr(importer, "key_combined_frame", key_without_e)
+    fill(importer)
+    recorded = decode_keyframe_record(importer.read_applied_record())["Voice1"]
+    assert recorded and "E" not in {phoneme for _, phoneme in recorded}
+
+    monkeypatch.setattr(importer, "key_combined_frame", key)
+    fill(importer)
+    check_combined_layer(importer)
+
+
+def test_full_fill_does_not_read_drawing_signatures(importer, monkeypatch):
+    importer.incremental_checkbox.setChecked(False)
+    signed = []
+    monkeypatch.setattr(importer, "drawing_signature", lambda layer, phoneme: signed.append(phoneme))
+    fill(importer)
+    check_combined_layer(importer)
+    assert signed == []
+
+
+def test_no_rest_key_after_the_sound(importer, tmp_path):
+    importer.insert_rest_frames.setChecked(True)
+    importer.start_loading(write_document(tmp_path, document(sound_duration=60), "short.pg2"))
+    keys = importer.get_voice_keyframes(importer.get_voice_list())["Voice1"]
+    assert keys[-1] == (53, "AI")
+    assert "rest" in {phoneme for _, phoneme in keys}
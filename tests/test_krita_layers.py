@@ -0,0 +1,63 @@
+import pytest
+
+from benchmarks import hosts
+
+from .samples import document, write_document
+
+
+@pytest.fixture
+def importer(tmp_path):
+    module, krita = hosts.load_krita()
+    document_ = krita.Krita.instance().new_document(64, 64)
+    importer = module.PapagayoImporter()
+    importer.use_cache_checkbox.setChecked(False)
+    importer.load_sound_checkbox.setChecked(False)
+    importer.start_loading(write_document(tmp_path, document()))
+    assert importer.project is not None
+    importer.document = document_
+    return importer
+
+
+def child_names(node):
+    return [child.name() for child in node.childNodes()]
+
+
+def test_prepare_layers_creates_every_phoneme_layer_once(importer):
+    importer.prepare_krita_layers()
+    importer.prepare_krita_layers()
+    group = importer.document.nodeByName("Voice1")
+    names = child_names(group)
+    assert sorted(set(names)) == sorted(names)
+    assert set(importer.project.voices[0].used_phonemes) <= set(names)
+
+
+def test_layer_index_keeps_the_first_layer_of_a_name(importer):
+    importer.prepare_krita_layers()
+    group = importer.document.nodeByName("Voice1")
+    duplicate = importer.document.createNode("E", "paintLayer")
+    group.addChildNode(duplicate, None)
+    layers = importer.build_layer_index(group)
+    assert set(layers) == set(child_names(group))
+    assert layers["E"] is not duplicate
+    assert importer.create_phoneme_layer(group, "E", layers) is layers["E"]
+    created = importer.create_phoneme_layer(group, "X1", layers)
+    assert layers["X1"] is created
+    assert "X1" in child_names(group)
+
+
+def layer_tree(node):
+    return [(child.name(), child.type(), child.animated(), child.keyframe_times(), layer_tree(child))
+            for child in node.childNodes()]
+
+
+def test_batched_and_unbatched_preparation_build_the_same_layers(importer):
+    importer.batch_layers_checkbox.setChecked(True)
+    importer.prepare_krita_layers()
+    batched = layer_tree(importer.document.rootNode())
+
+    _, krita = hosts.load_krita()
+    importer.document = krita.Krita.instance().new_document(64, 64)
+    importer.batch_layers_checkbox.setChecked(False)
+    importer.prepare_krita_layers()
+    assert batched
+    assert layer_tree(importer.document.rootNode()) == batched
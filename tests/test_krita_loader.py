@@ -0,0 +1,53 @@
+from benchmarks import hosts
+
+from .samples import document, write_document
+
+
+def new_importer(monkeypatch):
+    module, krita = hosts.load_krita()
+    krita.Krita.instance().new_document(64, 64)
+    importer = module.PapagayoImporter()
+    importer.use_cache_checkbox.setChecked(False)
+    errors = []
+    monkeypatch.setattr(importer, "show_error", errors.append)
+    return module, importer, errors
+
+
+def test_loader_thread_hands_over_the_project(tmp_path, monkeypatch):
+    module, importer, errors = new_importer(monkeypatch)
+    path = write_document(tmp_path, document())
+    importer.start_loading(path)
+    assert errors == []
+    assert not importer.loading
+    assert importer.papagayo_file_path == path
+    assert [voice.name for voice in importer.project.voices] == ["Voice1"]
+    assert "Voice1:" in importer.phoneme_list_text.toPlainText()
+    assert not importer.progress_bar.isVisible()
+
+
+def test_loader_thread_reports_errors(tmp_path, monkeypatch):
+    module, importer, errors = new_importer(monkeypatch)
+    path = tmp_path / "broken.pg2"
+    path.write_text('{"version": 2, "voices": [', encoding="utf-8")
+    importer.start_loading(str(path))
+    assert importer.project is None
+    assert len(errors) == 1 and errors[0].startswith("Error loading file")
+
+
+def test_results_of_superseded_loads_are_dropped(tmp_path, monkeypatch):
+    module, importer, errors = new_importer(monkeypatch)
+    importer.start_loading(write_document(tmp_path, document(), "first.pg2"))
+    first = importer.project
+    stale = module.read_project(write_document(tmp_path, document(fps=30), "second.pg2"), False)
+    importer.on_project_loaded(importer.load_generation - 1, "second.pg2", stale, [])
+    assert importer.project is first
+
+
+def test_read_project_through_the_sidecar(tmp_path):
+    module, _ = hosts.load_krita()
+    path = write_document(tmp_path, document())
+    progress = []
+    project = module.read_project(path, True, lambda done, total: progress.append((done, total)))
+    assert progress and progress[-1][0] == progress[-1][1]
+    assert module.read_project(path, True).storage is not None
+    assert project.voices[0].name == "Voice1"
@@ -0,0 +1,96 @@
+import pytest
+
+from benchmarks import hosts
+from benchmarks.fakes.recorder import RECORDER
+
+from .samples import document, write_document
+
+
+@pytest.fixture
+def importer(tmp_path):
+    module, krita = hosts.load_krita()
+    document_ = krita.Krita.instance().new_document(64, 64)
+    importer = module.PapagayoImporter()
+    importer.use_cache_checkbox.setChecked(False)
+    importer.load_sound_checkbox.setChecked(False)
+    importer.start_loading(write_document(tmp_path, document()))
+    importer.document = document_
+    importer.prepare_krita_layers()
+    importer.path = tmp_path
+    return importer
+
+
+def calls(name):
+    return RECORDER.counts[f"TimelineModel.{name}"]
+
+
+def rows(importer):
+    """Number of timeline rows, one data() call each when the rows are mapped."""
+    return sum(1 for node in importer.document._iter_nodes()) - 1
+
+
+def find_calls(importer, monkeypatch):
+    found = []
+    find_view = importer.timeline.find_view
+    monkeypatch.setattr(importer.timeline, "find_view", lambda: found.append(1) or find_view())
+    return found
+
+
+def test_rows_and_columns_are_mapped_once(importer):
+    timeline = importer.timeline
+    RECORDER.reset()
+    row = timeline.row_for_layer("E")
+    column = timeline.column_for_frame(12)
+    assert row >= 0 and column == 12
+    assert calls("data") == rows(importer) and calls("headerData") > 0
+    RECORDER.reset()
+    for _ in range(3):
+        assert timeline.row_for_layer("E") == row
+        assert timeline.column_for_frame(12) == column
+    assert RECORDER.counts["Krita.dockers"] == 0
+    assert calls("rowCount") == calls("data") == calls("headerData") == 0
+
+
+def test_new_layers_rebuild_only_the_rows(importer, monkeypatch):
+    timeline = importer.timeline
+    timeline.row_for_layer("E")
+    timeline.column_for_frame(12)
+    found = find_calls(importer, monkeypatch)
+    group = importer.document.nodeByName("Voice1")
+    group.addChildNode(importer.document.createNode("extra", "paintlayer"), None)
+    RECORDER.reset()
+    assert timeline.row_for_layer("extra") >= 0
+    timeline.column_for_frame(12)
+    assert calls("data") == rows(importer) and calls("headerData") == 0
+    assert found == []
+
+
+def test_renamed_layer_is_found_after_a_new_project(importer, monkeypatch):
+    timeline = importer.timeline
+    row = timeline.row_for_layer("E")
+    importer.document.nodeByName("E").setName("E_old")
+    importer.document.nodeByName("O").setName("E")
+    # The fake model signals no renames, only a new project drops the stale row map
+    assert timeline.row_for_layer("E") == row
+    found = find_calls(importer, monkeypatch)
+    importer.start_loading(write_document(importer.path, document(fps=30)))
+    assert timeline.row_for_layer("E") != row
+    assert found == [1]
+
+
+@pytest.mark.parametrize("change", ["canvas", "model reset"])
+def test_canvas_change_and_model_reset_drop_everything(importer, monkeypatch, change):
+    timeline = importer.timeline
+    model = timeline.model()
+    timeline.row_for_layer("E")
+    timeline.column_for_frame(12)
+    found = find_calls(importer, monkeypatch)
+    if change == "canvas":
+        importer.canvasChanged(None)
+    else:
+        model.modelReset.emit()
+    RECORDER.reset()
+    timeline.row_for_layer("E")
+    timeline.column_for_frame(12)
+    assert found == [1]
+    assert calls("data") == rows(importer) and calls("headerData") > 0
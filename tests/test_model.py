@@ -0,0 +1,76 @@
+import pytest
+
+from papagayo_core import load_project, parse_project, validate_papagayo_data
+from papagayo_core.model import PhonemeTable, numpy
+
+from .samples import default_phrases, document, write_document
+
+
+def test_phoneme_table_interns_names_once():
+    table = PhonemeTable(["AI", "E"])
+    assert table.intern("E") == 1
+    assert table.intern("O") == 2
+    assert table.id("missing") == -1
+    assert list(table) == ["AI", "E", "O"]
+
+
+def test_parse_project_columns():
+    project = parse_project(document(), "shot.pg2")
+    voice = project.voices[0]
+    assert project.fps == 24
+    assert project.duration == 100
+    assert list(voice.frames) == [10, 12, 14, 16, 21, 25, 50, 53]
+    assert list(voice.word_starts) == [10, 21, 50]
+    assert list(voice.word_ends) == [18, 30, 60]
+    assert list(voice.phrase_word_offsets) == [0, 2, 3]
+    assert [event.text for event in voice.phrase(0).events()] == ["etc", "E", "L", "O", "etc", "E"]
+    assert [word.text for word in voice.phrase(0).words()] == ["hello", "there"]
+    assert project.num_phonemes == 8
+
+
+def test_used_phonemes_are_generated_when_missing():
+    voice = parse_project(document()).voices[0]
+    assert voice.used_phonemes_generated
+    assert voice.used_phonemes == ["AI", "E", "L", "MBP", "O", "etc"]
+
+
+def test_used_phonemes_from_file_are_kept():
+    data = document()
+    data["voices"][0]["used_phonemes"] = ["rest", "AI"]
+    voice = parse_project(data).voices[0]
+    assert not voice.used_phonemes_generated
+    assert voice.used_phonemes == ["rest", "AI"]
+
+
+def test_legacy_single_voice_document():
+    data = {"version": 1, "fps": 30, "name": "Solo", "phrases": default_phrases()}
+    project = parse_project(data)
+    assert project.legacy
+    assert [voice.name for voice in project.voices] == ["Solo"]
+
+
+@pytest.mark.parametrize("data", [
+    {"fps": 24, "voices": []},
+    {"version": 2, "fps": 24, "voices": []},
+    {"version": 2, "fps": 24, "voices": [{"name": "A"}]},
+    {"version": 2, "fps": 24},
+])
+def test_invalid_documents_are_rejected(data):
+    with pytest.raises(ValueError):
+        validate_papagayo_data(data)
+
+
+def test_load_project_checks_the_extension(tmp_path):
+    path = write_document(tmp_path, document(), "project.txt")
+    with pytest.raises(ValueError):
+        load_project(path)
+    with pytest.raises(FileNotFoundError):
+        load_project(tmp_path / "missing.pg2")
+
+
+@pytest.mark.skipif(numpy is None, reason="NumPy is not installed")
+def test_as_numpy_shares_the_columns():
+    voice = parse_project(document()).voices[0]
+    columns = voice.as_numpy()
+    assert columns["frames"].tolist() == list(voice.frames)
+    assert columns["phoneme_ids"].tolist() == list(voice.phoneme_ids)
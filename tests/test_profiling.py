@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from papagayo_core import profiling
+from papagayo_core.profiling import Profiler, percentile
+
+
+class Clock:
+    """perf_counter() stand-in advancing by the given steps, one per call."""
+
+    def __init__(self, *steps):
+        self.now = 0.0
+        self.steps = list(steps)
+
+    def __call__(self):
+        if self.steps:
+            self.now += self.steps.pop(0)
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    def install(*steps):
+        clock = Clock(*steps)
+        monkeypatch.setattr(profiling.time, "perf_counter", clock)
+        return clock
+    return install
+
+
+def test_percentile():
+    samples = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert percentile(samples, 0.5) == 5
+    assert percentile(samples, 0.95) == 10
+    assert percentile([7], 0.5) == 7
+
+
+def test_timers_and_counters_are_recorded(clock):
+    # reset, then start and end of three timers
+    clock(0.0, 1.0, 0.002, 0.0, 0.004, 0.0, 0.010)
+    profiler = Profiler()
+    profiler.reset()
+    for name in ("pixelData", "pixelData", "setPixelData"):
+        with profiler.timer(name):
+            pass
+    profiler.count("keyframes")
+    profiler.count("keyframes", 2)
+    assert profiler.samples["pixelData"] == pytest.approx([0.002, 0.004])
+    assert profiler.counters == {"keyframes": 3}
+
+    rows = profiler.summary()
+    assert [row["name"] for row in rows] == ["setPixelData", "pixelData"]
+    assert rows[1]["count"] == 2
+    assert rows[1]["total"] == pytest.approx(0.006)
+    assert rows[1]["max"] == pytest.approx(0.004)
+
+
+def test_timer_records_when_the_call_raises():
+    profiler = Profiler()
+    with pytest.raises(RuntimeError):
+        with profiler.timer("pixelData"):
+            raise RuntimeError("host call failed")
+    assert len(profiler.samples["pixelData"]) == 1
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler(enabled=False)
+    profiler.reset()
+    with profiler.timer("pixelData"):
+        pass
+    profiler.count("keyframes")
+    assert profiler.summary() == []
+    assert not profiler.counters
+    assert profiler.stop() == 0.0
+
+
+def test_summary_lines_and_saved_file(clock, tmp_path):
+    clock(10.0, 0.5, 0.25, 1.25)
+    profiler = Profiler()
+    profiler.reset()
+    with profiler.timer("pixelData"):
+        pass
+    profiler.count("keyframes", 20)
+    assert profiler.stop() == pytest.approx(2.0)
+    lines = profiler.format_summary()
+    assert lines[0] == "Profile: 2000.0 ms total"
+    assert lines[1] == "  pixelData: 1 calls, 250.0 ms total, p50 250.000 ms, p95 250.000 ms"
+    assert lines[2:] == ["  keyframes: 20", "  keyframes per second: 10.0"]
+
+    path = profiler.save(str(tmp_path / "profile.json"), version="1.0")
+    saved = json.loads(open(path, encoding="utf-8").read())
+    assert saved["meta"] == {"version": "1.0"}
+    assert saved["counters"] == {"keyframes": 20}
+    assert saved["samples"]["pixelData"] == [pytest.approx(0.25)]
+    assert saved["elapsed"] == pytest.approx(2.0)
@@ -0,0 +1,148 @@
+import json
+import mmap
+import os
+
+import pytest
+
+from papagayo_core import hash_file, load_project, load_project_cached, open_sidecar, sidecar_path, write_sidecar
+from papagayo_core import sidecar
+from papagayo_core.sidecar import HEADER, read_sidecar_header
+
+from .samples import document, project_state, write_document
+
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, file_path):
+        self.calls += 1
+        return load_project(file_path)
+
+
+@pytest.fixture
+def source(tmp_path):
+    data = document({"Grüße": document()["voices"][0]["phrases"], "Empty": []})
+    return write_document(tmp_path, data)
+
+
+def test_round_trip(source):
+    path = write_sidecar(load_project(source))
+    assert path == sidecar_path(source)
+    project = open_sidecar(path, hash_file(source), source)
+    assert project_state(project) == project_state(load_project(source))
+    assert [word.text for word in project.voices[0].phrase(0).words()] == ["hello", "there"]
+
+
+def test_cache_dir(source, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv("PAPAGAYO_CACHE_DIR", str(cache_dir))
+    assert os.path.dirname(sidecar_path(source)) == str(cache_dir)
+    load_project_cached(source)
+    assert os.listdir(cache_dir) == [os.path.basename(sidecar_path(source))]
+
+
+def test_sidecar_is_reused_until_the_source_changes(source):
+    loader = CountingLoader()
+    load_project_cached(source, loader=loader)
+    project = load_project_cached(source, loader=loader)
+    assert loader.calls == 1
+    assert project.storage is not None
+
+    data = json.loads(open(source, encoding="utf-8").read())
+    data["fps"] = 30
+    write_document(os.path.dirname(source), data)
+    assert load_project_cached(source, loader=loader).fps == 30
+    assert loader.calls == 2
+    assert read_sidecar_header(sidecar_path(source))[4] == hash_file(source)
+
+
+def test_stale_hash_is_a_miss(source):
+    path = write_sidecar(load_project(source))
+    assert open_sidecar(path, b"\0" * 20, source) is None
+
+
+def corrupt(path, offset, data):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+
+
+def meta_block(path):
+    header = read_sidecar_header(path)
+    with open(path, "rb") as f:
+        f.seek(header[6])
+        return header[6], json.loads(f.read(header[7]).decode("utf-8"))
+
+
+def damage_meta(path):
+    offset, _ = meta_block(path)
+    corrupt(path, offset + 3, b"\xff\xfe")
+
+
+def truncate_meta(path):
+    offset, _ = meta_block(path)
+    with open(path, "r+b") as f:
+        f.truncate(offset + 10)
+
+
+def truncate_columns(path):
+    _, meta = meta_block(path)
+    with open(path, "r+b") as f:
+        f.truncate(meta["voices"][0]["columns"]["frames"][0] + 4)
+
+
+def damage_string_table(path):
+    _, meta = meta_block(path)
+    offset, count = meta["voices"][0]["word_texts"]
+    corrupt(path, offset + 4 + 4 * (count + 1), b"\xff")
+
+
+def damage_offsets(path):
+    _, meta = meta_block(path)
+    offset, length = meta["voices"][0]["columns"]["word_event_offsets"]
+    corrupt(path, offset + 4 * (length - 1), (10 ** 6).to_bytes(4, "little"))
+
+
+def damage_phoneme_ids(path):
+    _, meta = meta_block(path)
+    corrupt(path, meta["voices"][0]["columns"]["phoneme_ids"][0], (-5).to_bytes(4, "little", signed=True))
+
+
+@pytest.mark.parametrize("damage", [damage_meta, truncate_meta, truncate_columns, damage_string_table,
+                                    damage_offsets, damage_phoneme_ids])
+def test_damaged_sidecar_is_parsed_again_and_rewritten(source, damage):
+    path = write_sidecar(load_project(source))
+    damage(path)
+    assert read_sidecar_header(path)[4] == hash_file(source)
+    assert open_sidecar(path, hash_file(source), source) is None
+
+    loader = CountingLoader()
+    project = load_project_cached(source, loader=loader)
+    assert loader.calls == 1
+    assert project_state(project) == project_state(load_project(source))
+    assert project_state(open_sidecar(path, hash_file(source), source)) == project_state(project)
+
+
+def test_short_or_foreign_file_is_not_a_sidecar(tmp_path, source):
+    path = tmp_path / "foreign.pgcache"
+    path.write_bytes(b"PGLC")
+    assert open_sidecar(path) is None
+    path.write_bytes(b"XXXX" + b"\0" * HEADER.size)
+    assert open_sidecar(path) is None
+
+
+def test_damaged_sidecar_mapping_is_closed(source, monkeypatch):
+    mappings = []
+
+    class RecordingMap(mmap.mmap):
+        def __new__(cls, *args, **kwargs):
+            mapping = super().__new__(cls, *args, **kwargs)
+            mappings.append(mapping)
+            return mapping
+    monkeypatch.setattr(sidecar.mmap, "mmap", RecordingMap)
+
+    path = write_sidecar(load_project(source))
+    truncate_columns(path)
+    assert open_sidecar(path, hash_file(source), source) is None
+    assert len(mappings) == 1 and mappings[0].closed
@@ -0,0 +1,81 @@
+import io
+import json
+
+import pytest
+
+from benchmarks.synthetic import write_project
+from papagayo_core import iter_project_events, load_project, stream_project
+
+from .samples import default_phrases, document, project_state, phrase, word, write_document
+
+
+def assert_same_project(path, chunk_size):
+    assert project_state(stream_project(path, chunk_size=chunk_size)) == project_state(load_project(path))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 1 << 16])
+def test_stream_matches_json_load(tmp_path, chunk_size):
+    assert_same_project(write_document(tmp_path, document()), chunk_size)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 5])
+def test_unicode_text_split_across_chunks(tmp_path, chunk_size):
+    phrases = [phrase("grüße 🙂 \"quoted\" \\ {[]}", 0, 9, [
+        word("grüße", 0, 4, [(0, "E"), (2, "U")]),
+        word("🙂", 5, 9, [(5, "MBP")]),
+    ])]
+    data = document({"Stimme ä": phrases, "Voice,2": default_phrases()})
+    data["voices"][1]["used_phonemes"] = ["rest", "E"]
+    assert_same_project(write_document(tmp_path, data), chunk_size)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1 << 16])
+def test_whitespace_and_key_order(tmp_path, chunk_size):
+    data = document()
+    data["voices"][0] = dict(reversed(list(data["voices"][0].items())))
+    path = tmp_path / "pretty.pg2"
+    path.write_text(json.dumps(dict(reversed(list(data.items()))), indent=4), encoding="utf-8")
+    assert_same_project(path, chunk_size)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 8])
+def test_legacy_json(tmp_path, chunk_size):
+    data = {"version": 1, "fps": 25.0, "name": "Solo", "text": "", "phrases": default_phrases()}
+    assert_same_project(write_document(tmp_path, data, "legacy.json"), chunk_size)
+
+
+def test_empty_voices(tmp_path):
+    assert_same_project(write_document(tmp_path, document({"A": [], "B": []})), 3)
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_synthetic_projects(tmp_path, seed):
+    path = tmp_path / "synthetic.pg2"
+    write_project(path, voices=3, duration=20, seed=seed)
+    assert_same_project(path, 997)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "[]",
+    '{"version": 2, "fps": 24, "voices": [',
+    '{"version": 2, "fps": 24, "voices": [{"name": "A", "phrases": [{"text": "x",}]}]}',
+    '{"version": 2 "fps": 24}',
+])
+def test_invalid_documents(tmp_path, text):
+    path = tmp_path / "broken.pg2"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(ValueError):
+        stream_project(path, chunk_size=4)
+
+
+def test_events_and_progress():
+    data = json.dumps(document({"A": default_phrases()})).encode("utf-8")
+    progress = []
+    events = list(iter_project_events(io.BytesIO(data), chunk_size=16,
+                                      progress=lambda done, total: progress.append(done), total_size=len(data)))
+    kinds = [event[0] for event in events]
+    assert kinds.count("phrase") == 2
+    assert kinds.index("voices") < kinds.index("voice_begin") < kinds.index("phrase") < kinds.index("voice_end")
+    assert progress[-1] == len(data)
+    assert progress == sorted(progress)
@@ -0,0 +1,21 @@
+from benchmarks.synthetic import generate_project, phoneme_set
+from papagayo_core import parse_project, validate_papagayo_data
+
+
+def test_phoneme_set():
+    assert phoneme_set(3) == ["AI", "E", "O"]
+    assert phoneme_set(11)[-2:] == ["X0", "X1"]
+
+
+def test_generated_projects_are_valid_and_reproducible():
+    data = generate_project(voices=2, duration=30, fps=24, phonemes=12, seed=3)
+    validate_papagayo_data(data)
+    assert data == generate_project(voices=2, duration=30, fps=24, phonemes=12, seed=3)
+    assert data != generate_project(voices=2, duration=30, fps=24, phonemes=12, seed=4)
+    project = parse_project(data)
+    assert [voice.name for voice in project.voices] == ["Voice1", "Voice2"]
+    for voice in project.voices:
+        assert list(voice.frames) == sorted(voice.frames)
+        assert max(voice.phrase_ends) < project.duration
+        assert "rest" in voice.used_phonemes
+        assert set(voice.used_phonemes) - {"rest"} <= set(phoneme_set(12))
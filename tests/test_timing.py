@@ -0,0 +1,37 @@
+import pytest
+
+from papagayo_core import reduce_keyframes
+from papagayo_core.timing import snap_frame
+
+
+@pytest.mark.parametrize("frame, step, snapped", [(5, 1, 5), (5, 2, 6), (4, 2, 4), (7, 3, 6), (8, 3, 9), (0, 4, 0)])
+def test_snap_frame(frame, step, snapped):
+    assert snap_frame(frame, step) == snapped
+
+
+def test_defaults_only_merge_repeats():
+    keys = [(0, "E"), (2, "E"), (3, "O"), (3, "AI"), (5, "AI"), (9, "E")]
+    assert reduce_keyframes(keys) == ([(0, "E"), (3, "AI"), (9, "E")], 3)
+
+
+def test_min_hold_moves_short_keys():
+    keys = [(0, "E"), (1, "O"), (2, "AI"), (10, "E")]
+    # O is moved to the end of the hold of E, AI would come before it and replaces it there
+    assert reduce_keyframes(keys, min_hold=3) == ([(0, "E"), (3, "AI"), (10, "E")], 1)
+
+
+def test_step_snaps_and_drops_keys_sharing_a_frame():
+    keys = [(0, "E"), (3, "O"), (4, "AI"), (7, "MBP"), (11, "E")]
+    assert reduce_keyframes(keys, step=2) == ([(0, "E"), (4, "AI"), (8, "MBP"), (12, "E")], 1)
+
+
+def test_reduced_keys_are_frame_ordered_and_distinct():
+    keys = [(frame, "AEO"[frame % 3]) for frame in range(0, 40, 1)]
+    reduced, removed = reduce_keyframes(keys, min_hold=2, step=3)
+    frames = [frame for frame, _ in reduced]
+    assert frames == sorted(set(frames))
+    assert all(later - earlier >= 2 for earlier, later in zip(frames, frames[1:]))
+    assert all(frame % 3 == 0 or frame - 2 in frames for frame in frames)
+    assert all(a[1] != b[1] for a, b in zip(reduced, reduced[1:]))
+    assert removed == len(keys) - len(reduced)
+    assert reduce_keyframes([]) == ([], 0)